@@ -0,0 +1 @@
+"""Offline benchmarks against local stand-ins for Together and Pinecone."""
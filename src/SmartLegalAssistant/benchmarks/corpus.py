@@ -0,0 +1,106 @@
+"""
+Fixture corpus for offline benchmarks.
+
+`synthetic_corpus` builds a deterministic set of Companies Act-style
+sections, each with a "reference" like the indexed Pinecone metadata, and
+`synthetic_queries` asks questions about them. A real export can be used
+instead with `load_corpus` (JSONL of {"id", "text", "reference"}).
+"""
+import json
+import random
+from typing import Any, Dict, List
+
+_TOPICS = [
+    ("directors", "duties of directors", ["director", "duty", "care", "skill", "diligence", "conflict", "interest"]),
+    ("meetings", "annual general meetings", ["meeting", "notice", "quorum", "resolution", "vote", "members"]),
+    ("shares", "allotment of shares", ["share", "allotment", "capital", "issue", "consideration", "pre-emption"]),
+    ("accounts", "financial statements", ["accounts", "auditor", "financial", "statement", "balance", "year"]),
+    ("registration", "registration of companies", ["registrar", "registration", "incorporation", "certificate",
+                                                     "memorandum", "articles"]),
+    ("winding_up", "winding up", ["liquidator", "winding", "creditors", "insolvency", "dissolution", "assets"]),
+    ("charges", "registration of charges", ["charge", "security", "debenture", "mortgage", "lender", "register"]),
+    ("secretary", "company secretaries", ["secretary", "qualification", "appointment", "records", "filing"]),
+    ("dividends", "distributions and dividends", ["dividend", "distribution", "profits", "solvency", "declare"]),
+    ("offences", "offences and penalties", ["offence", "penalty", "fine", "conviction", "default", "officer"]),
+]
+
+_CONNECTIVES = [
+    "A company shall", "Every {w} must", "Subject to this Part, the", "Where the {w} fails to comply, the",
+    "The Registrar may", "Unless the articles provide otherwise, the", "For the purposes of this section, a",
+]
+_COMMON = ["company", "person", "section", "act", "provision", "period", "days", "written", "office", "court"]
+
+
+def synthetic_corpus(sections: int = 400, chunks_per_section: int = 3, seed: int = 1) -> List[Dict[str, Any]]:
+    """Build a deterministic Companies Act-style corpus.
+
+    Args:
+        sections: Number of sections (spread evenly over the topics)
+        chunks_per_section: Chunks per section (subsections)
+        seed: Random seed
+
+    Returns:
+        List of {"id", "text", "reference", "topic"} documents
+    """
+    rng = random.Random(seed)
+    documents = []
+    for number in range(1, sections + 1):
+        topic, title, words = _TOPICS[number % len(_TOPICS)]
+        for sub in range(1, chunks_per_section + 1):
+            sentences = []
+            for _ in range(rng.randint(3, 6)):
+                lead = rng.choice(_CONNECTIVES).format(w=rng.choice(words))
+                body = " ".join(rng.choice(words + _COMMON) for _ in range(rng.randint(10, 22)))
+                sentences.append(f"{lead} {body}.")
+            reference = f"Companies Act, Section {number}({sub})"
+            documents.append({
+                "id": f"s{number}-{sub}",
+                "text": f"{number}. {title.capitalize()} ({sub}) " + " ".join(sentences),
+                "reference": reference,
+                "topic": topic,
+            })
+    return documents
+
+
+def synthetic_queries(count: int = 50, seed: int = 2) -> List[str]:
+    """Questions in the style users ask, spread over the corpus topics."""
+    rng = random.Random(seed)
+    forms = [
+        "What are the {t} requirements for a {w}?",
+        "Explain the rules on {t} and the {w}.",
+        "When must a company comply with {t}?",
+        "What penalty applies to a {w} under the {t} provisions?",
+        "How does the Act deal with {w} in relation to {t}?",
+    ]
+    queries = []
+    for i in range(count):
+        _, title, words = _TOPICS[i % len(_TOPICS)]
+        queries.append(rng.choice(forms).format(t=title, w=rng.choice(words)))
+    return queries
+
+
+def load_corpus(path: str) -> List[Dict[str, Any]]:
+    """Load a JSONL corpus of {"id", "text", "reference"} documents."""
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def synthetic_eval_set(documents: List[Dict[str, Any]], count: int = 40, seed: int = 3) -> List[Dict[str, Any]]:
+    """Labeled questions for a synthetic corpus, each paraphrasing one chunk.
+
+    Returns:
+        List of {"id", "question", "gold"} items whose gold reference is the
+        chunk's section
+    """
+    rng = random.Random(seed)
+    common = set(_COMMON) | {"shall", "must", "the", "where", "unless", "subject", "this", "part", "purposes"}
+    questions = []
+    for i, document in enumerate(rng.sample(documents, min(count, len(documents)))):
+        words = [w for w in document["text"].lower().replace(".", " ").split() if w.isalpha() and w not in common]
+        terms = rng.sample(sorted(set(words)), min(4, len(set(words))))
+        questions.append({
+            "id": f"synthetic-{i}",
+            "question": f"What does the Act provide about {' '.join(terms)}?",
+            "gold": [document["reference"]],
+        })
+    return questions
@@ -0,0 +1,608 @@
+"""
+Retrieval quality vs. latency and cost evaluation.
+
+Sweeps a grid of retrieval settings (top_k, min_score_threshold, reranking,
+query expansion, extractive compression) over questions labeled with gold
+section references. For each configuration it reports recall@k, MRR and
+nDCG, how much of the question's wording the gold sections' context still
+carries (`gold_term_recall`) and the context size, latency and estimated
+API cost, plus the Pareto frontier, the fastest configuration that meets a
+quality bar and what compression saves and loses against the same settings
+uncompressed:
+
+    python -m SmartLegalAssistant.benchmarks.eval                      # offline, synthetic corpus
+    python -m SmartLegalAssistant.benchmarks.eval --backend live --quality-bar 0.8
+
+Every configuration runs the real `Retriever`. Its backends are wrapped in
+caches keyed by request, so the query embedding, the vector search (fetched
+once at the largest top_k and sliced), expansions and reranks are computed
+once and shared across the grid. Each backend call is timed once, and every
+query in a configuration is charged the timings and tokens of the calls it
+would have made. Results therefore do not depend on sweep order or
+parallelism. Vector searches are charged at the largest top_k's timing.
+
+`--backend live` goes through the factories, so the real services are used
+unless RAG_CASSETTE_MODE=replay serves a recorded session.
+"""
+import os
+import re
+import sys
+import json
+import math
+import time
+import argparse
+import itertools
+import statistics
+import contextvars
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from SmartLegalAssistant.benchmarks.corpus import load_corpus, synthetic_corpus, synthetic_eval_set
+from SmartLegalAssistant.benchmarks.fakes import FakeBackendProfile
+from SmartLegalAssistant.benchmarks.run import git_commit
+from SmartLegalAssistant.core.cassette import vector_digest
+from SmartLegalAssistant.core.compressor import ExtractiveCompressor
+from SmartLegalAssistant.core.context_packer import get_token_counter
+from SmartLegalAssistant.core.embeddings import EmbeddingModel
+from SmartLegalAssistant.core.llm import LanguageModel
+from SmartLegalAssistant.core.reranker import Reranker
+from SmartLegalAssistant.core.retriever import Retriever
+from SmartLegalAssistant.core.vector_store import VectorStore
+
+DEFAULT_QUESTIONS = os.path.join(os.path.dirname(__file__), "data", "companies_act_eval.jsonl")
+
+# USD per million tokens; defaults approximate Together list prices for the
+# models the app uses (override with --price kind=value)
+DEFAULT_PRICES = {"embedding": 0.02, "compression": 0.02, "rerank": 0.10, "expansion": 0.80}
+
+_SECTION = re.compile(r"\bsection\s+(\d+[A-Z]?)", re.IGNORECASE)
+_HEADING = re.compile(r"^\s*(\d+[A-Z]?)\.\s")
+_TERM = re.compile(r"[a-z]{4,}")
+# Question phrasing that says nothing about the answer
+_QUESTION_WORDS = {"what", "which", "when", "does", "must", "under", "about", "provide", "there"}
+
+
+def section_key(reference: str, text: str = "") -> Optional[str]:
+    """Section number a reference (or, failing that, a chunk heading) points to."""
+    match = _SECTION.search(reference or "") or _HEADING.match(text or "")
+    return match.group(1).upper() if match else None
+
+
+@dataclass(frozen=True)
+class EvalConfig:
+    """One point of the parameter grid."""
+    top_k: int
+    min_score_threshold: float
+    rerank: bool
+    query_expansion: bool
+    compression: bool = False
+
+    @property
+    def name(self) -> str:
+        return (f"k={self.top_k} thr={self.min_score_threshold:g} "
+                f"rerank={'on' if self.rerank else 'off'} expand={'on' if self.query_expansion else 'off'} "
+                f"compress={'on' if self.compression else 'off'}")
+
+
+def config_grid(top_ks: Iterable[int], thresholds: Iterable[float], rerank: Iterable[bool],
+                expansion: Iterable[bool], compression: Iterable[bool] = (False,)) -> List[EvalConfig]:
+    return [
+        EvalConfig(*values) for values in itertools.product(top_ks, thresholds, rerank, expansion, compression)
+    ]
+
+
+# ---------------------------------------------------------------------------
+# Ranking metrics
+# ---------------------------------------------------------------------------
+
+def ranked_sections(sources: List[Dict[str, Any]]) -> List[str]:
+    """Distinct section keys in rank order."""
+    seen, ranked = set(), []
+    for source in sources:
+        key = section_key(source.get("reference", ""), source.get("text", ""))
+        if key and key not in seen:
+            seen.add(key)
+            ranked.append(key)
+    return ranked
+
+
+def score_ranking(ranked: List[str], gold: List[str], ks: Iterable[int], ndcg_k: int) -> Dict[str, float]:
+    """recall@k, MRR and nDCG@k with binary section relevance."""
+    relevant = {section_key(reference) or reference for reference in gold}
+    scores = {
+        f"recall@{k}": len(relevant & set(ranked[:k])) / len(relevant) if relevant else 0.0 for k in ks
+    }
+    first = next((i for i, key in enumerate(ranked) if key in relevant), None)
+    scores["mrr"] = 1.0 / (first + 1) if first is not None else 0.0
+    dcg = sum(1.0 / math.log2(i + 2) for i, key in enumerate(ranked[:ndcg_k]) if key in relevant)
+    ideal = sum(1.0 / math.log2(i + 2) for i in range(min(len(relevant), ndcg_k)))
+    scores[f"ndcg@{ndcg_k}"] = dcg / ideal if ideal else 0.0
+    return scores
+
+
+def gold_term_recall(question: str, chunks: List[str], sources: List[Dict[str, Any]], gold: List[str]) -> float:
+    """Fraction of the question's content words found in the context passed on from gold sections.
+
+    Compression keeps every chunk (and its section), so ranking metrics cannot
+    see what it drops; this measures whether the wording the question asks
+    about survived in the chunks that should answer it.
+    """
+    terms = set(_TERM.findall(question.lower())) - _QUESTION_WORDS
+    if not terms:
+        return 1.0
+    relevant = {section_key(reference) or reference for reference in gold}
+    context = set()
+    for chunk, source in zip(chunks, sources):
+        if section_key(source.get("reference", ""), source.get("text", "")) in relevant:
+            context.update(_TERM.findall(chunk.lower()))
+    return len(terms & context) / len(terms)
+
+
+# ---------------------------------------------------------------------------
+# Shared stage caches with per-query cost accounting
+# ---------------------------------------------------------------------------
+
+_ledger: contextvars.ContextVar[Optional[Dict[str, Dict[str, float]]]] = contextvars.ContextVar(
+    "eval_ledger", default=None
+)
+
+
+def _charge(kind: str, seconds: float, tokens: int) -> None:
+    ledger = _ledger.get()
+    if ledger is None:
+        return
+    ledger["seconds"][kind] = ledger["seconds"].get(kind, 0.0) + seconds
+    ledger["tokens"][kind] = ledger["tokens"].get(kind, 0) + tokens
+    ledger["calls"][kind] = ledger["calls"].get(kind, 0) + 1
+
+
+class StageCache:
+    """Computes each key once, even when requested concurrently, and keeps its duration."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._futures: Dict[Any, Future] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Any, compute: Callable[[], Any]) -> Tuple[Any, float]:
+        with self._lock:
+            future = self._futures.get(key)
+            owner = future is None
+            if owner:
+                future = self._futures[key] = Future()
+                self.misses += 1
+            else:
+                self.hits += 1
+        if owner:
+            started = time.perf_counter()
+            try:
+                value = compute()
+            except BaseException as e:
+                with self._lock:
+                    self._futures.pop(key, None)
+                future.set_exception(e)
+                raise
+            future.set_result((value, time.perf_counter() - started))
+        return future.result()
+
+
+class CachedEmbeddings(EmbeddingModel):
+    def __init__(self, model: EmbeddingModel, kind: str = "embedding", cache: Optional[StageCache] = None):
+        self.model = model
+        self.kind = kind
+        self.cache = cache or StageCache()
+        self._tokens = get_token_counter()
+
+    def embed_query(self, text: str) -> List[float]:
+        vector, seconds = self.cache.get(text, lambda: self.model.embed_query(text))
+        _charge(self.kind, seconds, self._tokens.count(text))
+        return vector
+
+    def lookup(self, text: str) -> Optional[List[float]]:
+        """Vector of a text embedded earlier, without charging a call (the pipeline reuses it too)."""
+        vector, _ = self.cache.get(text, lambda: self.model.embed_query(text))
+        return vector
+
+    def embed(self, text: str) -> List[float]:
+        return self.embed_query(text)
+
+    def batch_embed(self, texts: List[str]) -> List[List[float]]:
+        """Charged as one batched call, timed as its slowest text."""
+        results = [self.cache.get(text, lambda text=text: self.model.embed_query(text)) for text in texts]
+        if results:
+            _charge(self.kind, max(seconds for _, seconds in results), sum(self._tokens.count(text) for text in texts))
+        return [vector for vector, _ in results]
+
+    def embed_documents(self, documents: List[str]) -> List[List[float]]:
+        return self.batch_embed(documents)
+
+
+class CachedVectorStore(VectorStore):
+    """Fetches `fetch_k` matches once per vector and serves every smaller top_k from them."""
+
+    def __init__(self, store: VectorStore, fetch_k: int):
+        self.store = store
+        self.fetch_k = fetch_k
+        self.cache = StageCache()
+
+    def _fetch(self, vector: List[float], include_metadata: bool, filter: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        kwargs = {"include_metadata": include_metadata}
+        if filter:
+            kwargs["filter"] = filter
+        result = self.store.query(vector, self.fetch_k, **kwargs)
+        if hasattr(result, "to_dict"):
+            result = result.to_dict()
+        return [dict(match) for match in result.get("matches", [])]
+
+    def query(self, vector: List[float], top_k: int = 30, include_metadata: bool = True,
+              filter: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        key = (vector_digest(vector), include_metadata, json.dumps(filter, sort_keys=True, default=str))
+        matches, seconds = self.cache.get(key, lambda: self._fetch(vector, include_metadata, filter))
+        _charge("vector_query", seconds, 0)
+        return {"matches": [dict(match) for match in matches[:top_k]]}
+
+
+class CachedReranker(Reranker):
+    def __init__(self, reranker: Reranker):
+        self.reranker = reranker
+        self.cache = StageCache()
+        self._tokens = get_token_counter()
+
+    def rerank(self, query: str, documents: List[Dict[str, Any]], top_n: Optional[int]) -> List[Dict[str, Any]]:
+        key = (query, tuple(document.get("text", "") for document in documents), top_n)
+        ranked, seconds = self.cache.get(key, lambda: self.reranker.rerank(query, documents, top_n))
+        query_tokens = self._tokens.count(query)
+        tokens = sum(query_tokens + self._tokens.count(document.get("text", "")) for document in documents)
+        _charge("rerank", seconds, tokens)
+        return [dict(document) for document in ranked]
+
+
+class CachedLanguageModel(LanguageModel):
+    def __init__(self, llm: LanguageModel):
+        self.llm = llm
+        self.cache = StageCache()
+        self._tokens = get_token_counter()
+
+    def generate(self, prompt: str, **kwargs: Any) -> str:
+        key = (prompt, json.dumps(kwargs, sort_keys=True, default=str))
+        text, seconds = self.cache.get(key, lambda: self.llm.generate(prompt, **kwargs))
+        _charge(kwargs.get("call_type", "generation"), seconds, self._tokens.count(prompt) + self._tokens.count(text))
+        return text
+
+
+# ---------------------------------------------------------------------------
+# Evaluation
+# ---------------------------------------------------------------------------
+
+def _percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(q * (len(ordered) - 1))))] if ordered else 0.0
+
+
+def evaluate(
+        components: Dict[str, Any],
+        questions: List[Dict[str, Any]],
+        configs: List[EvalConfig],
+        ks: Tuple[int, ...] = (1, 3, 5, 10),
+        ndcg_k: int = 10,
+        prices: Optional[Dict[str, float]] = None,
+        max_workers: int = 8,
+) -> List[Dict[str, Any]]:
+    """Score every configuration on every question.
+
+    Args:
+        components: Cached backends (and compressor) from `cached_components`
+        questions: Items with "question" and "gold" section references
+        configs: Grid to evaluate
+        ks: Cut-offs for recall@k
+        ndcg_k: Cut-off for nDCG
+        prices: USD per million tokens by call kind
+        max_workers: Questions evaluated concurrently (across all configs)
+
+    Returns:
+        One row per configuration with mean metrics, latency and cost
+    """
+    prices = {**DEFAULT_PRICES, **(prices or {})}
+    tokens = get_token_counter()
+    retrievers = {
+        config: Retriever(
+            components["embeddings"], components["vector_store"],
+            reranker=components["reranker"] if config.rerank else None,
+            llm=components["llm"], min_score_threshold=config.min_score_threshold,
+        )
+        for config in configs
+    }
+
+    def run_one(config: EvalConfig, item: Dict[str, Any]) -> Dict[str, Any]:
+        ledger = {"seconds": {}, "tokens": {}, "calls": {}}
+        token = _ledger.set(ledger)
+        try:
+            chunks, sources = retrievers[config].retrieve(
+                item["question"], top_k=config.top_k, use_query_expansion=config.query_expansion,
+                rerank_results=config.rerank,
+            )
+            if config.compression and chunks:
+                chunks = components["compressor"].compress(
+                    item["question"], chunks, query_embedding=components["embeddings"].lookup(item["question"])
+                ).chunks
+            error = None
+        except Exception as e:
+            chunks, sources, error = [], [], str(e)
+        finally:
+            _ledger.reset(token)
+        scores = score_ranking(ranked_sections(sources), item["gold"], ks, ndcg_k)
+        scores["gold_term_recall"] = gold_term_recall(item["question"], chunks, sources, item["gold"])
+        return {
+            "scores": scores,
+            "context_tokens": tokens.count("\n\n".join(chunks)),
+            "empty": not sources,
+            "error": error,
+            "seconds": sum(ledger["seconds"].values()),
+            "stage_seconds": ledger["seconds"],
+            "calls": ledger["calls"],
+            "cost": sum(tokens * prices.get(kind, 0.0) / 1e6 for kind, tokens in ledger["tokens"].items()),
+        }
+
+    tasks = [(config, item) for config in configs for item in questions]
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        outcomes = list(executor.map(lambda task: run_one(*task), tasks))
+
+    rows = []
+    for i, config in enumerate(configs):
+        results = outcomes[i * len(questions):(i + 1) * len(questions)]
+        latencies = [result["seconds"] for result in results]
+        metrics = {
+            name: round(statistics.fmean(result["scores"][name] for result in results), 4)
+            for name in results[0]["scores"]
+        } if results else {}
+        stages = sorted({stage for result in results for stage in result["stage_seconds"]})
+        calls = sorted({kind for result in results for kind in result["calls"]})
+        rows.append({
+            "name": config.name,
+            "config": asdict(config),
+            "metrics": metrics,
+            "context_tokens": round(statistics.fmean(result["context_tokens"] for result in results), 1)
+            if results else 0.0,
+            "empty_rate": round(sum(result["empty"] for result in results) / max(1, len(results)), 4),
+            "errors": sum(1 for result in results if result["error"]),
+            "latency_ms": {
+                "p50": round(_percentile(latencies, 0.50) * 1000, 2),
+                "p95": round(_percentile(latencies, 0.95) * 1000, 2),
+                "mean": round(statistics.fmean(latencies) * 1000, 2) if latencies else 0.0,
+            },
+            "stage_ms": {
+                stage: round(statistics.fmean(result["stage_seconds"].get(stage, 0.0) for result in results) * 1000, 2)
+                for stage in stages
+            },
+            "calls_per_query": {
+                kind: round(statistics.fmean(result["calls"].get(kind, 0) for result in results), 3) for kind in calls
+            },
+            "cost_per_1k_queries_usd": round(statistics.fmean(result["cost"] for result in results) * 1000, 4)
+            if results else 0.0,
+        })
+    return rows
+
+
+def pareto_frontier(rows: List[Dict[str, Any]], metric: str, latency: str = "p50") -> List[str]:
+    """Names of configurations not beaten on quality, latency and cost at once."""
+    def point(row):
+        return row["metrics"].get(metric, 0.0), row["latency_ms"][latency], row["cost_per_1k_queries_usd"]
+
+    frontier = []
+    for row in rows:
+        quality, seconds, cost = point(row)
+        dominated = any(
+            other is not row
+            and point(other)[0] >= quality and point(other)[1] <= seconds and point(other)[2] <= cost
+            and point(other) != (quality, seconds, cost)
+            for other in rows
+        )
+        if not dominated:
+            frontier.append(row["name"])
+    return frontier
+
+
+def recommend(rows: List[Dict[str, Any]], metric: str, bar: float, latency: str = "p50") -> Optional[Dict[str, Any]]:
+    """Fastest (then cheapest) configuration whose metric meets the bar."""
+    passing = [row for row in rows if row["metrics"].get(metric, 0.0) >= bar]
+    if not passing:
+        return None
+    return min(passing, key=lambda row: (row["latency_ms"][latency], row["cost_per_1k_queries_usd"]))
+
+
+def compression_effect(rows: List[Dict[str, Any]], metric: str) -> List[Dict[str, Any]]:
+    """Each compressed configuration against the same settings without compression."""
+    uncompressed = {
+        tuple(sorted((key, value) for key, value in row["config"].items() if key != "compression")): row
+        for row in rows if not row["config"].get("compression")
+    }
+    effects = []
+    for row in rows:
+        if not row["config"].get("compression"):
+            continue
+        baseline = uncompressed.get(
+            tuple(sorted((key, value) for key, value in row["config"].items() if key != "compression"))
+        )
+        if baseline is None:
+            continue
+        effects.append({
+            "name": row["name"],
+            "context_tokens": (baseline["context_tokens"], row["context_tokens"]),
+            "gold_term_recall": (baseline["metrics"]["gold_term_recall"], row["metrics"]["gold_term_recall"]),
+            metric: (baseline["metrics"].get(metric, 0.0), row["metrics"].get(metric, 0.0)),
+            "p50_ms": (baseline["latency_ms"]["p50"], row["latency_ms"]["p50"]),
+            "cost_per_1k_queries_usd": (baseline["cost_per_1k_queries_usd"], row["cost_per_1k_queries_usd"]),
+        })
+    return effects
+
+
+def markdown_report(report: Dict[str, Any]) -> str:
+    meta, rows = report["meta"], report["configs"]
+    metric, frontier = meta["quality_metric"], set(report["pareto"])
+    metric_names = list(rows[0]["metrics"]) if rows else []
+    lines = [
+        f"# Retrieval evaluation ({meta['backend']}, {meta['questions']} questions, commit {meta['commit']})",
+        "",
+        f"Quality bar: {metric} >= {meta['quality_bar']}. "
+        + (f"Recommended: **{report['recommendation']}**" if report["recommendation"] else "No configuration meets the bar."),
+        "",
+        "| Pareto | Configuration | " + " | ".join(metric_names)
+        + " | context tokens | p50 ms | p95 ms | $ / 1k queries | empty |",
+        "|---|---|" + "---|" * (len(metric_names) + 5),
+    ]
+    for row in sorted(rows, key=lambda r: (-r["metrics"].get(metric, 0.0), r["latency_ms"]["p50"])):
+        lines.append(
+            f"| {'*' if row['name'] in frontier else ''} | {row['name']} | "
+            + " | ".join(f"{row['metrics'][name]:.3f}" for name in metric_names)
+            + f" | {row['context_tokens']:.0f} | {row['latency_ms']['p50']:.1f} | {row['latency_ms']['p95']:.1f} | "
+            f"{row['cost_per_1k_queries_usd']:.4f} | {row['empty_rate']:.0%} |"
+        )
+    effects = report.get("compression", [])
+    if effects:
+        lines += [
+            "",
+            "## Compression (off -> on)",
+            "",
+            f"| Configuration | context tokens | gold_term_recall | {metric} | p50 ms | $ / 1k queries |",
+            "|---|---|---|---|---|---|",
+        ]
+        for effect in effects:
+            cells = [f"{effect['context_tokens'][0]:.0f} -> {effect['context_tokens'][1]:.0f}"]
+            cells += [f"{effect[key][0]:.3f} -> {effect[key][1]:.3f}" for key in ("gold_term_recall", metric)]
+            cells.append(f"{effect['p50_ms'][0]:.1f} -> {effect['p50_ms'][1]:.1f}")
+            cells.append(f"{effect['cost_per_1k_queries_usd'][0]:.4f} -> {effect['cost_per_1k_queries_usd'][1]:.4f}")
+            lines.append(f"| {effect['name']} | " + " | ".join(cells) + " |")
+    return "\n".join(lines) + "\n"
+
+
+# ---------------------------------------------------------------------------
+# Backends and CLI
+# ---------------------------------------------------------------------------
+
+def cached_components(embeddings: EmbeddingModel, vector_store: VectorStore, reranker: Optional[Reranker],
+                      llm: Optional[LanguageModel], fetch_k: int, compression_ratio: float = 0.4) -> Dict[str, Any]:
+    cached_embeddings = CachedEmbeddings(embeddings)
+    # Span embeddings are charged as "compression"; without its own span cache
+    # the compressor charges every query the calls it makes on a cold cache
+    span_embeddings = CachedEmbeddings(embeddings, kind="compression", cache=cached_embeddings.cache)
+    return {
+        "embeddings": cached_embeddings,
+        "vector_store": CachedVectorStore(vector_store, fetch_k),
+        "reranker": CachedReranker(reranker) if reranker else None,
+        "llm": CachedLanguageModel(llm) if llm else None,
+        "compressor": ExtractiveCompressor(span_embeddings, compression_ratio=compression_ratio, cache_size=0),
+    }
+
+
+def fake_backends(latency_scale: float, documents: List[Dict[str, Any]]):
+    from SmartLegalAssistant.benchmarks.run import build_stack
+
+    stack = build_stack(FakeBackendProfile().scaled(latency_scale), documents, compression=False)
+    retriever = stack["retriever"]
+    return retriever.embedding_model, retriever.vector_store, retriever.reranker, retriever.llm
+
+
+def live_backends():
+    from SmartLegalAssistant.core.embeddings import get_embedding_model
+    from SmartLegalAssistant.core.llm import get_language_model
+    from SmartLegalAssistant.core.reranker import get_reranker
+    from SmartLegalAssistant.core.vector_store import get_vector_store
+
+    return (
+        get_embedding_model(model_type="together"),
+        get_vector_store(store_type="pinecone", index_name=os.getenv("PINECONE_INDEX_NAME"),
+                         namespace=os.getenv("PINECONE_NAMESPACE", "")),
+        get_reranker(reranker_type="together_ai"),
+        get_language_model(model_type="together"),
+    )
+
+
+def _parse_prices(values: List[str]) -> Dict[str, float]:
+    prices = {}
+    for value in values:
+        kind, _, price = value.partition("=")
+        prices[kind] = float(price)
+    return prices
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Retrieval quality vs latency/cost sweep")
+    parser.add_argument("--backend", choices=("fake", "live"), default="fake")
+    parser.add_argument("--questions", help="JSONL of {id, question, gold} (default: synthetic for fake, "
+                                            "benchmarks/data/companies_act_eval.jsonl for live)")
+    parser.add_argument("--corpus", help="JSONL corpus for the fake backend (default: synthetic)")
+    parser.add_argument("--top-k", nargs="+", type=int, default=[5, 10, 25])
+    parser.add_argument("--thresholds", nargs="+", type=float, default=[0.4, 0.5, 0.6])
+    parser.add_argument("--rerank", nargs="+", type=int, choices=(0, 1), default=[1, 0])
+    parser.add_argument("--expansion", nargs="+", type=int, choices=(0, 1), default=[0, 1])
+    parser.add_argument("--compression", nargs="+", type=int, choices=(0, 1), default=[0, 1],
+                        help="Extractive compression after retrieval (1 embeds every span of the context)")
+    parser.add_argument("--compression-ratio", type=float, default=0.4)
+    parser.add_argument("--quality-metric", default="recall@5")
+    parser.add_argument("--quality-bar", type=float, default=0.8)
+    parser.add_argument("--price", nargs="*", default=[], help="USD per 1M tokens, e.g. rerank=0.1")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="Fake backend latency multiplier")
+    parser.add_argument("--output", help="Results file (default: benchmarks/results/eval-<timestamp>-<commit>.json)")
+    args = parser.parse_args(argv)
+
+    started = datetime.now(timezone.utc)
+    if args.backend == "fake":
+        documents = load_corpus(args.corpus) if args.corpus else synthetic_corpus()
+        backends = fake_backends(args.latency_scale, documents)
+        questions = load_corpus(args.questions) if args.questions else synthetic_eval_set(documents)
+    else:
+        backends = live_backends()
+        questions = load_corpus(args.questions or DEFAULT_QUESTIONS)
+
+    configs = config_grid(args.top_k, args.thresholds, [bool(v) for v in args.rerank],
+                          [bool(v) for v in args.expansion], [bool(v) for v in args.compression])
+    components = cached_components(*backends, fetch_k=max(args.top_k), compression_ratio=args.compression_ratio)
+    rows = evaluate(components, questions, configs, prices=_parse_prices(args.price), max_workers=args.workers)
+    best = recommend(rows, args.quality_metric, args.quality_bar)
+
+    commit = git_commit()
+    report = {
+        "meta": {
+            "timestamp": started.isoformat(timespec="seconds"),
+            "commit": commit,
+            "backend": args.backend,
+            "questions": len(questions),
+            "quality_metric": args.quality_metric,
+            "quality_bar": args.quality_bar,
+            "prices_per_million_tokens": {**DEFAULT_PRICES, **_parse_prices(args.price)},
+            "cache": {
+                name: {"hits": component.cache.hits, "misses": component.cache.misses}
+                for name, component in components.items() if isinstance(component, (
+                    CachedEmbeddings, CachedVectorStore, CachedReranker, CachedLanguageModel
+                ))
+            },
+        },
+        "configs": rows,
+        "compression": compression_effect(rows, args.quality_metric),
+        "pareto": pareto_frontier(rows, args.quality_metric),
+        "recommendation": best["name"] if best else None,
+    }
+
+    output = args.output or os.path.join(
+        "benchmarks", "results", f"eval-{started.strftime('%Y%m%dT%H%M%S')}-{commit or 'nogit'}.json"
+    )
+    directory = os.path.dirname(output)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    markdown = markdown_report(report)
+    with open(os.path.splitext(output)[0] + ".md", "w", encoding="utf-8") as f:
+        f.write(markdown)
+    print(markdown)
+    print(f"Results written to {output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
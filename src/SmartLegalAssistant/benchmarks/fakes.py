@@ -0,0 +1,358 @@
+"""
+Local stand-ins for the Together client and the Pinecone index.
+
+`FakeTogether` and `FakeAsyncTogether` implement the parts of the Together
+SDK the pipeline uses (`embeddings.create`, `rerank.create` and
+`chat.completions.create`, streaming included) and answer with the same
+response shapes, after sleeping for a latency drawn from a configurable
+distribution. They are injected through the `client=` / `async_client=`
+arguments of the real Together wrappers, so the wrappers, the rate limiter
+and the pipeline all run exactly as in production.
+
+`LocalVectorStore` is an in-memory `VectorStore` over a fixture corpus.
+"""
+import re
+import math
+import time
+import random
+import asyncio
+import hashlib
+import threading
+from dataclasses import dataclass, field
+from types import SimpleNamespace
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+
+from SmartLegalAssistant.core.vector_store import VectorStore
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+@dataclass
+class LatencyModel:
+    """Log-normal latency with a given median and 99th percentile (seconds).
+
+    Attributes:
+        median: Median latency
+        p99: 99th-percentile latency (equal to median for a fixed delay)
+        scale: Multiplier applied to every sample (e.g. 0.1 for quick runs)
+    """
+    median: float
+    p99: float
+    scale: float = 1.0
+
+    def sample(self, rng: random.Random) -> float:
+        if self.median <= 0 or self.scale <= 0:
+            return 0.0
+        sigma = math.log(max(self.p99, self.median) / self.median) / 2.326
+        return self.median * math.exp(sigma * rng.gauss(0.0, 1.0)) * self.scale
+
+
+@dataclass
+class FakeBackendProfile:
+    """Latency and throughput of the simulated services.
+
+    Defaults are in the range observed for Together AI and Pinecone
+    serverless from a cloud region; tune them to match your own traces.
+    """
+    embedding: LatencyModel = field(default_factory=lambda: LatencyModel(0.12, 0.40))
+    rerank: LatencyModel = field(default_factory=lambda: LatencyModel(0.25, 0.80))
+    time_to_first_token: LatencyModel = field(default_factory=lambda: LatencyModel(0.40, 1.50))
+    vector_query: LatencyModel = field(default_factory=lambda: LatencyModel(0.06, 0.20))
+    tokens_per_second: float = 60.0
+    output_tokens: int = 200
+    embedding_dim: int = 256
+    seed: int = 7
+
+    def scaled(self, scale: float) -> "FakeBackendProfile":
+        """Copy of the profile with every latency (and token interval) multiplied by `scale`."""
+        def rescale(model: LatencyModel) -> LatencyModel:
+            return LatencyModel(model.median, model.p99, model.scale * scale)
+        return FakeBackendProfile(
+            embedding=rescale(self.embedding),
+            rerank=rescale(self.rerank),
+            time_to_first_token=rescale(self.time_to_first_token),
+            vector_query=rescale(self.vector_query),
+            tokens_per_second=self.tokens_per_second / scale if scale > 0 else float("inf"),
+            output_tokens=self.output_tokens,
+            embedding_dim=self.embedding_dim,
+            seed=self.seed,
+        )
+
+
+def tokenize(text: str) -> List[str]:
+    return _WORD.findall(text.lower())
+
+
+def hash_embedding(text: str, dim: int = 256) -> List[float]:
+    """Deterministic bag-of-words embedding: similar wording gives similar vectors."""
+    vector = np.zeros(dim, dtype=np.float32)
+    for word in tokenize(text):
+        digest = hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest()
+        bucket = int.from_bytes(digest[:4], "little") % dim
+        sign = 1.0 if digest[4] & 1 else -1.0
+        vector[bucket] += sign
+    norm = float(np.linalg.norm(vector))
+    if norm:
+        vector /= norm
+    return vector.tolist()
+
+
+def lexical_relevance(query: str, document: str) -> float:
+    """Share of query words found in the document, in [0, 1]."""
+    query_words = set(tokenize(query))
+    if not query_words:
+        return 0.0
+    return len(query_words & set(tokenize(document))) / len(query_words)
+
+
+_FILLER = (
+    "the company shall ensure that each director complies with the duties set out in section "
+    "and the register must be kept at the registered office subject to the provisions of this act"
+).split()
+
+
+class _FakeServices:
+    """Response builders and latency sampling shared by the sync and async fakes."""
+
+    def __init__(self, profile: FakeBackendProfile):
+        self.profile = profile
+        self._rng = random.Random(profile.seed)
+        self._lock = threading.Lock()
+        self.calls: Dict[str, int] = {"embeddings": 0, "rerank": 0, "chat": 0}
+
+    def delay(self, model: LatencyModel, kind: str) -> float:
+        with self._lock:
+            self.calls[kind] += 1
+            return model.sample(self._rng)
+
+    def embedding_response(self, inputs: List[str]) -> SimpleNamespace:
+        return SimpleNamespace(data=[
+            SimpleNamespace(index=i, embedding=hash_embedding(text, self.profile.embedding_dim))
+            for i, text in enumerate(inputs)
+        ])
+
+    def rerank_response(self, query: str, documents: List[str], top_n: Optional[int]) -> SimpleNamespace:
+        scored = sorted(
+            ((lexical_relevance(query, document), i) for i, document in enumerate(documents)),
+            key=lambda item: (-item[0], item[1]),
+        )
+        return SimpleNamespace(results=[
+            SimpleNamespace(index=i, relevance_score=score) for score, i in scored[:top_n or len(documents)]
+        ])
+
+    def completion_tokens(self, messages: List[Dict[str, str]], max_tokens: Optional[int]) -> List[str]:
+        prompt = " ".join(message.get("content", "") for message in messages)
+        count = min(self.profile.output_tokens, max_tokens or self.profile.output_tokens)
+        seed = int.from_bytes(hashlib.blake2b(prompt.encode("utf-8"), digest_size=4).digest(), "little")
+        words = [_FILLER[(seed + i) % len(_FILLER)] for i in range(count)]
+        return [word if i == 0 else " " + word for i, word in enumerate(words)]
+
+    def token_interval(self) -> float:
+        rate = self.profile.tokens_per_second
+        return 0.0 if rate == float("inf") or rate <= 0 else 1.0 / rate
+
+    @staticmethod
+    def completion(text: str) -> SimpleNamespace:
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=text))])
+
+    @staticmethod
+    def chunk(delta: str) -> SimpleNamespace:
+        return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=delta))])
+
+
+class _SyncStream:
+    """Iterator over completion chunks, released with `close` like the SDK stream."""
+
+    def __init__(self, services: _FakeServices, tokens: List[str]):
+        self._services = services
+        self._tokens = tokens
+        self._closed = False
+
+    def __iter__(self) -> Iterator[SimpleNamespace]:
+        interval = self._services.token_interval()
+        for token in self._tokens:
+            if self._closed:
+                return
+            if interval:
+                time.sleep(interval)
+            yield self._services.chunk(token)
+
+    def close(self) -> None:
+        self._closed = True
+
+
+class _AsyncStream:
+    def __init__(self, services: _FakeServices, tokens: List[str]):
+        self._services = services
+        self._tokens = tokens
+        self._closed = False
+
+    async def __aiter__(self):
+        interval = self._services.token_interval()
+        for token in self._tokens:
+            if self._closed:
+                return
+            if interval:
+                await asyncio.sleep(interval)
+            yield self._services.chunk(token)
+
+    async def close(self) -> None:
+        self._closed = True
+
+
+class FakeTogether:
+    """Synchronous stand-in for `together.Together`."""
+
+    def __init__(self, profile: Optional[FakeBackendProfile] = None, services: Optional[_FakeServices] = None):
+        self.services = services or _FakeServices(profile or FakeBackendProfile())
+        profile = self.services.profile
+        services = self.services
+
+        def create_embeddings(model: str, input: List[str], **kwargs: Any) -> SimpleNamespace:
+            time.sleep(services.delay(profile.embedding, "embeddings"))
+            return services.embedding_response(input)
+
+        def create_rerank(model: str, query: str, documents: List[str], top_n: Optional[int] = None,
+                          **kwargs: Any) -> SimpleNamespace:
+            time.sleep(services.delay(profile.rerank, "rerank"))
+            return services.rerank_response(query, documents, top_n)
+
+        def create_completion(model: str, messages: List[Dict[str, str]], max_tokens: Optional[int] = None,
+                              stream: bool = False, **kwargs: Any):
+            time.sleep(services.delay(profile.time_to_first_token, "chat"))
+            tokens = services.completion_tokens(messages, max_tokens)
+            if stream:
+                return _SyncStream(services, tokens)
+            interval = services.token_interval()
+            if interval:
+                time.sleep(interval * len(tokens))
+            return services.completion("".join(tokens))
+
+        self.embeddings = SimpleNamespace(create=create_embeddings)
+        self.rerank = SimpleNamespace(create=create_rerank)
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=create_completion))
+
+
+class FakeAsyncTogether:
+    """Asyncio stand-in for `together.AsyncTogether` (shares call counters with a `FakeTogether`)."""
+
+    def __init__(self, profile: Optional[FakeBackendProfile] = None, services: Optional[_FakeServices] = None):
+        self.services = services or _FakeServices(profile or FakeBackendProfile())
+        profile = self.services.profile
+        services = self.services
+
+        async def create_embeddings(model: str, input: List[str], **kwargs: Any) -> SimpleNamespace:
+            await asyncio.sleep(services.delay(profile.embedding, "embeddings"))
+            return services.embedding_response(input)
+
+        async def create_rerank(model: str, query: str, documents: List[str], top_n: Optional[int] = None,
+                                **kwargs: Any) -> SimpleNamespace:
+            await asyncio.sleep(services.delay(profile.rerank, "rerank"))
+            return services.rerank_response(query, documents, top_n)
+
+        async def create_completion(model: str, messages: List[Dict[str, str]], max_tokens: Optional[int] = None,
+                                    stream: bool = False, **kwargs: Any):
+            await asyncio.sleep(services.delay(profile.time_to_first_token, "chat"))
+            tokens = services.completion_tokens(messages, max_tokens)
+            if stream:
+                return _AsyncStream(services, tokens)
+            interval = services.token_interval()
+            if interval:
+                await asyncio.sleep(interval * len(tokens))
+            return services.completion("".join(tokens))
+
+        self.embeddings = SimpleNamespace(create=create_embeddings)
+        self.rerank = SimpleNamespace(create=create_rerank)
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=create_completion))
+
+
+def fake_clients(profile: Optional[FakeBackendProfile] = None):
+    """Return a (sync, async) pair of fake Together clients sharing counters and randomness."""
+    services = _FakeServices(profile or FakeBackendProfile())
+    return FakeTogether(services=services), FakeAsyncTogether(services=services)
+
+
+class LocalVectorStore(VectorStore):
+    """In-memory stand-in for `PineconeStore`, with exact cosine search.
+
+    Query responses have Pinecone's dictionary shape: {"matches": [{"id",
+    "score", "metadata"}]}. Scores are rescaled from [-1, 1] to [0, 1], which
+    puts bag-of-words similarities in the range bge-large scores fall in, so
+    the retriever's default `min_score_threshold` behaves much as in production.
+    """
+
+    def __init__(self, documents: Optional[List[Dict[str, Any]]] = None,
+                 latency: Optional[LatencyModel] = None, embedding_dim: int = 256, seed: int = 11):
+        """Build an index over fixture documents.
+
+        Args:
+            documents: Dicts with "id", "text" and any other metadata (e.g. "reference");
+                embedded with `hash_embedding`
+            latency: Simulated query latency (none by default)
+            embedding_dim: Dimension of the stored vectors
+            seed: Seed for latency sampling
+        """
+        self.latency = latency
+        self.embedding_dim = embedding_dim
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._ids: List[str] = []
+        self._metadata: List[Dict[str, Any]] = []
+        self._matrix = np.zeros((0, embedding_dim), dtype=np.float32)
+        self.queries = 0
+        if documents:
+            self.upsert([
+                (document["id"], hash_embedding(document["text"], embedding_dim), document)
+                for document in documents
+            ])
+
+    def upsert(self, vectors: List[Any]) -> None:
+        """Add or replace (id, vector, metadata) tuples."""
+        with self._lock:
+            rows = [np.asarray(vector, dtype=np.float32) for _, vector, _ in vectors]
+            index = {doc_id: i for i, doc_id in enumerate(self._ids)}
+            matrix = list(self._matrix)
+            for (doc_id, _, metadata), row in zip(vectors, rows):
+                if doc_id in index:
+                    matrix[index[doc_id]] = row
+                    self._metadata[index[doc_id]] = dict(metadata)
+                else:
+                    index[doc_id] = len(self._ids)
+                    self._ids.append(doc_id)
+                    self._metadata.append(dict(metadata))
+                    matrix.append(row)
+            self._matrix = np.vstack(matrix) if matrix else np.zeros((0, self.embedding_dim), dtype=np.float32)
+
+    def _delay(self) -> float:
+        if self.latency is None:
+            return 0.0
+        with self._lock:
+            return self.latency.sample(self._rng)
+
+    def query(self, vector: List[float], top_k: int = 30, include_metadata: bool = True, **kwargs: Any) -> Dict[str, Any]:
+        time.sleep(self._delay())
+        return self._search(vector, top_k, include_metadata)
+
+    async def aquery(self, vector: List[float], top_k: int = 30, include_metadata: bool = True,
+                     **kwargs: Any) -> Dict[str, Any]:
+        await asyncio.sleep(self._delay())
+        return self._search(vector, top_k, include_metadata)
+
+    def _search(self, vector: List[float], top_k: int, include_metadata: bool) -> Dict[str, Any]:
+        with self._lock:
+            self.queries += 1
+            matrix, ids, metadata = self._matrix, self._ids, self._metadata
+        if not ids:
+            return {"matches": []}
+        query = np.asarray(vector, dtype=np.float32)
+        norm = float(np.linalg.norm(query))
+        scores = (1.0 + matrix @ (query / norm if norm else query)) / 2.0
+        k = min(top_k, len(ids))
+        order = np.argpartition(-scores, k - 1)[:k]
+        order = order[np.argsort(-scores[order])]
+        return {"matches": [
+            {"id": ids[i], "score": float(scores[i]), **({"metadata": dict(metadata[i])} if include_metadata else {})}
+            for i in order
+        ]}
@@ -0,0 +1,434 @@
+"""
+Concurrent load generator.
+
+Streamlit runs each browser session's script on its own thread, and all of
+them share the `@st.cache_resource` pipeline. This tool simulates N such
+sessions against the local backend stand-ins (`benchmarks.fakes`), using
+either of two modes:
+
+- direct: each session thread calls the shared RAGPipeline the way the app
+  does (`prepare_context` with speculation, then a streamed
+  `answer_from_context`)
+- streamlit: each session is a `streamlit.testing.v1.AppTest` of
+  streamlit_app/app.py, whose factories are patched to return the stand-ins
+
+For every session count it reports throughput, latency percentiles, where
+the session threads spent their time (simulated backend I/O, waiting on
+locks/queues/futures, or running Python) and memory growth:
+
+    python -m SmartLegalAssistant.benchmarks.load --sessions 1 5 10 25 --mode direct streamlit
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import threading
+import tracemalloc
+import contextlib
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+from unittest import mock
+
+from SmartLegalAssistant.benchmarks.corpus import synthetic_corpus, synthetic_queries
+from SmartLegalAssistant.benchmarks.fakes import FakeBackendProfile
+from SmartLegalAssistant.benchmarks.run import build_stack, git_commit, summarize
+from SmartLegalAssistant.core.rate_limiter import DEFAULT_CALL_LIMITS, QUEUE_WAIT_SECONDS
+from SmartLegalAssistant.utils.memory import rss_bytes
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "streamlit_app", "app.py")
+
+_WAIT_FUNCTIONS = {"wait", "acquire", "get", "result", "join", "_wait_for_tstate_lock", "select", "_run_once"}
+_WAIT_MODULES = ("threading.py", "queue.py", "_base.py", "selectors.py", "base_events.py")
+
+
+class ThreadStateSampler:
+    """Periodically classifies what the watched threads are doing.
+
+    Each sample looks at a thread's innermost Python frame:
+    - "backend": inside the fake services (standing in for network I/O)
+    - "waiting": blocked in a condition, queue, future or join
+    - "running": anything else (Python work, or waiting for the GIL or a C-level lock)
+    Waits are attributed to the calling frame so contended call sites show up.
+    """
+
+    def __init__(self, prefixes: tuple, interval: float = 0.01):
+        self.prefixes = prefixes
+        self.interval = interval
+        self.states: Counter = Counter()
+        self.wait_sites: Counter = Counter()
+        self.hot_sites: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @staticmethod
+    def _site(frame) -> str:
+        code = frame.f_code
+        return f"{os.path.basename(code.co_filename)}:{frame.f_lineno}:{code.co_name}"
+
+    def _sample(self) -> None:
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if not names.get(ident, "").startswith(self.prefixes):
+                continue
+            filename = frame.f_code.co_filename
+            if filename.endswith("fakes.py"):
+                self.states["backend"] += 1
+            elif frame.f_code.co_name in _WAIT_FUNCTIONS and filename.endswith(_WAIT_MODULES):
+                self.states["waiting"] += 1
+                caller = frame
+                while caller is not None and caller.f_code.co_filename.endswith(_WAIT_MODULES):
+                    caller = caller.f_back
+                if caller is not None:
+                    self.wait_sites[self._site(caller)] += 1
+            else:
+                self.states["running"] += 1
+                self.hot_sites[self._site(frame)] += 1
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def __enter__(self) -> "ThreadStateSampler":
+        self._thread = threading.Thread(target=self._loop, name="load-thread-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def report(self, top: int = 8) -> Dict[str, Any]:
+        total = sum(self.states.values()) or 1
+        return {
+            "samples": sum(self.states.values()),
+            "share": {state: round(count / total, 3) for state, count in sorted(self.states.items())},
+            "top_wait_sites": self.wait_sites.most_common(top),
+            "top_running_sites": self.hot_sites.most_common(top),
+        }
+
+
+class MemorySampler:
+    """Samples RSS (and traced Python memory, if tracemalloc is on) in the background."""
+
+    def __init__(self, interval: float = 0.5, trace: bool = False):
+        self.interval = interval
+        self.trace = trace
+        self.samples: List[Dict[str, float]] = []
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._start_snapshot = None
+        self.top_growth: List[str] = []
+
+    def _take(self) -> None:
+        sample = {"t": time.perf_counter(), "rss_mb": (rss_bytes() or 0) / 2 ** 20}
+        if tracemalloc.is_tracing():
+            sample["traced_mb"] = tracemalloc.get_traced_memory()[0] / 2 ** 20
+        self.samples.append(sample)
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval):
+            self._take()
+
+    def __enter__(self) -> "MemorySampler":
+        if self.trace:
+            tracemalloc.start()
+            self._start_snapshot = tracemalloc.take_snapshot()
+        self._take()
+        self._thread = threading.Thread(target=self._loop, name="load-memory-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._stop.set()
+        self._thread.join()
+        self._take()
+        if self._start_snapshot is not None:
+            stats = tracemalloc.take_snapshot().compare_to(self._start_snapshot, "lineno")
+            self.top_growth = [str(stat) for stat in stats[:10]]
+            tracemalloc.stop()
+
+    def report(self, requests: int) -> Dict[str, Any]:
+        first, last = self.samples[0], self.samples[-1]
+        growth = last["rss_mb"] - first["rss_mb"]
+        report = {
+            "rss_start_mb": round(first["rss_mb"], 1),
+            "rss_end_mb": round(last["rss_mb"], 1),
+            "rss_peak_mb": round(max(sample["rss_mb"] for sample in self.samples), 1),
+            "rss_growth_mb": round(growth, 2),
+            "rss_growth_per_1k_requests_mb": round(growth / requests * 1000, 2) if requests else None,
+        }
+        if "traced_mb" in last:
+            report["traced_growth_mb"] = round(last["traced_mb"] - first["traced_mb"], 2)
+            report["top_allocation_growth"] = self.top_growth
+        return report
+
+
+@contextlib.contextmanager
+def patched_factories(stack: Dict[str, Any]):
+    """Make the component factories return the stand-ins from `build_stack`."""
+    retriever = stack["retriever"]
+    with mock.patch("SmartLegalAssistant.core.embeddings.get_embedding_model",
+                    lambda *args, **kwargs: retriever.embedding_model), \
+            mock.patch("SmartLegalAssistant.core.vector_store.get_vector_store",
+                       lambda *args, **kwargs: retriever.vector_store), \
+            mock.patch("SmartLegalAssistant.core.llm.get_language_model",
+                       lambda *args, **kwargs: retriever.llm), \
+            mock.patch("SmartLegalAssistant.core.reranker.get_reranker",
+                       lambda *args, **kwargs: retriever.reranker):
+        yield
+
+
+class QuerySource:
+    """Hands out questions; unique by default so answer caches do not hide backend load."""
+
+    def __init__(self, pool: List[str], unique: bool = True):
+        self.pool = pool
+        self.unique = unique
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def next(self) -> str:
+        with self._lock:
+            index = self._count
+            self._count += 1
+        query = self.pool[index % len(self.pool)]
+        return f"{query} (request {index})" if self.unique else query
+
+
+def direct_session(pipeline, template: str, top_k: int) -> Callable[[str], Dict[str, float]]:
+    """One app-like request against the shared pipeline."""
+    def request(query: str) -> Dict[str, float]:
+        started = time.perf_counter()
+        prepared = pipeline.prepare_context(query=query, top_k=top_k, use_compression=False,
+                                            speculate_template=template)
+        sources = time.perf_counter()
+        result = pipeline.answer_from_context(prepared, template_type=template, stream=True)
+        for _ in result["answer_stream"]:
+            pass
+        return {"sources": sources - started, "total": time.perf_counter() - started}
+    return request
+
+
+def streamlit_session(timeout: float) -> Callable[[str], Dict[str, float]]:
+    """One session of the Streamlit app driven through AppTest."""
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    app.run()
+
+    def request(query: str) -> Dict[str, float]:
+        app.text_area[0].input(query)
+        app.button[0].click()
+        started = time.perf_counter()
+        app.run()
+        elapsed = time.perf_counter() - started
+        if app.exception or app.error:
+            messages = [str(getattr(element, "value", element)) for element in list(app.exception) + list(app.error)]
+            raise RuntimeError("; ".join(messages)[:300])
+        return {"total": elapsed}
+    return request
+
+
+def run_sessions(
+        make_session: Callable[[], Callable[[str], Dict[str, float]]],
+        sessions: int,
+        requests_per_session: int,
+        queries: QuerySource,
+        think_time: float = 0.0,
+        ramp_up: float = 0.0,
+        trace_memory: bool = False,
+) -> Dict[str, Any]:
+    """Run `sessions` concurrent sessions and collect latency, contention and memory figures."""
+    timings: Dict[str, List[float]] = {}
+    errors: List[str] = []
+    lock = threading.Lock()
+    queue_wait_before = _queue_waits()
+
+    def session(index: int) -> None:
+        rng = random.Random(index)
+        time.sleep(ramp_up * index / max(1, sessions))
+        try:
+            request = make_session()
+        except Exception as e:
+            with lock:
+                errors.append(f"session start: {e}")
+            return
+        for _ in range(requests_per_session):
+            try:
+                result = request(queries.next())
+            except Exception as e:
+                with lock:
+                    errors.append(str(e)[:300])
+            else:
+                with lock:
+                    for name, seconds in result.items():
+                        timings.setdefault(name, []).append(seconds)
+            if think_time:
+                time.sleep(rng.expovariate(1.0 / think_time))
+
+    threads = [threading.Thread(target=session, args=(i,), name=f"load-session-{i}") for i in range(sessions)]
+    with MemorySampler(trace=trace_memory) as memory, ThreadStateSampler(("load-session", "ScriptRunner")) as states:
+        cpu_started, started = time.process_time(), time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        cpu = time.process_time() - cpu_started
+
+    completed = len(timings.get("total", []))
+    return {
+        "sessions": sessions,
+        "requests": sessions * requests_per_session,
+        "completed": completed,
+        "errors": len(errors),
+        "error_samples": errors[:5],
+        "duration_s": round(elapsed, 3),
+        "throughput_rps": round(completed / elapsed, 3) if elapsed else 0.0,
+        "latency_ms": {name: summarize(values) for name, values in timings.items()},
+        "cpu_utilization": round(cpu / elapsed, 3) if elapsed else 0.0,
+        "threads": states.report(),
+        "api_queue_wait": _histogram_delta(queue_wait_before, _queue_waits()),
+        "memory": memory.report(completed),
+    }
+
+
+def _queue_waits() -> Dict[str, Dict[str, Any]]:
+    return {call_type: QUEUE_WAIT_SECONDS.snapshot(call_type=call_type) for call_type in DEFAULT_CALL_LIMITS}
+
+
+def _histogram_delta(before: Dict[str, Dict[str, Any]], after: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """Count and mean of API queue waits observed between two snapshots, per call type."""
+    delta = {}
+    for call_type, value in after.items():
+        count = value["count"] - before[call_type]["count"]
+        if count:
+            total = value["sum"] - before[call_type]["sum"]
+            delta[call_type] = {"waits": count, "mean_ms": round(total / count * 1000, 2)}
+    return delta
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Simulate concurrent app sessions against local stand-ins")
+    parser.add_argument("--sessions", nargs="+", type=int, default=[1, 5, 10, 25])
+    parser.add_argument("--mode", nargs="+", choices=("direct", "streamlit"), default=["direct"])
+    parser.add_argument("--requests-per-session", type=int, default=4)
+    parser.add_argument("--think-time", type=float, default=0.0, help="Mean pause between a session's requests (s)")
+    parser.add_argument("--ramp-up", type=float, default=0.0, help="Spread session starts over this many seconds")
+    parser.add_argument("--latency-scale", type=float, default=1.0)
+    parser.add_argument("--top-k", type=int, default=25)
+    parser.add_argument("--template", default="legal_assistant")
+    parser.add_argument("--repeat-queries", action="store_true",
+                        help="Cycle a fixed question pool (lets answer caches hit) instead of unique questions")
+    parser.add_argument("--tracemalloc", action="store_true", help="Trace allocations (slower, shows growth sites)")
+    parser.add_argument("--timeout", type=float, default=120.0, help="AppTest script run timeout (s)")
+    parser.add_argument("--output", help="Results file (default: benchmarks/results/load-<timestamp>-<commit>.json)")
+    args = parser.parse_args(argv)
+
+    started = datetime.now(timezone.utc)
+    profile = FakeBackendProfile().scaled(args.latency_scale)
+    documents = synthetic_corpus()
+    queries = QuerySource(synthetic_queries(200), unique=not args.repeat_queries)
+    runs = []
+    for mode in args.mode:
+        stack = build_stack(profile, documents, speculative=True)
+        if mode == "direct":
+            make_session = lambda: direct_session(stack["pipeline"], args.template, args.top_k)
+            context = contextlib.nullcontext()
+        else:
+            make_session = lambda: streamlit_session(args.timeout)
+            context = _streamlit_environment(stack)
+        with context:
+            # Warm-up builds shared resources (and the cached app pipeline) outside the measurements
+            run_sessions(make_session, 1, 1, queries)
+            for sessions in args.sessions:
+                run = run_sessions(make_session, sessions, args.requests_per_session, queries,
+                                   think_time=args.think_time, ramp_up=args.ramp_up, trace_memory=args.tracemalloc)
+                run["mode"] = mode
+                runs.append(run)
+                total = run["latency_ms"].get("total", {})
+                print(
+                    f"{mode:<10} sessions={sessions:<4} {run['throughput_rps']:>7.2f} req/s  "
+                    f"p50={total.get('p50', 0):>8.1f}ms  p99={total.get('p99', 0):>8.1f}ms  "
+                    f"cpu={run['cpu_utilization']:.2f}  threads={run['threads']['share']}  "
+                    f"rss+{run['memory']['rss_growth_mb']}MB  errors={run['errors']}",
+                    file=sys.stderr,
+                )
+
+    commit = git_commit()
+    report = {
+        "meta": {
+            "timestamp": started.isoformat(timespec="seconds"),
+            "commit": commit,
+            "config": {key: value for key, value in vars(args).items() if key != "output"},
+        },
+        "runs": runs,
+    }
+    output = args.output or os.path.join(
+        "benchmarks", "results", f"load-{started.strftime('%Y%m%dT%H%M%S')}-{commit or 'nogit'}.json"
+    )
+    directory = os.path.dirname(output)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}", file=sys.stderr)
+    return 0
+
+
+@contextlib.contextmanager
+def _shared_app_runtime():
+    """Let AppTest sessions run concurrently.
+
+    AppTest installs a fresh mock Runtime singleton for every script run and
+    clears it afterwards, which breaks runs overlapping on other threads. One
+    runtime (built the same way) is pinned for the whole load test instead.
+
+    AppTest also waits for each run by polling every millisecond, which with
+    many sessions turns into GIL contention that a browser session would not
+    cause; the wait is made coarser (up to 10 ms added per run).
+    """
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+    from streamlit.runtime.media_file_manager import MediaFileManager
+    from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+    from streamlit.testing.v1 import app_test, local_script_runner
+    from streamlit.testing.v1.util import patch_config_options
+
+    original_wait = local_script_runner.require_widgets_deltas
+
+    def coarse_wait(runner, timeout: float = 3) -> None:
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if runner.script_stopped():
+                return
+            time.sleep(0.01)
+        original_wait(runner, 0)  # Shuts the runner down and raises the timeout error
+
+    runtime = mock.MagicMock(spec=Runtime)
+    runtime.media_file_mgr = MediaFileManager(MemoryMediaFileStorage("/mock/media"))
+    runtime.cache_storage_manager = MemoryCacheStorageManager()
+    with mock.patch.object(Runtime, "instance", classmethod(lambda cls: runtime)), \
+            mock.patch.object(Runtime, "exists", classmethod(lambda cls: True)), \
+            mock.patch.object(app_test, "patch_config_options", lambda options: contextlib.nullcontext()), \
+            mock.patch.object(local_script_runner, "require_widgets_deltas", coarse_wait), \
+            patch_config_options({"global.appTest": True}):
+        yield
+
+
+@contextlib.contextmanager
+def _streamlit_environment(stack: Dict[str, Any]):
+    """Patched factories, a throwaway answer cache and no metrics port for AppTest runs."""
+    with tempfile.TemporaryDirectory() as cache_dir, patched_factories(stack), _shared_app_runtime(), \
+            mock.patch.dict(os.environ, {"ANSWER_CACHE_DIR": cache_dir, "METRICS_PORT": ""}), \
+            open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        # The app prints debug lines on every script run
+        yield
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,302 @@
+"""
+Offline latency and throughput benchmarks.
+
+Runs `Retriever.retrieve`, `AnswerGenerator.generate_answer` and
+`RAGPipeline.process_query` against the local Together and Pinecone
+stand-ins from `benchmarks.fakes`, sweeping top_k and client concurrency,
+and writes throughput and latency percentiles to a JSON file so runs can be
+compared across commits:
+
+    python -m SmartLegalAssistant.benchmarks.run --top-k 5 10 25 --concurrency 1 4 8
+    python -m SmartLegalAssistant.benchmarks.run --compare benchmarks/results/<older>.json
+
+Nothing here needs network access or API keys.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import subprocess
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from SmartLegalAssistant.benchmarks.corpus import load_corpus, synthetic_corpus, synthetic_queries
+from SmartLegalAssistant.benchmarks.fakes import FakeBackendProfile, LocalVectorStore, fake_clients
+from SmartLegalAssistant.core.answer_generator import AnswerGenerator, RAGPipeline
+from SmartLegalAssistant.core.compressor import ExtractiveCompressor
+from SmartLegalAssistant.core.embeddings import TogetherAIEmbeddings
+from SmartLegalAssistant.core.llm import TogetherAILanguageModel
+from SmartLegalAssistant.core.rate_limiter import APIGovernor
+from SmartLegalAssistant.core.reranker import TogetherAIReranker
+from SmartLegalAssistant.core.retriever import Retriever
+from SmartLegalAssistant.utils.tracing import Tracer
+
+TARGETS = ("retrieve", "generate_answer", "process_query")
+
+
+def build_stack(profile: FakeBackendProfile, documents: List[Dict[str, Any]],
+                use_async: bool = False, compression: bool = True, **pipeline_kwargs: Any) -> Dict[str, Any]:
+    """Assemble the production classes on top of the fake backends.
+
+    Args:
+        profile: Latency profile of the fake services
+        documents: Corpus indexed by the local vector store
+        use_async: Build the pipeline with use_async=True
+        compression: Attach an extractive compressor
+        **pipeline_kwargs: Extra RAGPipeline arguments (e.g. speculative=True)
+
+    Returns:
+        Dictionary with the retriever, answer generator, pipeline and the
+        shared fake services (for call counts)
+    """
+    client, async_client = fake_clients(profile)
+    # A generous limiter keeps the governor's bookkeeping in the measured path
+    # without throttling the simulated backends
+    governor = APIGovernor(requests_per_second=10000, max_concurrency=256)
+    embeddings = TogetherAIEmbeddings(client=client, async_client=async_client, governor=governor)
+    llm = TogetherAILanguageModel(client=client, async_client=async_client, governor=governor)
+    reranker = TogetherAIReranker(client=client, async_client=async_client, governor=governor)
+    vector_store = LocalVectorStore(documents, latency=profile.vector_query,
+                                    embedding_dim=profile.embedding_dim, seed=profile.seed)
+    retriever = Retriever(embeddings, vector_store, reranker=reranker, llm=llm)
+    generator = AnswerGenerator(llm=llm, default_template_type="legal_assistant", temperature=0.2)
+    pipeline = RAGPipeline(
+        retriever=retriever,
+        answer_generator=generator,
+        compressor=ExtractiveCompressor(embedding_model=embeddings) if compression else None,
+        use_async=use_async,
+        tracer=pipeline_kwargs.pop("tracer", None) or Tracer(enabled=False),
+        **pipeline_kwargs,
+    )
+    return {
+        "retriever": retriever,
+        "generator": generator,
+        "pipeline": pipeline,
+        "services": client.services,
+        "vector_store": vector_store,
+    }
+
+
+def summarize(latencies: List[float]) -> Dict[str, float]:
+    """Latency percentiles in milliseconds."""
+    if not latencies:
+        return {}
+    ordered = sorted(latencies)
+
+    def percentile(q: float) -> float:
+        index = min(len(ordered) - 1, max(0, round(q * (len(ordered) - 1))))
+        return ordered[index] * 1000
+
+    return {
+        "p50": round(percentile(0.50), 2),
+        "p90": round(percentile(0.90), 2),
+        "p99": round(percentile(0.99), 2),
+        "mean": round(statistics.fmean(ordered) * 1000, 2),
+        "min": round(ordered[0] * 1000, 2),
+        "max": round(ordered[-1] * 1000, 2),
+    }
+
+
+def run_case(call: Callable[[int], Any], requests: int, concurrency: int) -> Dict[str, Any]:
+    """Issue `requests` calls from `concurrency` worker threads.
+
+    Args:
+        call: Function taking the request index
+        requests: Total number of calls
+        concurrency: Number of simultaneous callers
+
+    Returns:
+        Throughput, error count and latency percentiles
+    """
+    latencies: List[float] = []
+    errors = 0
+
+    def timed(index: int) -> Optional[float]:
+        started = time.perf_counter()
+        try:
+            call(index)
+        except Exception:
+            return None
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for latency in executor.map(timed, range(requests)):
+            if latency is None:
+                errors += 1
+            else:
+                latencies.append(latency)
+    elapsed = time.perf_counter() - started
+    return {
+        "requests": requests,
+        "errors": errors,
+        "duration_s": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": summarize(latencies),
+    }
+
+
+def run_benchmarks(
+        stack: Dict[str, Any],
+        queries: List[str],
+        targets: List[str],
+        top_ks: List[int],
+        concurrencies: List[int],
+        requests: Optional[int] = None,
+        warmup: int = 2,
+) -> List[Dict[str, Any]]:
+    """Sweep every target over top_k x concurrency.
+
+    Args:
+        stack: Components from `build_stack`
+        queries: Queries cycled through by the callers
+        targets: Subset of TARGETS
+        top_ks: Retrieval depths
+        concurrencies: Caller thread counts
+        requests: Calls per case (defaults to 5 per caller, at least 20)
+        warmup: Untimed calls before each case
+
+    Returns:
+        One result row per (target, top_k, concurrency)
+    """
+    retriever, generator, pipeline = stack["retriever"], stack["generator"], stack["pipeline"]
+    services = stack["services"]
+    rows = []
+    for target in targets:
+        for top_k in top_ks:
+            if target == "retrieve":
+                call = lambda i, k=top_k: retriever.retrieve(queries[i % len(queries)], top_k=k)
+            elif target == "generate_answer":
+                # Context is retrieved once up front so only generation is timed
+                contexts = [retriever.retrieve(query, top_k=top_k) for query in queries]
+                call = lambda i, c=contexts: generator.generate_answer(
+                    queries[i % len(queries)], c[i % len(c)][0],
+                    scores=[source["score"] for source in c[i % len(c)][1]]
+                )
+            else:
+                call = lambda i, k=top_k: pipeline.process_query(queries[i % len(queries)], top_k=k)
+
+            for concurrency in concurrencies:
+                count = requests or max(20, 5 * concurrency)
+                for i in range(warmup):
+                    call(i)
+                before = dict(services.calls)
+                row = {"target": target, "top_k": top_k, "concurrency": concurrency}
+                row.update(run_case(call, count, concurrency))
+                row["backend_calls"] = {kind: services.calls[kind] - before[kind] for kind in before}
+                rows.append(row)
+                print(
+                    f"{target:<16} top_k={top_k:<3} concurrency={concurrency:<3} "
+                    f"{row['throughput_rps']:>7.2f} req/s  p50={row['latency_ms'].get('p50', 0):>8.1f}ms  "
+                    f"p99={row['latency_ms'].get('p99', 0):>8.1f}ms  errors={row['errors']}",
+                    file=sys.stderr,
+                )
+    return rows
+
+
+def git_commit() -> Optional[str]:
+    try:
+        output = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return output.stdout.strip() or None
+
+
+def compare(current: List[Dict[str, Any]], baseline_path: str) -> List[Dict[str, Any]]:
+    """Relative change of throughput and p50/p99 against an earlier results file."""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = {
+            (row["target"], row["top_k"], row["concurrency"]): row for row in json.load(f)["results"]
+        }
+
+    def change(new: float, old: float) -> Optional[float]:
+        return round((new - old) / old * 100, 1) if old else None
+
+    deltas = []
+    for row in current:
+        old = baseline.get((row["target"], row["top_k"], row["concurrency"]))
+        if old is None:
+            continue
+        deltas.append({
+            "target": row["target"],
+            "top_k": row["top_k"],
+            "concurrency": row["concurrency"],
+            "throughput_pct": change(row["throughput_rps"], old["throughput_rps"]),
+            "p50_pct": change(row["latency_ms"].get("p50", 0), old["latency_ms"].get("p50", 0)),
+            "p99_pct": change(row["latency_ms"].get("p99", 0), old["latency_ms"].get("p99", 0)),
+        })
+    return deltas
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Offline RAG latency benchmarks against local fakes")
+    parser.add_argument("--targets", nargs="+", choices=TARGETS, default=list(TARGETS))
+    parser.add_argument("--top-k", nargs="+", type=int, default=[5, 10, 25])
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 4, 8])
+    parser.add_argument("--requests", type=int, default=None, help="Calls per case (default: 5 per caller, min 20)")
+    parser.add_argument("--latency-scale", type=float, default=1.0,
+                        help="Multiply every simulated latency (0 measures pure Python overhead)")
+    parser.add_argument("--corpus", help="JSONL corpus of {id, text, reference} (default: synthetic)")
+    parser.add_argument("--sections", type=int, default=400, help="Synthetic corpus size in sections")
+    parser.add_argument("--async-pipeline", action="store_true", help="Benchmark with use_async=True")
+    parser.add_argument("--no-compression", action="store_true", help="Disable extractive compression")
+    parser.add_argument("--output", help="Results file (default: benchmarks/results/<timestamp>-<commit>.json)")
+    parser.add_argument("--compare", help="Earlier results file to compare against")
+    args = parser.parse_args(argv)
+
+    started = datetime.now(timezone.utc)
+    profile = FakeBackendProfile().scaled(args.latency_scale)
+    documents = load_corpus(args.corpus) if args.corpus else synthetic_corpus(sections=args.sections)
+    stack = build_stack(profile, documents, use_async=args.async_pipeline, compression=not args.no_compression)
+    rows = run_benchmarks(
+        stack, synthetic_queries(), args.targets, args.top_k, args.concurrency, requests=args.requests
+    )
+
+    commit = git_commit()
+    report = {
+        "meta": {
+            "timestamp": started.isoformat(timespec="seconds"),
+            "commit": commit,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "config": {
+                "latency_scale": args.latency_scale,
+                "documents": len(documents),
+                "async_pipeline": args.async_pipeline,
+                "compression": not args.no_compression,
+                "tokens_per_second": profile.tokens_per_second if args.latency_scale > 0 else None,
+                "output_tokens": profile.output_tokens,
+            },
+        },
+        "results": rows,
+    }
+    if args.compare:
+        report["comparison"] = {"baseline": args.compare, "deltas": compare(rows, args.compare)}
+        for delta in report["comparison"]["deltas"]:
+            print(
+                f"{delta['target']:<16} top_k={delta['top_k']:<3} concurrency={delta['concurrency']:<3} "
+                f"throughput {delta['throughput_pct']:+}%  p50 {delta['p50_pct']:+}%  p99 {delta['p99_pct']:+}%",
+                file=sys.stderr,
+            )
+
+    output = args.output or os.path.join(
+        "benchmarks", "results", f"{started.strftime('%Y%m%dT%H%M%S')}-{commit or 'nogit'}.json"
+    )
+    directory = os.path.dirname(output)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
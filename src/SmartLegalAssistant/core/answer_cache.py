@@ -0,0 +1,325 @@
+"""
+Whole-answer cache for the RAG pipeline.
+
+Answers are keyed on the normalized query plus every parameter that changes
+the output (template, top_k, reranking, expansion, temperature, index
+version). An optional near-duplicate lookup compares query embeddings so
+rephrasings of a frequent question are answered from the cache as well.
+
+`lookup` and `put_result` are the pipeline's entry points: they mark hits,
+embed the query only when near-duplicate matching needs it, and store
+streamed answers once their stream has been read to the end.
+"""
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from SmartLegalAssistant.utils import tracing
+from SmartLegalAssistant.utils.memory import deep_sizeof
+
+logger = logging.getLogger(__name__)
+
+# Keys that only make sense for a live result and are never persisted
+_TRANSIENT_KEYS = ("answer_stream", "section_stream", "cached", "cache_match", "speculation", "timings")
+_STREAM_KEYS = ("answer_stream", "section_stream")
+
+
+def _unit(vector: List[float]) -> np.ndarray:
+    """`vector` as float32 scaled to unit length (zero vectors stay zero)."""
+    array = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(array)
+    return array / norm if norm else array
+
+
+class AnswerCache:
+    """Disk-backed answer cache with TTL and optional semantic matching."""
+
+    def __init__(
+        self,
+        cache_dir: str = "cache/answers",
+        ttl_seconds: float = 7 * 24 * 3600,
+        index_version: Optional[str] = None,
+        semantic_threshold: Optional[float] = None,
+        max_entries: int = 2000,
+    ):
+        """Initialize the cache and load surviving entries from disk.
+
+        Args:
+            cache_dir: Directory holding one JSON file per cached answer
+            ttl_seconds: Entries older than this are treated as missing
+            index_version: Version label of the vector index; entries stored
+                under another version are discarded
+            semantic_threshold: Cosine similarity needed for a near-duplicate
+                hit (None disables near-duplicate matching)
+            max_entries: Oldest entries are evicted beyond this count
+        """
+        self.cache_dir = cache_dir
+        self.ttl_seconds = ttl_seconds
+        self.index_version = index_version or os.getenv("PINECONE_INDEX_VERSION", "")
+        self.semantic_threshold = semantic_threshold
+        self.max_entries = max_entries
+
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._sizes: Dict[str, int] = {}
+        # Per param_key: entry keys and their unit-length query embeddings, row for row.
+        # Replaced rather than modified, so lookups can use them outside the lock
+        self._vectors: Dict[str, Tuple[List[str], np.ndarray]] = {}
+        self.bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._load()
+
+    @staticmethod
+    def normalize_query(query: str) -> str:
+        """Lowercase and collapse whitespace so trivial variants share a key."""
+        return " ".join(query.lower().split())
+
+    def _param_key(self, params: Dict[str, Any]) -> str:
+        payload = json.dumps({**params, "index_version": self.index_version}, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _entry_key(self, query: str, param_key: str) -> str:
+        payload = f"{param_key}:{self.normalize_query(query)}"
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _expired(self, entry: Dict[str, Any], now: float) -> bool:
+        return now - entry["stored_at"] > self.ttl_seconds
+
+    def _load(self) -> None:
+        now = time.time()
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                with open(path) as f:
+                    entry = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.debug(f"Skipping unreadable cache entry {path}: {e}")
+                continue
+            if entry.get("index_version") != self.index_version or self._expired(entry, now):
+                self._remove_file(entry.get("key", name[:-5]))
+                continue
+            self._store(entry, deep_sizeof(entry))
+
+    def _store(self, entry: Dict[str, Any], size: int) -> None:
+        key = entry["key"]
+        self.bytes += size - self._sizes.get(key, 0)
+        self._sizes[key] = size
+        self._unindex(key)
+        self._entries[key] = entry
+        if entry.get("embedding"):
+            keys, matrix = self._vectors.get(entry["param_key"], ([], None))
+            row = _unit(entry["embedding"])[np.newaxis, :]
+            self._vectors[entry["param_key"]] = (
+                keys + [key], row if matrix is None else np.vstack([matrix, row])
+            )
+
+    def _unindex(self, key: str) -> None:
+        entry = self._entries.get(key)
+        if entry is None or entry["param_key"] not in self._vectors:
+            return
+        keys, matrix = self._vectors[entry["param_key"]]
+        if key not in keys:
+            return
+        i = keys.index(key)
+        if len(keys) == 1:
+            del self._vectors[entry["param_key"]]
+        else:
+            self._vectors[entry["param_key"]] = (keys[:i] + keys[i + 1:], np.delete(matrix, i, axis=0))
+
+    def _remove_file(self, key: str) -> None:
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def get(
+        self,
+        query: str,
+        params: Dict[str, Any],
+        query_embedding: Optional[List[float]] = None,
+    ) -> Optional[Tuple[Dict[str, Any], str]]:
+        """Look up a cached result.
+
+        Args:
+            query: User query
+            params: Every parameter that affects the answer
+            query_embedding: Embedding of the raw query, enables near-duplicate matching
+
+        Returns:
+            Tuple of (result copy, "exact" or "semantic"), or None on a miss
+        """
+        param_key = self._param_key(params)
+        key = self._entry_key(query, param_key)
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._expired(entry, now):
+                self._evict(key)
+                entry = None
+            if entry is not None:
+                self.hits += 1
+                return dict(entry["result"]), "exact"
+            vectors = self._vectors.get(param_key)
+
+        if self.semantic_threshold is not None and query_embedding is not None and vectors is not None:
+            keys, matrix = vectors
+            similarities = matrix @ _unit(query_embedding)
+            # Most similar first; entries evicted or expired since the snapshot are skipped
+            for i in np.argsort(-similarities):
+                if similarities[i] < self.semantic_threshold:
+                    break
+                with self._lock:
+                    entry = self._entries.get(keys[i])
+                    if entry is not None and not self._expired(entry, now):
+                        self.hits += 1
+                        self.semantic_hits += 1
+                        return dict(entry["result"]), "semantic"
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(
+        self,
+        query: str,
+        params: Dict[str, Any],
+        result: Dict[str, Any],
+        query_embedding: Optional[List[float]] = None,
+    ) -> None:
+        """Store a result and persist it to disk."""
+        param_key = self._param_key(params)
+        key = self._entry_key(query, param_key)
+        entry = {
+            "key": key,
+            "param_key": param_key,
+            "query": query,
+            "index_version": self.index_version,
+            "stored_at": time.time(),
+            "embedding": list(query_embedding) if query_embedding is not None else None,
+            "result": {k: v for k, v in result.items() if k not in _TRANSIENT_KEYS},
+        }
+        size = deep_sizeof(entry)
+
+        with self._lock:
+            self._store(entry, size)
+            while len(self._entries) > self.max_entries:
+                oldest = min(self._entries.values(), key=lambda e: e["stored_at"])
+                self._evict(oldest["key"])
+
+        tmp_path = self._path(key) + ".tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, self._path(key))
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning(f"Failed to persist cached answer: {e}")
+
+    def lookup(
+        self,
+        query: str,
+        params: Dict[str, Any],
+        embed_query: Callable[[str], List[float]],
+        query_embedding: Optional[List[float]] = None,
+    ) -> Tuple[Optional[Dict[str, Any]], Optional[List[float]]]:
+        """Look up an answer for the pipeline, traced as "cache_lookup".
+
+        Args:
+            query: User query
+            params: Every parameter that affects the answer
+            embed_query: Embeds the raw query, called only for near-duplicate matching
+            query_embedding: Raw query embedding from an earlier lookup, if any
+
+        Returns:
+            Tuple of (cached result marked "cached" and "cache_match", or None;
+            raw query embedding or None). The embedding is handed on to
+            retrieval so it is not computed twice.
+        """
+        with tracing.span("cache_lookup") as span:
+            if query_embedding is None and self.semantic_threshold is not None:
+                with tracing.span("embedding", texts=1):
+                    query_embedding = embed_query(query)
+
+            hit = self.get(query, params, query_embedding)
+            span.set(cache_hit=hit is not None, cache_match=hit[1] if hit else "none")
+        if hit is None:
+            return None, query_embedding
+
+        result, match_type = hit
+        result.update({"cached": True, "cache_match": match_type, "query": query})
+        return result, query_embedding
+
+    def put_result(
+        self,
+        query: str,
+        params: Dict[str, Any],
+        result: Dict[str, Any],
+        query_embedding: Optional[List[float]] = None,
+    ) -> Dict[str, Any]:
+        """Store a generated result, or for a streamed one, once its stream is exhausted.
+
+        Returns:
+            The result marked "cached": False, with its streams wrapped
+        """
+        result["cached"] = False
+        streams = [key for key in _STREAM_KEYS if key in result]
+        if not streams:
+            self.put(query, params, result, query_embedding)
+            return result
+
+        # Only one of the streams is consumed, so only one of them stores the answer
+        for key in streams:
+            result[key] = self._put_when_done(result[key], query, params, result, query_embedding)
+        return result
+
+    def _put_when_done(self, stream: Iterator[Any], query: str, params: Dict[str, Any],
+                       result: Dict[str, Any], query_embedding: Optional[List[float]]) -> Iterator[Any]:
+        yield from stream
+        self.put(query, params, result, query_embedding)
+
+    def _evict(self, key: str) -> None:
+        self._unindex(key)
+        self._entries.pop(key, None)
+        self.bytes -= self._sizes.pop(key, 0)
+        self._remove_file(key)
+
+    def clear(self) -> None:
+        """Remove every cached answer from memory and disk."""
+        with self._lock:
+            for key in list(self._entries):
+                self._evict(key)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and the current size."""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "hits": self.hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+
+def stream_cached(cached: Dict[str, Any]) -> Dict[str, Any]:
+    """Give a cached result the same stream keys as a freshly generated one."""
+    cached["answer_stream"] = iter([cached["answer"]])
+    if "section_answers" in cached:
+        cached["section_stream"] = iter(cached["section_answers"].items())
+    return cached
@@ -1,9 +1,36 @@
 
 # answer_generator.py
 
-from typing import List, Dict, Any, Optional, Union
-from SmartLegalAssistant.utils.prompt_templates import get_template, format_template
+from typing import List, Dict, Any, Iterator, Optional, Tuple
+import time
+import queue
+import asyncio
+import logging
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from SmartLegalAssistant.utils.prompt_templates import (
+    get_template, get_compiled_template, compile_template, CompiledTemplate,
+    LEGAL_PERSPECTIVES, PERSPECTIVE_TEMPLATE, MAP_TEMPLATE, MAP_NO_INFORMATION
+)
 from SmartLegalAssistant.core.llm import LanguageModel
+from SmartLegalAssistant.core.answer_cache import AnswerCache, stream_cached
+from SmartLegalAssistant.core.context_packer import ContextPacker, PackedContext
+from SmartLegalAssistant.core.compressor import ExtractiveCompressor
+from SmartLegalAssistant.core.router import LLMRouter
+from SmartLegalAssistant.core.speculative import (
+    SpeculationStats, attach_speculation, confirm_speculation, start_speculation, take_speculation
+)
+from SmartLegalAssistant.core.async_runner import gather_cancelling, get_event_loop_thread, run_sync
+from SmartLegalAssistant.core.batch import BatchProgress, iter_batches
+from SmartLegalAssistant.core.events import (
+    PipelineEvent, RetrievalStarted, SourcesReady, RerankDone, Final,
+    answer_events, cached_answer_events, elapsed_clock
+)
+from SmartLegalAssistant.utils import tracing
+from SmartLegalAssistant.utils.tracing import Tracer, get_tracer
+
+logger = logging.getLogger(__name__)
 
 
 class AnswerGenerator:
@@ -13,28 +40,53 @@ class AnswerGenerator:
             self,
             llm: LanguageModel,
             default_template_type: str = "legal_assistant",
-            max_context_length: int = 4000,
-            temperature: float = 0.2
+            max_context_length: Optional[int] = None,
+            temperature: float = 0.2,
+            max_context_tokens: int = 3000,
+            context_packer: Optional[ContextPacker] = None,
+            section_max_tokens: int = 400,
+            map_batch_tokens: Optional[int] = None,
+            max_parallel_map: int = 4,
+            map_max_tokens: int = 400,
+            max_prompt_tokens: Optional[int] = None,
+            router: Optional[LLMRouter] = None
     ):
         """Initialize the answer generator.
 
         Args:
             llm: Language model for answer generation
             default_template_type: Default prompt template type to use
-            max_context_length: Maximum context length to send to LLM
+            max_context_length: Optional hard cap on context characters (legacy)
             temperature: Temperature parameter for generation
+            max_context_tokens: Token budget for the packed context
+            context_packer: Custom packer (overrides max_context_tokens)
+            section_max_tokens: Token limit per section in parallel-perspective mode
+            map_batch_tokens: Token budget per map batch (defaults to the context budget)
+            max_parallel_map: Map calls allowed in flight at once
+            map_max_tokens: Token limit for each map call's notes
+            max_prompt_tokens: Optional budget for the whole rendered prompt; the
+                context budget shrinks by the template's static tokens and the query
+            router: Optional router choosing a model per call (llm is used when None)
         """
         self.llm = llm
         self.default_template_type = default_template_type
         self.max_context_length = max_context_length
         self.temperature = temperature
+        self.context_packer = context_packer or ContextPacker(max_tokens=max_context_tokens)
+        self.section_max_tokens = section_max_tokens
+        self.map_batch_tokens = map_batch_tokens or self.context_packer.max_tokens
+        self.max_parallel_map = max_parallel_map
+        self.map_max_tokens = map_max_tokens
+        self.max_prompt_tokens = max_prompt_tokens
+        self.router = router
 
     def generate_answer(
             self,
             query: str,
             retrieved_chunks: List[str],
             template_type: Optional[str] = None,
-            custom_template: Optional[str] = None
+            custom_template: Optional[str] = None,
+            scores: Optional[List[float]] = None
     ) -> Dict[str, Any]:
         """Generate an answer based on retrieved chunks and query.
 
@@ -43,59 +95,601 @@ class AnswerGenerator:
             retrieved_chunks: List of relevant text chunks
             template_type: Type of prompt template to use (overrides default)
             custom_template: Custom template string (overrides template_type)
+            scores: Relevance score per chunk, used to prioritize context
 
         Returns:
             Dictionary containing answer and metadata
         """
         if not retrieved_chunks:
-            return {
-                "answer": "I don't have enough information to answer this question.",
-                "has_context": False,
-                "template_used": template_type or self.default_template_type
-            }
+            return self._no_context_result(template_type)
+
+        prompt, template_used, packed, prompt_tokens = self._build_prompt(
+            query, retrieved_chunks, template_type, custom_template, scores
+        )
+
+        result = self._context_metadata(template_used, packed, prompt_tokens)
+        llm = self._model_for(result, template_used, query, packed.tokens_used)
+
+        # Generate answer using LLM
+        with tracing.span("generation", **self._generation_attributes(result)) as span:
+            result["answer"] = llm.generate(prompt, temperature=self.temperature)
+            span.set(answer_chars=len(result["answer"]))
+        return result
+
+    def generate_answer_stream(
+            self,
+            query: str,
+            retrieved_chunks: List[str],
+            template_type: Optional[str] = None,
+            custom_template: Optional[str] = None,
+            scores: Optional[List[float]] = None
+    ) -> Dict[str, Any]:
+        """Streaming variant of `generate_answer`.
+
+        The returned dictionary carries the same metadata plus an
+        "answer_stream" iterator of text deltas. "answer" is filled in once
+        the stream has been fully consumed.
+
+        Args:
+            query: User query
+            retrieved_chunks: List of relevant text chunks
+            template_type: Type of prompt template to use (overrides default)
+            custom_template: Custom template string (overrides template_type)
+            scores: Relevance score per chunk, used to prioritize context
+
+        Returns:
+            Dictionary containing the answer stream and metadata
+        """
+        if not retrieved_chunks:
+            result = self._no_context_result(template_type)
+            result["answer_stream"] = iter([result["answer"]])
+            return result
+
+        prompt, template_used, packed, prompt_tokens = self._build_prompt(
+            query, retrieved_chunks, template_type, custom_template, scores
+        )
+
+        result = self._context_metadata(template_used, packed, prompt_tokens)
+        llm = self._model_for(result, template_used, query, packed.tokens_used)
+        result["answer"] = ""
+        result["answer_stream"] = self._collect_stream(
+            result, llm.generate_stream(prompt, temperature=self.temperature),
+            tracing.start_span("generation", stream=True, **self._generation_attributes(result))
+        )
+        return result
+
+    async def agenerate_answer(
+            self,
+            query: str,
+            retrieved_chunks: List[str],
+            template_type: Optional[str] = None,
+            custom_template: Optional[str] = None,
+            scores: Optional[List[float]] = None,
+            call_type: str = "generation"
+    ) -> Dict[str, Any]:
+        """Async variant of `generate_answer`.
+
+        `call_type` sets the rate-limiter priority of the generation call.
+        """
+        if not retrieved_chunks:
+            return self._no_context_result(template_type)
+
+        prompt, template_used, packed, prompt_tokens = self._build_prompt(
+            query, retrieved_chunks, template_type, custom_template, scores
+        )
+        result = self._context_metadata(template_used, packed, prompt_tokens)
+        llm = self._model_for(result, template_used, query, packed.tokens_used)
+        with tracing.span("generation", **self._generation_attributes(result)) as span:
+            result["answer"] = await llm.agenerate(prompt, temperature=self.temperature, call_type=call_type)
+            span.set(answer_chars=len(result["answer"]))
+        return result
+
+    def generate_perspectives(
+            self,
+            query: str,
+            retrieved_chunks: List[str],
+            scores: Optional[List[float]] = None
+    ) -> Dict[str, Any]:
+        """Generate the legal_assistant answer with one concurrent call per perspective.
+
+        Args:
+            query: User query
+            retrieved_chunks: List of relevant text chunks
+            scores: Relevance score per chunk, used to prioritize context
+
+        Returns:
+            Dictionary containing the assembled answer, per-section text and metadata
+        """
+        result = self.generate_perspectives_stream(query, retrieved_chunks, scores)
+        for _ in result["section_stream"]:
+            pass
+        result.pop("section_stream", None)
+        result.pop("answer_stream", None)
+        return result
+
+    def generate_perspectives_stream(
+            self,
+            query: str,
+            retrieved_chunks: List[str],
+            scores: Optional[List[float]] = None
+    ) -> Dict[str, Any]:
+        """Streaming variant of `generate_perspectives`.
+
+        The four legal_assistant sections are generated concurrently over the
+        same packed context, so latency is that of the slowest section rather
+        than the sum of all four. The result carries two views of the same
+        generation; consume only one of them:
+
+        - "section_stream": (section key, text delta) pairs in arrival order
+        - "answer_stream": deltas of the assembled answer, in section order
+
+        "answer" and "section_answers" are filled in once the stream is consumed.
+
+        Args:
+            query: User query
+            retrieved_chunks: List of relevant text chunks
+            scores: Relevance score per chunk, used to prioritize context
+
+        Returns:
+            Dictionary containing the streams and metadata
+        """
+        if not retrieved_chunks:
+            result = self._no_context_result("legal_assistant")
+            result["sections"] = []
+            result["section_stream"] = iter([])
+            result["answer_stream"] = iter([result["answer"]])
+            return result
+
+        compiled = compile_template(PERSPECTIVE_TEMPLATE)
+        # Budget against the longest section instruction so every section prompt fits
+        longest = max(LEGAL_PERSPECTIVES, key=lambda p: len(p[1]) + len(p[2]))
+        slot_values = {"query": query, "perspective": longest[1], "instruction": longest[2]}
+        packed = self._prepare_context(retrieved_chunks, scores, self._context_budget(compiled, **slot_values))
+        prompts = {
+            key: compiled.render(
+                context=packed.context, query=query, perspective=title, instruction=instruction
+            )
+            for key, title, instruction in LEGAL_PERSPECTIVES
+        }
+
+        result = self._context_metadata("legal_assistant", packed, self._prompt_tokens(compiled, packed, **slot_values))
+        result["answer"] = ""
+        result["generation_mode"] = "perspectives"
+        result["sections"] = [{"key": key, "title": title} for key, title, _ in LEGAL_PERSPECTIVES]
+        result["section_answers"] = {}
+
+        llm = self._model_for(result, "legal_assistant", query, packed.tokens_used)
+        span = tracing.start_span("generation", stream=True, sections=len(prompts), **self._generation_attributes(result))
+        events = self._fan_out(result, prompts, llm, span)
+        result["section_stream"] = ((key, delta) for key, delta in events if delta is not None)
+        result["answer_stream"] = self._ordered_sections(events)
+        return result
+
+    def _fan_out(
+            self,
+            result: Dict[str, Any],
+            prompts: Dict[str, str],
+            llm: LanguageModel,
+            span=tracing.NOOP_SPAN
+    ) -> Iterator[Tuple[str, Optional[str]]]:
+        """Run one streaming LLM call per section on its own thread and merge the deltas.
+
+        Yields (section key, delta) in arrival order and (section key, None)
+        when a section finishes. Threads start on first iteration; if the
+        consumer stops early, the remaining section streams are abandoned at
+        their next delta.
+        """
+        events: "queue.Queue[Tuple[str, Optional[str], Optional[BaseException]]]" = queue.Queue()
+        stop = threading.Event()
+
+        def worker(key: str, prompt: str) -> None:
+            try:
+                stream = llm.generate_stream(
+                    prompt, temperature=self.temperature, max_tokens=self.section_max_tokens
+                )
+                try:
+                    for delta in stream:
+                        if stop.is_set():
+                            break
+                        events.put((key, delta, None))
+                finally:
+                    close = getattr(stream, "close", None)
+                    if close:
+                        close()
+            except BaseException as e:
+                events.put((key, None, e))
+                return
+            events.put((key, None, None))
+
+        threads = [
+            threading.Thread(target=worker, args=(key, prompt), daemon=True, name=f"perspective-{key}")
+            for key, prompt in prompts.items()
+        ]
+        parts: Dict[str, List[str]] = {key: [] for key in prompts}
+        try:
+            for thread in threads:
+                thread.start()
+            pending = len(threads)
+            while pending:
+                key, delta, error = events.get()
+                if error is not None:
+                    raise error
+                if delta is None:
+                    pending -= 1
+                else:
+                    parts[key].append(delta)
+                yield key, delta
+        finally:
+            stop.set()
+            span.end()
+
+        result["section_answers"] = {key: "".join(chunks).strip() for key, chunks in parts.items()}
+        result["answer"] = self.assemble_perspectives(result["section_answers"])
+
+    @staticmethod
+    def assemble_perspectives(section_answers: Dict[str, str]) -> str:
+        """Join per-perspective texts into the numbered legal_assistant answer layout."""
+        return "\n\n".join(
+            f"{i}. **{title}**: {section_answers.get(key, '')}"
+            for i, (key, title, _) in enumerate(LEGAL_PERSPECTIVES, start=1)
+        )
+
+    @staticmethod
+    def _ordered_sections(events: Iterator[Tuple[str, Optional[str]]]) -> Iterator[str]:
+        """Re-serialize interleaved section events into the assembled answer's order.
+
+        The section currently being printed streams live; later sections are
+        buffered and flushed as soon as every section before them has finished.
+        """
+        order = [key for key, _, _ in LEGAL_PERSPECTIVES]
+        titles = {key: title for key, title, _ in LEGAL_PERSPECTIVES}
+        buffers: Dict[str, List[str]] = {key: [] for key in order}
+        finished = set()
+        current = 0
+
+        yield f"1. **{titles[order[0]]}**: "
+        for key, delta in events:
+            if delta is None:
+                finished.add(key)
+            elif key == order[current]:
+                yield delta
+            else:
+                buffers[key].append(delta)
+
+            # Move past every finished section, flushing what the next one buffered
+            while current < len(order) and order[current] in finished:
+                current += 1
+                if current < len(order):
+                    yield f"\n\n{current + 1}. **{titles[order[current]]}**: "
+                    yield "".join(buffers[order[current]])
+                    buffers[order[current]].clear()
+
+    def generate_map_reduce(
+            self,
+            query: str,
+            retrieved_chunks: List[str],
+            template_type: Optional[str] = None,
+            scores: Optional[List[float]] = None,
+            references: Optional[List[str]] = None
+    ) -> Dict[str, Any]:
+        """Generate an answer from all chunks by summarizing batches, then synthesizing.
+
+        Chunks are grouped into batches that each fit the map budget. Every
+        batch is reduced to cited notes by a concurrent map call, and a final
+        call renders the selected template over the collected notes.
+
+        Args:
+            query: User query
+            retrieved_chunks: List of relevant text chunks
+            template_type: Template used for the reduce step (overrides default)
+            scores: Relevance score per chunk, used to order the batches
+            references: Source reference per chunk, kept as citation tags
+
+        Returns:
+            Dictionary containing answer, metadata and "map_reduce" timings
+        """
+        if not retrieved_chunks:
+            return self._no_context_result(template_type)
+
+        notes, stats = self._map_phase(query, retrieved_chunks, scores, references)
+        if not notes:
+            result = self._no_context_result(template_type)
+            result["map_reduce"] = stats
+            return result
+        prompt, template_used, packed, prompt_tokens = self._build_prompt(query, notes, template_type, None)
+        result = self._context_metadata(template_used, packed, prompt_tokens)
+        llm = self._model_for(result, template_used, query, packed.tokens_used)
+
+        start = time.perf_counter()
+        with tracing.span("generation", phase="reduce", **self._generation_attributes(result)):
+            answer = llm.generate(prompt, temperature=self.temperature)
+        stats["reduce_seconds"] = round(time.perf_counter() - start, 3)
+
+        result.update({"answer": answer, "generation_mode": "map_reduce", "map_reduce": stats})
+        return result
+
+    def generate_map_reduce_stream(
+            self,
+            query: str,
+            retrieved_chunks: List[str],
+            template_type: Optional[str] = None,
+            scores: Optional[List[float]] = None,
+            references: Optional[List[str]] = None
+    ) -> Dict[str, Any]:
+        """Streaming variant of `generate_map_reduce`.
 
+        The map phase runs when "answer_stream" is first iterated, and the
+        reduce call is streamed. Context metadata and "map_reduce" timings
+        are filled in as the phases complete.
+
+        Args:
+            query: User query
+            retrieved_chunks: List of relevant text chunks
+            template_type: Template used for the reduce step (overrides default)
+            scores: Relevance score per chunk, used to order the batches
+            references: Source reference per chunk, kept as citation tags
+
+        Returns:
+            Dictionary containing the answer stream and metadata
+        """
+        if not retrieved_chunks:
+            result = self._no_context_result(template_type)
+            result["answer_stream"] = iter([result["answer"]])
+            return result
+
+        result = {
+            "answer": "",
+            "has_context": True,
+            "template_used": template_type or self.default_template_type,
+            "generation_mode": "map_reduce",
+        }
+
+        # The body runs in the consumer's context; spans hang off the caller's span
+        parent = tracing.current_span()
+
+        def stream() -> Iterator[str]:
+            with tracing.resume(parent):
+                notes, stats = self._map_phase(query, retrieved_chunks, scores, references)
+                result["map_reduce"] = stats
+                if notes:
+                    prompt, _, packed, prompt_tokens = self._build_prompt(query, notes, template_type, None)
+            if not notes:
+                result.update(self._no_context_result(template_type))
+                yield result["answer"]
+                return
+            result.update(self._context_metadata(result["template_used"], packed, prompt_tokens))
+            llm = self._model_for(result, result["template_used"], query, packed.tokens_used)
+
+            start = time.perf_counter()
+            parts = []
+            span = tracing.child_span(
+                parent, "generation", phase="reduce", stream=True, **self._generation_attributes(result)
+            )
+            try:
+                for delta in llm.generate_stream(prompt, temperature=self.temperature):
+                    parts.append(delta)
+                    yield delta
+            finally:
+                span.end()
+            stats["reduce_seconds"] = round(time.perf_counter() - start, 3)
+            result["answer"] = "".join(parts)
+
+        result["answer_stream"] = stream()
+        return result
+
+    def _map_batches(
+            self,
+            chunks: List[str],
+            scores: Optional[List[float]],
+            references: Optional[List[str]]
+    ) -> List[str]:
+        """Tag chunks with their source and group them, by rank, into budget-sized batches."""
+        counter = self.context_packer.token_counter
+        separator = self.context_packer.separator
+        separator_tokens = counter.count(separator)
+        order = range(len(chunks))
+        if scores is not None:
+            order = sorted(order, key=lambda i: scores[i], reverse=True)
+
+        batches, current, used = [], [], 0
+        for i in order:
+            reference = references[i] if references else f"chunk {i + 1}"
+            text = f"[Source {i + 1}: {reference}]\n{chunks[i]}"
+            tokens = counter.count(text)
+            if tokens > self.map_batch_tokens:
+                text = counter.truncate(text, self.map_batch_tokens)
+                tokens = self.map_batch_tokens
+            if current and used + separator_tokens + tokens > self.map_batch_tokens:
+                batches.append(separator.join(current))
+                current, used = [], 0
+            used += tokens + (separator_tokens if current else 0)
+            current.append(text)
+        if current:
+            batches.append(separator.join(current))
+        return batches
+
+    def _map_phase(
+            self,
+            query: str,
+            chunks: List[str],
+            scores: Optional[List[float]],
+            references: Optional[List[str]]
+    ) -> Tuple[List[str], Dict[str, Any]]:
+        """Run the map calls concurrently and return the relevant notes, in batch order."""
+        batches = self._map_batches(chunks, scores, references)
+        map_route: Dict[str, Any] = {}
+        llm = self._model_for(map_route, "map", query, self.map_batch_tokens)
+
+        def summarize(batch: str) -> str:
+            prompt = compile_template(MAP_TEMPLATE).render(context=batch, query=query)
+            with tracing.span("map_call", model=map_route["model_used"]):
+                return llm.generate(prompt, temperature=self.temperature, max_tokens=self.map_max_tokens)
+
+        start = time.perf_counter()
+        with tracing.span("map", batches=len(batches)) as span, \
+                ThreadPoolExecutor(max_workers=max(1, min(self.max_parallel_map, len(batches)))) as pool:
+            outputs = list(pool.map(tracing.bind(summarize), batches))
+            span.set(batches_relevant=sum(
+                1 for note in outputs if note and not note.strip().startswith(MAP_NO_INFORMATION)
+            ))
+        map_seconds = time.perf_counter() - start
+
+        notes = [note.strip() for note in outputs if note and not note.strip().startswith(MAP_NO_INFORMATION)]
+        return notes, {
+            "batches": len(batches),
+            "batches_relevant": len(notes),
+            "map_model": map_route["model_used"],
+            "map_seconds": round(map_seconds, 3),
+        }
+
+    def _model_for(
+            self,
+            result: Dict[str, Any],
+            template_used: str,
+            query: str,
+            context_tokens: int
+    ) -> LanguageModel:
+        """Pick the model for a call and record the choice in `result`."""
+        if self.router is None:
+            result["model_used"] = getattr(self.llm, "model_name", type(self.llm).__name__)
+            result["route"] = None
+            return self.llm
+        llm = self.router.route(template_used, query, context_tokens)
+        result["model_used"] = llm.model_name
+        result["route"] = llm.route.name
+        return llm
+
+    def model_signature(self) -> str:
+        """Describe which model(s) can answer, for answer cache keys."""
+        if self.router is not None:
+            return self.router.signature()
+        return getattr(self.llm, "model_name", type(self.llm).__name__)
+
+    def _no_context_result(self, template_type: Optional[str]) -> Dict[str, Any]:
+        return {
+            "answer": "I don't have enough information to answer this question.",
+            "has_context": False,
+            "template_used": template_type or self.default_template_type
+        }
+
+    def _build_prompt(
+            self,
+            query: str,
+            retrieved_chunks: List[str],
+            template_type: Optional[str],
+            custom_template: Optional[str],
+            scores: Optional[List[float]] = None
+    ) -> Tuple[str, str, PackedContext, int]:
+        """Select the template, pack the context and render the prompt.
+
+        Returns:
+            Tuple of (prompt, template_used, packed context, prompt tokens)
+        """
         # Select the appropriate template
         if custom_template:
-            template = custom_template
+            compiled = compile_template(custom_template).require("context", "query")
             template_used = "custom"
         else:
             template_used = template_type or self.default_template_type
-            template = get_template(template_used)
+            compiled = get_compiled_template(template_used)
 
-        # Prepare context by combining chunks
-        context = self._prepare_context(retrieved_chunks)
+        # Prepare context by packing the most relevant chunks into what the template leaves free
+        packed = self._prepare_context(retrieved_chunks, scores, self._context_budget(compiled, query=query))
 
-        # Format the prompt template
-        prompt = format_template(template, context=context, query=query)
+        # Render the prompt template
+        with tracing.span("prompt_rendering", template=template_used) as span:
+            prompt = compiled.render(context=packed.context, query=query)
+            prompt_tokens = self._prompt_tokens(compiled, packed, query=query)
+            span.set(prompt_tokens=prompt_tokens)
+        return prompt, template_used, packed, prompt_tokens
 
-        # Generate answer using LLM
-        answer = self.llm.generate(prompt, temperature=self.temperature)
+    def _prompt_tokens(self, compiled: CompiledTemplate, packed: PackedContext, **values: Any) -> int:
+        """Prompt size from cached counts: static text, the given slot values and the context."""
+        counter = self.context_packer.token_counter
+        return (
+            compiled.static_tokens(counter)
+            + sum(counter.count(str(value)) for value in values.values())
+            + packed.tokens_used
+        )
+
+    def _context_budget(self, compiled: CompiledTemplate, **values: Any) -> int:
+        """Context token budget, tightened to fit max_prompt_tokens if one is set."""
+        budget = self.context_packer.max_tokens
+        if self.max_prompt_tokens is not None:
+            available = compiled.slot_budget(self.context_packer.token_counter, self.max_prompt_tokens, **values)
+            budget = min(budget, available)
+        return budget
 
+    @staticmethod
+    def _context_metadata(
+            template_used: str,
+            packed: PackedContext,
+            prompt_tokens: Optional[int] = None
+    ) -> Dict[str, Any]:
         return {
-            "answer": answer,
+            "answer": None,
             "has_context": True,
             "template_used": template_used,
-            "context_char_count": len(context),
-            "chunks_used": len(retrieved_chunks)
+            "context_char_count": len(packed.context),
+            "context_tokens": packed.tokens_used,
+            "context_tokens_dropped": packed.tokens_dropped,
+            "chunks_used": packed.chunks_used,
+            "chunks_dropped": packed.chunks_dropped,
+            "context_truncated": packed.split_chunk,
+            "prompt_tokens": prompt_tokens,
+            "context_chunk_indices": list(packed.selected_indices),
         }
 
-    def _prepare_context(self, chunks: List[str]) -> str:
-        """Prepare and potentially trim context to fit within token limits.
+    @staticmethod
+    def _collect_stream(result: Dict[str, Any], stream: Iterator[str], span=tracing.NOOP_SPAN) -> Iterator[str]:
+        """Pass deltas through while accumulating the full answer into `result`."""
+        parts = []
+        try:
+            for delta in stream:
+                parts.append(delta)
+                yield delta
+        finally:
+            span.set(answer_chars=sum(len(part) for part in parts))
+            span.end()
+        result["answer"] = "".join(parts)
+
+    @staticmethod
+    def _generation_attributes(result: Dict[str, Any]) -> Dict[str, Any]:
+        """Span attributes describing a generation call."""
+        attributes = {
+            "model": result.get("model_used"),
+            "route": result.get("route"),
+            "prompt_tokens": result.get("prompt_tokens"),
+            "context_tokens": result.get("context_tokens"),
+        }
+        return {key: value for key, value in attributes.items() if value is not None}
+
+    def _prepare_context(
+            self,
+            chunks: List[str],
+            scores: Optional[List[float]] = None,
+            max_tokens: Optional[int] = None
+    ) -> PackedContext:
+        """Pack the most relevant chunks into the context token budget.
 
         Args:
             chunks: List of text chunks
+            scores: Relevance score per chunk (defaults to list order)
+            max_tokens: Override of the packer's budget
 
         Returns:
-            Combined context string
+            Packed context with token accounting
         """
-        # Simple concat with separator
-        context = "\n\n---\n\n".join(chunks)
+        with tracing.span("context_packing", chunks_in=len(chunks)) as span:
+            packed = self.context_packer.pack(chunks, scores, max_tokens)
 
-        # If context is too long, truncate it
-        if len(context) > self.max_context_length:
-            context = context[:self.max_context_length] + "..."
+            # Honor the legacy character cap if one was configured
+            if self.max_context_length and len(packed.context) > self.max_context_length:
+                packed.context = packed.context[:self.max_context_length] + "..."
+                packed.split_chunk = True
 
-        return context
+            span.set(chunks_out=packed.chunks_used, context_tokens=packed.tokens_used)
+        return packed
 
 
 # Integration example
@@ -107,6 +701,12 @@ class RAGPipeline:
             retriever,
             answer_generator: AnswerGenerator,
             default_top_k: int = 25,
+            answer_cache: Optional[AnswerCache] = None,
+            compressor: Optional[ExtractiveCompressor] = None,
+            speculative: bool = False,
+            speculation_threshold: float = 0.8,
+            use_async: bool = False,
+            tracer: Optional[Tracer] = None,
     ):
         """Initialize the RAG pipeline.
 
@@ -114,10 +714,26 @@ class RAGPipeline:
             retriever: Document retriever instance
             answer_generator: Answer generator instance
             default_top_k: Default number of documents to retrieve
+            answer_cache: Optional cache of complete answers
+            compressor: Optional extractive compression stage before generation
+            speculative: Start generating from the vector-search ranking while
+                reranking runs, keeping the answer if the reranked context agrees
+            speculation_threshold: Overlap between the speculative and reranked
+                context chunks needed to keep the speculative answer
+            use_async: Serve `process_query` and `prepare_context` through the
+                async task graph, run on a shared background event loop
+            tracer: Per-stage latency tracer (defaults to the environment-configured one)
         """
         self.retriever = retriever
         self.answer_generator = answer_generator
         self.default_top_k = default_top_k
+        self.answer_cache = answer_cache
+        self.compressor = compressor
+        self.speculative = speculative
+        self.speculation_threshold = speculation_threshold
+        self.speculation_stats = SpeculationStats()
+        self.use_async = use_async
+        self.tracer = tracer or get_tracer()
 
     def process_query(
             self,
@@ -126,6 +742,8 @@ class RAGPipeline:
             use_query_expansion: bool = False,
             rerank_results: bool = True,
             template_type: Optional[str] = None,
+            use_compression: bool = True,
+            generation_mode: str = "single",
     ) -> Dict[str, Any]:
         """Process a query through the complete RAG pipeline.
 
@@ -135,25 +753,1110 @@ class RAGPipeline:
             use_query_expansion: Whether to expand the query
             rerank_results: Whether to rerank results
             template_type: Type of prompt template to use
+            use_compression: Whether to compress chunks (if a compressor is configured)
+            generation_mode: "single" for one LLM call, "perspectives" to generate
+                the legal_assistant sections concurrently, or "map_reduce" to
+                summarize all chunks in parallel batches before answering
 
         Returns:
             Dictionary with answer, retrieved documents, and metadata
         """
-        # Retrieve relevant documents
-        retrieved_chunks, sources = self.retriever.retrieve(
+        if self.use_async:
+            return run_sync(self.process_query_async(
+                query, top_k, use_query_expansion, rerank_results, template_type, use_compression, generation_mode
+            ))
+
+        trace = self._start_trace("process_query", template_type, generation_mode, top_k)
+        with tracing.activate(trace):
+            result = self._process_query(
+                query, top_k, use_query_expansion, rerank_results, template_type, use_compression,
+                generation_mode, stream=False
+            )
+        return self._with_timings(result, trace)
+
+    def process_query_stream(
+            self,
+            query: str,
+            top_k: Optional[int] = None,
+            use_query_expansion: bool = False,
+            rerank_results: bool = True,
+            template_type: Optional[str] = None,
+            use_compression: bool = True,
+            generation_mode: str = "single",
+    ) -> Dict[str, Any]:
+        """Streaming variant of `process_query`.
+
+        Retrieval runs eagerly, so sources can be shown as soon as this
+        returns; the answer is produced lazily through "answer_stream".
+
+        Args:
+            query: User query
+            top_k: Number of documents to retrieve
+            use_query_expansion: Whether to expand the query
+            rerank_results: Whether to rerank results
+            template_type: Type of prompt template to use
+            use_compression: Whether to compress chunks (if a compressor is configured)
+            generation_mode: "single" for one LLM call, "perspectives" to generate
+                the legal_assistant sections concurrently, or "map_reduce" to
+                summarize all chunks in parallel batches before answering
+
+        Returns:
+            Dictionary with an answer stream, retrieved documents, and metadata
+        """
+        trace = self._start_trace("process_query_stream", template_type, generation_mode, top_k)
+        with tracing.activate(trace):
+            result = self._process_query(
+                query, top_k, use_query_expansion, rerank_results, template_type, use_compression,
+                generation_mode, stream=True
+            )
+        return self._with_timings(result, trace)
+
+    def _process_query(
+            self,
+            query: str,
+            top_k: Optional[int],
+            use_query_expansion: bool,
+            rerank_results: bool,
+            template_type: Optional[str],
+            use_compression: bool,
+            generation_mode: str,
+            stream: bool,
+    ) -> Dict[str, Any]:
+        generation_mode = self._resolve_generation_mode(generation_mode, template_type)
+        cache_params = self._cache_params(
+            top_k, use_query_expansion, rerank_results, template_type, use_compression, generation_mode
+        )
+        cached, query_embedding = self._cache_lookup(query, cache_params)
+        if cached is not None:
+            return stream_cached(cached) if stream else cached
+
+        prepared = self.prepare_context(
+            query, top_k, use_query_expansion, rerank_results, use_compression, query_embedding,
+            speculate_template=self._speculation_target(template_type, generation_mode)
+        )
+        return self._answer(prepared, template_type, generation_mode, cache_params, stream=stream)
+
+    def _start_trace(
+            self,
+            name: str,
+            template_type: Optional[str] = None,
+            generation_mode: Optional[str] = None,
+            top_k: Optional[int] = None,
+    ):
+        """Start a request trace, unless this call is already part of one."""
+        if tracing.current_span() is not None:
+            return None
+        return self.tracer.start_trace(
+            name,
+            template_type=template_type or self.answer_generator.default_template_type,
+            generation_mode=generation_mode or "single",
+            top_k=top_k or self.default_top_k,
+        )
+
+    def _with_timings(self, result: Dict[str, Any], trace) -> Dict[str, Any]:
+        """Attach a trace's timing breakdown to a result and finish the trace.
+
+        For streamed results the trace finishes when the stream is exhausted,
+        and "timings" is filled in at that point.
+        """
+        if trace is None:
+            return result
+        streams = [key for key in ("answer_stream", "section_stream") if key in result]
+        for key in streams:
+            result[key] = self._finish_trace_when_done(result[key], trace)
+        if not streams:
+            trace.finish()
+        if trace.sampled:
+            result["timings"] = trace.timings
+        return result
+
+    @staticmethod
+    def _finish_trace_when_done(stream: Iterator[Any], trace) -> Iterator[Any]:
+        try:
+            yield from stream
+        finally:
+            trace.finish()
+
+    def process_query_multi(
+            self,
+            query: str,
+            template_types: List[str],
+            top_k: Optional[int] = None,
+            use_query_expansion: bool = False,
+            rerank_results: bool = True,
+            use_compression: bool = True,
+            generation_mode: str = "single",
+            prepared: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Dict[str, Any]]:
+        """Answer one query with several templates from a single retrieval.
+
+        Cached answers are served first; retrieval only runs if some template
+        still needs generating, and the remaining answers are generated
+        concurrently over the same retrieved context.
+
+        Args:
+            query: User query
+            template_types: Prompt template types to answer with
+            top_k: Number of documents to retrieve
+            use_query_expansion: Whether to expand the query
+            rerank_results: Whether to rerank results
+            use_compression: Whether to compress chunks (if a compressor is configured)
+            generation_mode: Generation mode applied to every template
+            prepared: Result of an earlier `prepare_context` call to reuse
+
+        Returns:
+            Dictionary mapping each template type to its result
+        """
+        trace = self._start_trace("process_query_multi", ",".join(template_types), generation_mode, top_k)
+        with tracing.activate(trace):
+            results = self._process_query_multi(
+                query, template_types, top_k, use_query_expansion, rerank_results, use_compression,
+                generation_mode, prepared
+            )
+        if trace is not None:
+            trace.finish()
+            for result in results.values():
+                if trace.sampled:
+                    result["timings"] = trace.timings
+        return results
+
+    def _process_query_multi(
+            self,
+            query: str,
+            template_types: List[str],
+            top_k: Optional[int],
+            use_query_expansion: bool,
+            rerank_results: bool,
+            use_compression: bool,
+            generation_mode: str,
+            prepared: Optional[Dict[str, Any]],
+    ) -> Dict[str, Dict[str, Any]]:
+        if prepared is not None:
+            # The reused retrieval decides the retrieval parameters
+            params = prepared["params"]
+            top_k, use_query_expansion = params["top_k"], params["use_query_expansion"]
+            rerank_results, use_compression = params["rerank_results"], params["use_compression"]
+
+        results: Dict[str, Dict[str, Any]] = {}
+        missing: Dict[str, Tuple[str, Dict[str, Any]]] = {}
+        query_embedding = prepared["query_embedding"] if prepared else None
+        for template_type in template_types:
+            mode = self._resolve_generation_mode(generation_mode, template_type)
+            cache_params = self._cache_params(
+                top_k, use_query_expansion, rerank_results, template_type, use_compression, mode
+            )
+            cached, query_embedding = self._cache_lookup(query, cache_params, query_embedding)
+            if cached is not None:
+                results[template_type] = cached
+            else:
+                missing[template_type] = (mode, cache_params)
+
+        if not missing:
+            return results
+
+        if prepared is None:
+            prepared = self.prepare_context(
+                query, top_k, use_query_expansion, rerank_results, use_compression, query_embedding
+            )
+        with ThreadPoolExecutor(max_workers=len(missing)) as pool:
+            futures = {
+                template_type: pool.submit(
+                    tracing.bind(self._answer), prepared, template_type, mode, cache_params, False
+                )
+                for template_type, (mode, cache_params) in missing.items()
+            }
+        for template_type, future in futures.items():
+            results[template_type] = future.result()
+        return {template_type: results[template_type] for template_type in template_types}
+
+    def prepare_context(
+            self,
+            query: str,
+            top_k: Optional[int] = None,
+            use_query_expansion: bool = False,
+            rerank_results: bool = True,
+            use_compression: bool = True,
+            query_embedding: Optional[List[float]] = None,
+            speculate_template: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """Run retrieval and compression once, for reuse across templates.
+
+        The returned dictionary can be kept (e.g. in a UI session) and passed
+        to `answer_from_context` so that switching template only costs the
+        generation step.
+
+        Args:
+            query: User query
+            top_k: Number of documents to retrieve
+            use_query_expansion: Whether to expand the query
+            rerank_results: Whether to rerank results
+            use_compression: Whether to compress chunks (if a compressor is configured)
+            query_embedding: Precomputed embedding of the raw query, if any
+            speculate_template: Template to start generating with while reranking
+                runs (only used when the pipeline is speculative)
+
+        Returns:
+            Dictionary with the retrieval result, the chunks to generate from,
+            compression stats and the parameters that produced them
+        """
+        trace = self._start_trace("prepare_context", speculate_template, None, top_k)
+        with tracing.activate(trace):
+            prepared = self._prepare(
+                query, top_k, use_query_expansion, rerank_results, use_compression, query_embedding,
+                speculate_template
+            )
+        if trace is not None:
+            # Finished by `answer_from_context`, so retrieval and generation share one trace
+            prepared["trace"] = trace
+        return prepared
+
+    def _prepare(
+            self,
+            query: str,
+            top_k: Optional[int],
+            use_query_expansion: bool,
+            rerank_results: bool,
+            use_compression: bool,
+            query_embedding: Optional[List[float]],
+            speculate_template: Optional[str],
+    ) -> Dict[str, Any]:
+        speculate = (speculate_template and self.speculative and rerank_results
+                     and getattr(self.retriever, "reranker", None))
+        if self.use_async and not speculate:
+            return run_sync(self.aprepare_context(
+                query, top_k, use_query_expansion, rerank_results, use_compression, query_embedding
+            ))
+
+        speculative = None
+        if speculate:
+            retrieval, speculative = self._retrieve_speculative(
+                query, top_k, use_query_expansion, use_compression, query_embedding, speculate_template
+            )
+        else:
+            retrieval = self.retrieve_context(
+                query, top_k, use_query_expansion, rerank_results, query_embedding=query_embedding
+            )
+        chunks, compression = self._compress(query, retrieval, use_compression, query_embedding)
+        prepared = self._prepared(
+            query, retrieval, chunks, compression, query_embedding,
+            top_k, use_query_expansion, rerank_results, use_compression
+        )
+        if speculative is not None:
+            attach_speculation(prepared, speculative)
+        return prepared
+
+    @staticmethod
+    def _prepared(
+            query: str,
+            retrieval: Dict[str, Any],
+            chunks: List[str],
+            compression: Optional[Dict[str, Any]],
+            query_embedding: Optional[List[float]],
+            top_k: Optional[int],
+            use_query_expansion: bool,
+            rerank_results: bool,
+            use_compression: bool,
+    ) -> Dict[str, Any]:
+        return {
+            "query": query,
+            "retrieval": retrieval,
+            "chunks": chunks,
+            "compression": compression,
+            "query_embedding": query_embedding,
+            "params": {
+                "top_k": top_k,
+                "use_query_expansion": use_query_expansion,
+                "rerank_results": rerank_results,
+                "use_compression": use_compression,
+            },
+        }
+
+    async def process_query_async(
+            self,
+            query: str,
+            top_k: Optional[int] = None,
+            use_query_expansion: bool = False,
+            rerank_results: bool = True,
+            template_type: Optional[str] = None,
+            use_compression: bool = True,
+            generation_mode: str = "single",
+    ) -> Dict[str, Any]:
+        """Async variant of `process_query`, run as a small task graph.
+
+        Independent stages run concurrently (query expansion alongside the
+        raw-query search) and each dependent stage starts as soon as its
+        inputs resolve: merge, rerank, compression, then generation.
+        Cancelling the returned coroutine cancels every in-flight stage.
+
+        Args:
+            query: User query
+            top_k: Number of documents to retrieve
+            use_query_expansion: Whether to expand the query
+            rerank_results: Whether to rerank results
+            template_type: Type of prompt template to use
+            use_compression: Whether to compress chunks (if a compressor is configured)
+            generation_mode: "single", "perspectives" or "map_reduce"
+
+        Returns:
+            Dictionary with answer, retrieved documents, and metadata
+        """
+        trace = self._start_trace("process_query", template_type, generation_mode, top_k)
+        with tracing.activate(trace):
+            result = await self._process_query_async(
+                query, top_k, use_query_expansion, rerank_results, template_type, use_compression,
+                generation_mode
+            )
+        return self._with_timings(result, trace)
+
+    async def _process_query_async(
+            self,
+            query: str,
+            top_k: Optional[int],
+            use_query_expansion: bool,
+            rerank_results: bool,
+            template_type: Optional[str],
+            use_compression: bool,
+            generation_mode: str,
+    ) -> Dict[str, Any]:
+        generation_mode = self._resolve_generation_mode(generation_mode, template_type)
+        cache_params = self._cache_params(
+            top_k, use_query_expansion, rerank_results, template_type, use_compression, generation_mode
+        )
+        query_embedding = None
+        if self.answer_cache is not None and self.answer_cache.semantic_threshold is not None:
+            with tracing.span("embedding", texts=1):
+                query_embedding = await self.retriever.embedding_model.aembed_query(query)
+        cached, query_embedding = self._cache_lookup(query, cache_params, query_embedding)
+        if cached is not None:
+            return cached
+
+        return await self._aprocess(
+            query, top_k, use_query_expansion, rerank_results, template_type, use_compression,
+            generation_mode, cache_params, query_embedding
+        )
+
+    async def _aprocess(
+            self,
+            query: str,
+            top_k: Optional[int],
+            use_query_expansion: bool,
+            rerank_results: bool,
+            template_type: Optional[str],
+            use_compression: bool,
+            generation_mode: str,
+            cache_params: Dict[str, Any],
+            query_embedding: Optional[List[float]] = None,
+            rerank_limit: Optional[asyncio.Semaphore] = None,
+            call_type: str = "generation",
+    ) -> Dict[str, Any]:
+        """Retrieve, compress, generate and cache one answer (after a cache miss)."""
+        prepared = await self.aprepare_context(
+            query, top_k, use_query_expansion, rerank_results, use_compression, query_embedding,
+            rerank_limit=rerank_limit
+        )
+        if generation_mode == "single":
+            result = await self.answer_generator.agenerate_answer(
+                query=query,
+                retrieved_chunks=prepared["chunks"],
+                template_type=template_type,
+                scores=self._chunk_scores(prepared["retrieval"]["sources"]),
+                call_type=call_type
+            )
+        else:
+            # Fan-out modes manage their own concurrency on worker threads
+            result = await asyncio.to_thread(
+                self._generate, query, prepared["chunks"], prepared["retrieval"],
+                template_type, generation_mode, False
+            )
+        return self._finish(prepared, result, cache_params, stream=False)
+
+    def process_queries(
+            self,
+            queries: List[str],
+            top_k: Optional[int] = None,
+            use_query_expansion: bool = False,
+            rerank_results: bool = True,
+            template_type: Optional[str] = None,
+            use_compression: bool = True,
+            generation_mode: str = "single",
+            max_concurrency: int = 8,
+            max_concurrent_reranks: int = 4,
+            embed_batch_size: int = 64,
+            progress_path: Optional[str] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """Answer many queries, yielding each result as soon as it completes.
+
+        Queries are embedded in batched calls, their vector searches run
+        concurrently, reranking is capped at `max_concurrent_reranks` calls
+        and generation goes through the shared rate limiter behind
+        interactive traffic. Results arrive in completion order and carry
+        "index" (position in `queries`); a query that fails yields a result
+        with "error" instead of stopping the run.
+
+        With `progress_path`, every finished result is appended to a JSONL
+        file. Re-running with the same file yields the stored results first
+        (marked "resumed") and only answers the remaining queries; a file
+        written with other answer parameters is refused.
+
+        Args:
+            queries: User queries
+            top_k: Number of documents to retrieve per query
+            use_query_expansion: Whether to expand the queries
+            rerank_results: Whether to rerank results
+            template_type: Type of prompt template to use
+            use_compression: Whether to compress chunks (if a compressor is configured)
+            generation_mode: "single", "perspectives" or "map_reduce"
+            max_concurrency: Queries in flight at once
+            max_concurrent_reranks: Rerank calls in flight at once
+            embed_batch_size: Queries per embedding call
+            progress_path: JSONL file recording finished results
+
+        Returns:
+            Iterator of result dictionaries
+
+        Raises:
+            ValueError: If `progress_path` holds results for other parameters
+        """
+        results: "queue.Queue[Any]" = queue.Queue()
+        done = object()
+
+        async def produce():
+            try:
+                async for result in self.aprocess_queries(
+                    queries, top_k, use_query_expansion, rerank_results, template_type,
+                    use_compression, generation_mode, max_concurrency, max_concurrent_reranks,
+                    embed_batch_size, progress_path
+                ):
+                    results.put(result)
+            except Exception as e:
+                results.put(e)
+            finally:
+                results.put(done)
+
+        future = get_event_loop_thread().submit(produce())
+        try:
+            while True:
+                item = results.get()
+                if item is done:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            # A consumer that stops early cancels the queries still in flight
+            future.cancel()
+
+    async def aprocess_queries(
+            self,
+            queries: List[str],
+            top_k: Optional[int] = None,
+            use_query_expansion: bool = False,
+            rerank_results: bool = True,
+            template_type: Optional[str] = None,
+            use_compression: bool = True,
+            generation_mode: str = "single",
+            max_concurrency: int = 8,
+            max_concurrent_reranks: int = 4,
+            embed_batch_size: int = 64,
+            progress_path: Optional[str] = None,
+    ):
+        """Async generator behind `process_queries` (same arguments and results)."""
+        generation_mode = self._resolve_generation_mode(generation_mode, template_type)
+        cache_params = self._cache_params(
+            top_k, use_query_expansion, rerank_results, template_type, use_compression, generation_mode
+        )
+        progress = BatchProgress(progress_path, cache_params)
+        pending = []
+        for index, query in enumerate(queries):
+            if progress.is_done(index, query):
+                yield {**progress.completed[index]["result"], "index": index, "query": query, "resumed": True}
+            else:
+                pending.append((index, query))
+        if not pending:
+            progress.close()
+            return
+
+        # One embedding call per batch of queries instead of one per query
+        batches = list(iter_batches(pending, embed_batch_size))
+
+        async def embed(batch: List[Tuple[int, str]]):
+            try:
+                return await self.retriever.embedding_model.aembed_documents([query for _, query in batch]), None
+            except Exception as e:
+                logger.warning(f"Embedding batch of queries {batch[0][0]}-{batch[-1][0]} failed: {e}")
+                return None, e
+
+        with tracing.span("embedding", texts=len(pending), batches=len(batches)):
+            embedded = await gather_cancelling(*(embed(batch) for batch in batches))
+
+        # A failed embedding call only fails the queries in its batch
+        embeddable = []
+        for batch, (vectors, error) in zip(batches, embedded):
+            if error is not None:
+                for index, query in batch:
+                    yield {"index": index, "query": query, "error": str(error)}
+            else:
+                embeddable.extend(zip(batch, vectors))
+
+        query_limit = asyncio.Semaphore(max_concurrency)
+        rerank_limit = asyncio.Semaphore(max_concurrent_reranks)
+
+        async def answer(index: int, query: str, query_embedding: List[float]) -> Dict[str, Any]:
+            async with query_limit:
+                trace = self._start_trace("process_queries", template_type, generation_mode, top_k)
+                with tracing.activate(trace):
+                    cached, _ = self._cache_lookup(query, cache_params, query_embedding)
+                    if cached is not None:
+                        result = cached
+                    else:
+                        result = await self._aprocess(
+                            query, top_k, use_query_expansion, rerank_results, template_type, use_compression,
+                            generation_mode, cache_params, query_embedding,
+                            rerank_limit=rerank_limit, call_type="batch_generation"
+                        )
+                return self._with_timings(result, trace)
+
+        async def run(index: int, query: str, query_embedding: List[float]):
+            try:
+                return index, query, await answer(index, query, query_embedding), None
+            except Exception as e:
+                logger.warning(f"Batch query {index} failed: {e}")
+                return index, query, None, e
+
+        tasks = [
+            asyncio.ensure_future(run(index, query, embedding))
+            for (index, query), embedding in embeddable
+        ]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                index, query, result, error = await next_done
+                if error is not None:
+                    yield {"index": index, "query": query, "error": str(error)}
+                    continue
+                progress.record(index, query, result)
+                yield {**result, "index": index}
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+            progress.close()
+
+    async def aprepare_context(
+            self,
+            query: str,
+            top_k: Optional[int] = None,
+            use_query_expansion: bool = False,
+            rerank_results: bool = True,
+            use_compression: bool = True,
+            query_embedding: Optional[List[float]] = None,
+            rerank_limit: Optional[asyncio.Semaphore] = None,
+    ) -> Dict[str, Any]:
+        """Async variant of `prepare_context` (without speculation)."""
+        if query_embedding is None and use_compression and self.compressor:
+            # Compression needs the raw query embedding too; compute it once for both stages
+            with tracing.span("embedding", texts=1):
+                query_embedding = await self.retriever.embedding_model.aembed_query(query)
+
+        retrieval = await self.aretrieve_context(
+            query, top_k, use_query_expansion, rerank_results, query_embedding=query_embedding,
+            rerank_limit=rerank_limit
+        )
+        chunks, compression = await asyncio.to_thread(
+            self._compress, query, retrieval, use_compression, query_embedding
+        )
+        return self._prepared(
+            query, retrieval, chunks, compression, query_embedding,
+            top_k, use_query_expansion, rerank_results, use_compression
+        )
+
+    async def aretrieve_context(
+            self,
+            query: str,
+            top_k: Optional[int] = None,
+            use_query_expansion: bool = False,
+            rerank_results: bool = True,
+            query_embedding: Optional[List[float]] = None,
+            rerank_limit: Optional[asyncio.Semaphore] = None,
+    ) -> Dict[str, Any]:
+        """Async variant of `retrieve_context`."""
+        retrieved_chunks, sources = await self.retriever.aretrieve(
             query=query,
             top_k=top_k or self.default_top_k,
             use_query_expansion=use_query_expansion,
-            rerank_results=rerank_results
+            rerank_results=rerank_results,
+            query_embedding=query_embedding,
+            rerank_limit=rerank_limit
         )
+        return self._format_retrieval(query, retrieved_chunks, sources)
 
-        # Generate answer
-        result = self.answer_generator.generate_answer(
+    def _speculation_target(self, template_type: Optional[str], generation_mode: str) -> Optional[str]:
+        """Template to speculate with; only single-call generation is speculated."""
+        if not self.speculative or generation_mode != "single":
+            return None
+        return template_type or self.answer_generator.default_template_type
+
+    def _retrieve_speculative(
+            self,
+            query: str,
+            top_k: Optional[int],
+            use_query_expansion: bool,
+            use_compression: bool,
+            query_embedding: Optional[List[float]],
+            template_type: str,
+    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """Rerank while generation runs on the vector-search ranking.
+
+        Returns:
+            Tuple of (reranked retrieval, speculative result). The speculative
+            result carries its background stream under "speculative_stream"
+            only if the speculation was confirmed.
+        """
+        top_k = top_k or self.default_top_k
+        chunks, sources = self.retriever.search(query, top_k, use_query_expansion, query_embedding)
+        speculative = self._speculate(query, chunks, sources, use_compression, query_embedding, template_type)
+        return self._rerank_speculative(query, sources, top_k, speculative)
+
+    def _speculate(
+            self,
+            query: str,
+            chunks: List[str],
+            sources: List[Dict[str, Any]],
+            use_compression: bool,
+            query_embedding: Optional[List[float]],
+            template_type: str,
+    ) -> Dict[str, Any]:
+        """Start generating on the vector-search ranking, in the background."""
+        search = self._format_retrieval(query, chunks, sources)
+        search_chunks, _ = self._compress(query, search, use_compression, query_embedding)
+
+        speculative = self.answer_generator.generate_answer_stream(
             query=query,
-            retrieved_chunks=retrieved_chunks,
-            template_type=template_type
+            retrieved_chunks=search_chunks,
+            template_type=template_type,
+            scores=self._chunk_scores(sources)
+        )
+        return start_speculation(speculative, template_type)
+
+    def _rerank_speculative(
+            self,
+            query: str,
+            sources: List[Dict[str, Any]],
+            top_k: int,
+            speculative: Dict[str, Any],
+    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """Rerank while the speculative answer generates, then keep or cancel it."""
+        start = time.perf_counter()
+        reranked_chunks, reranked_sources = self.retriever.rerank(query, sources, top_k)
+        rerank_seconds = time.perf_counter() - start
+        retrieval = self._format_retrieval(query, reranked_chunks, reranked_sources)
+        speculative = confirm_speculation(
+            speculative, sources, reranked_sources, rerank_seconds,
+            self.speculation_threshold, self.speculation_stats
+        )
+        return retrieval, speculative
+
+    def _take_speculation(
+            self,
+            prepared: Dict[str, Any],
+            template_type: Optional[str],
+            generation_mode: str,
+    ) -> Optional[Dict[str, Any]]:
+        """Claim a confirmed speculative result if it matches this request."""
+        return take_speculation(prepared, self._speculation_target(template_type, generation_mode))
+
+    def answer_from_context(
+            self,
+            prepared: Dict[str, Any],
+            template_type: Optional[str] = None,
+            generation_mode: str = "single",
+            stream: bool = False,
+    ) -> Dict[str, Any]:
+        """Generate (or fetch from cache) an answer over a prepared retrieval.
+
+        Args:
+            prepared: Result of `prepare_context`
+            template_type: Type of prompt template to use
+            generation_mode: "single", "perspectives" or "map_reduce"
+            stream: Return answer streams instead of a finished answer
+
+        Returns:
+            Dictionary with answer (or answer stream), retrieved documents, and metadata
+        """
+        # Continue the trace `prepare_context` started, so one trace covers the request
+        trace = prepared.pop("trace", None) or self._start_trace(
+            "answer_from_context", template_type, generation_mode, prepared["params"]["top_k"]
+        )
+        with tracing.activate(trace):
+            result = self._answer_from_context(prepared, template_type, generation_mode, stream)
+        return self._with_timings(result, trace)
+
+    def stream_events(
+            self,
+            query: Optional[str] = None,
+            top_k: Optional[int] = None,
+            use_query_expansion: bool = False,
+            rerank_results: bool = True,
+            template_type: Optional[str] = None,
+            use_compression: bool = True,
+            generation_mode: str = "single",
+            prepared: Optional[Dict[str, Any]] = None,
+    ) -> Iterator[PipelineEvent]:
+        """Answer a query as a stream of typed progress events (see `core/events.py`).
+
+        Sources are reported straight after the vector search, before
+        reranking, and answer text as it is generated, so a client can show
+        progress long before the result is complete. Answers are cached and
+        speculated as in `process_query`. Closing the generator early stops
+        generation.
+
+        Args:
+            query: User query (taken from `prepared` if given)
+            top_k: Number of documents to retrieve
+            use_query_expansion: Whether to expand the query
+            rerank_results: Whether to rerank results
+            template_type: Type of prompt template to use
+            use_compression: Whether to compress chunks (if a compressor is configured)
+            generation_mode: "single", "perspectives" or "map_reduce"
+            prepared: Result of `prepare_context` (or of an earlier `Final`
+                event) to answer from again, skipping retrieval
+
+        Yields:
+            RetrievalStarted, SourcesReady, RerankDone (if reranking runs),
+            AnswerDelta for each piece of text, then Final
+        """
+        if prepared is not None:
+            query = prepared["query"]
+            top_k, use_query_expansion, rerank_results, use_compression = (
+                prepared["params"][key] for key in ("top_k", "use_query_expansion", "rerank_results", "use_compression")
+            )
+            trace = prepared.pop("trace", None)
+        else:
+            trace = None
+        trace = trace or self._start_trace("stream_events", template_type, generation_mode, top_k)
+        elapsed_ms = elapsed_clock()
+
+        try:
+            yield RetrievalStarted(query=query, top_k=top_k or self.default_top_k)
+            with tracing.activate(trace):
+                generation_mode = self._resolve_generation_mode(generation_mode, template_type)
+                cache_params = self._cache_params(
+                    top_k, use_query_expansion, rerank_results, template_type, use_compression, generation_mode
+                )
+                cached, query_embedding = self._cache_lookup(
+                    query, cache_params, prepared["query_embedding"] if prepared is not None else None
+                )
+                if cached is not None and prepared is not None and \
+                        self._take_speculation(prepared, template_type, generation_mode) is not None:
+                    # The cached answer wins; stop the speculative call
+                    prepared.pop("speculative_stream").cancel()
+
+            if cached is not None:
+                yield from cached_answer_events(cached, elapsed_ms)
+                result = cached
+            else:
+                if prepared is None:
+                    prepared = yield from self._retrieval_events(
+                        query, top_k, use_query_expansion, rerank_results, use_compression,
+                        query_embedding, self._speculation_target(template_type, generation_mode),
+                        trace, elapsed_ms
+                    )
+                else:
+                    yield SourcesReady(
+                        sources=prepared["retrieval"]["sources"], reranked=True, elapsed_ms=elapsed_ms()
+                    )
+
+                with tracing.activate(trace):
+                    result = self._answer(prepared, template_type, generation_mode, cache_params, stream=True)
+                yield from answer_events(result)
+
+            if trace is not None:
+                timings = trace.finish()
+                if trace.sampled:
+                    result["timings"] = timings
+            yield Final.from_result(result, prepared)
+        except Exception as e:
+            if trace is not None:
+                trace.root.set(error=type(e).__name__)
+            raise
+        finally:
+            if trace is not None:
+                trace.finish()
+
+    def _retrieval_events(
+            self,
+            query: str,
+            top_k: Optional[int],
+            use_query_expansion: bool,
+            rerank_results: bool,
+            use_compression: bool,
+            query_embedding: Optional[List[float]],
+            speculate_template: Optional[str],
+            trace,
+            elapsed_ms,
+    ) -> Iterator[PipelineEvent]:
+        """Search, report sources, rerank (speculating meanwhile) and compress; returns the prepared context."""
+        search_k = top_k or self.default_top_k
+        rerank = rerank_results and getattr(self.retriever, "reranker", None) is not None
+        with tracing.activate(trace):
+            chunks, sources = self.retriever.search(query, search_k, use_query_expansion, query_embedding)
+        yield SourcesReady(sources=sources, reranked=not rerank, elapsed_ms=elapsed_ms())
+
+        speculative = None
+        if rerank:
+            start = time.perf_counter()
+            with tracing.activate(trace):
+                if speculate_template and self.speculative:
+                    speculative = self._speculate(
+                        query, chunks, sources, use_compression, query_embedding, speculate_template
+                    )
+                    retrieval, speculative = self._rerank_speculative(query, sources, search_k, speculative)
+                else:
+                    chunks, sources = self.retriever.rerank(query, sources, search_k)
+                    retrieval = self._format_retrieval(query, chunks, sources)
+            yield RerankDone(
+                sources=retrieval["sources"],
+                rerank_ms=round((time.perf_counter() - start) * 1000, 3),
+                elapsed_ms=elapsed_ms(),
+            )
+        else:
+            retrieval = self._format_retrieval(query, chunks, sources)
+
+        with tracing.activate(trace):
+            chunks, compression = self._compress(query, retrieval, use_compression, query_embedding)
+        prepared = self._prepared(
+            query, retrieval, chunks, compression, query_embedding,
+            top_k, use_query_expansion, rerank_results, use_compression
+        )
+        if speculative is not None:
+            attach_speculation(prepared, speculative)
+        return prepared
+
+    def _answer_from_context(
+            self,
+            prepared: Dict[str, Any],
+            template_type: Optional[str],
+            generation_mode: str,
+            stream: bool,
+    ) -> Dict[str, Any]:
+        generation_mode = self._resolve_generation_mode(generation_mode, template_type)
+        cache_params = self._cache_params(
+            template_type=template_type, generation_mode=generation_mode, **prepared["params"]
         )
+        cached, _ = self._cache_lookup(prepared["query"], cache_params, prepared["query_embedding"])
+        if cached is not None:
+            if self._take_speculation(prepared, template_type, generation_mode) is not None:
+                # The cached answer wins; stop the speculative call
+                prepared.pop("speculative_stream").cancel()
+            return stream_cached(cached) if stream else cached
+        return self._answer(prepared, template_type, generation_mode, cache_params, stream)
 
+    def _answer(
+            self,
+            prepared: Dict[str, Any],
+            template_type: Optional[str],
+            generation_mode: str,
+            cache_params: Dict[str, Any],
+            stream: bool,
+    ) -> Dict[str, Any]:
+        """Generate over prepared context, attach retrieval metadata and cache the answer."""
+        query = prepared["query"]
+        result = self._take_speculation(prepared, template_type, generation_mode)
+        if result is not None:
+            prepared.pop("speculative_stream", None)
+        if result is not None and not stream:
+            for _ in result["answer_stream"]:
+                pass
+            result.pop("answer_stream")
+        elif result is None:
+            result = self._generate(
+                query, prepared["chunks"], prepared["retrieval"], template_type, generation_mode, stream
+            )
+        return self._finish(prepared, result, cache_params, stream)
+
+    def _finish(
+            self,
+            prepared: Dict[str, Any],
+            result: Dict[str, Any],
+            cache_params: Dict[str, Any],
+            stream: bool,
+    ) -> Dict[str, Any]:
+        """Attach retrieval metadata to a generated result and cache it."""
+        query, query_embedding = prepared["query"], prepared["query_embedding"]
+
+        # Add retrieval metadata and documents to result
+        result.update(prepared["retrieval"])
+        if prepared["compression"]:
+            result["compression"] = prepared["compression"]
+        if "speculation" in prepared:
+            result["speculation"] = prepared["speculation"]
+
+        if self.answer_cache is None:
+            return result
+        return self.answer_cache.put_result(query, cache_params, result, query_embedding)
+
+    def _compress(
+            self,
+            query: str,
+            retrieval: Dict[str, Any],
+            use_compression: bool,
+            query_embedding: Optional[List[float]] = None,
+    ) -> Tuple[List[str], Optional[Dict[str, Any]]]:
+        """Return the chunks to generate from, compressed if enabled, plus stats."""
+        chunks = retrieval["retrieved_chunks"]
+        if not use_compression or not self.compressor or not chunks:
+            return chunks, None
+
+        with tracing.span("compression", chunks_in=len(chunks)) as span:
+            compressed = self.compressor.compress(query, chunks, query_embedding=query_embedding)
+            span.set(chunks_out=len(compressed.chunks))
+        return compressed.chunks, compressed.stats()
+
+    def _generate(
+            self,
+            query: str,
+            chunks: List[str],
+            retrieval: Dict[str, Any],
+            template_type: Optional[str],
+            generation_mode: str,
+            stream: bool,
+    ) -> Dict[str, Any]:
+        """Dispatch to the answer generator method for the given mode."""
+        generator = self.answer_generator
+        scores = self._chunk_scores(retrieval["sources"])
+        if generation_mode == "perspectives":
+            method = generator.generate_perspectives_stream if stream else generator.generate_perspectives
+            return method(query, chunks, scores=scores)
+        if generation_mode == "map_reduce":
+            method = generator.generate_map_reduce_stream if stream else generator.generate_map_reduce
+            references = [source["reference"] for source in retrieval["sources"]]
+            return method(query, chunks, template_type=template_type, scores=scores, references=references)
+        method = generator.generate_answer_stream if stream else generator.generate_answer
+        return method(query=query, retrieved_chunks=chunks, template_type=template_type, scores=scores)
+
+    def _resolve_generation_mode(self, generation_mode: str, template_type: Optional[str]) -> str:
+        """Validate the mode; perspectives only apply to the legal_assistant template."""
+        if generation_mode not in ("single", "perspectives", "map_reduce"):
+            raise ValueError(f"Unsupported generation mode: {generation_mode}")
+        template_used = template_type or self.answer_generator.default_template_type
+        if generation_mode == "perspectives" and template_used != "legal_assistant":
+            return "single"
+        return generation_mode
+
+    @staticmethod
+    def _chunk_scores(sources: List[Dict[str, Any]]) -> List[float]:
+        """Prefer the reranker's score, falling back to vector similarity."""
+        return [source.get("rerank_score", source.get("score", 0.0)) for source in sources]
+
+    def _cache_params(
+            self,
+            top_k: Optional[int],
+            use_query_expansion: bool,
+            rerank_results: bool,
+            template_type: Optional[str],
+            use_compression: bool = True,
+            generation_mode: str = "single",
+    ) -> Dict[str, Any]:
+        """Collect every parameter that changes the answer, including the template text."""
+        template_used = template_type or self.answer_generator.default_template_type
+        template = get_template(template_used)
+        if generation_mode == "perspectives":
+            template = PERSPECTIVE_TEMPLATE
+        elif generation_mode == "map_reduce":
+            template = MAP_TEMPLATE + template
+        return {
+            "template_type": template_used,
+            "template_hash": hashlib.sha256(template.encode("utf-8")).hexdigest()[:16],
+            "top_k": top_k or self.default_top_k,
+            "rerank": rerank_results,
+            "expansion": use_query_expansion,
+            "temperature": self.answer_generator.temperature,
+            "compression": (
+                self.compressor.compression_ratio if use_compression and self.compressor else None
+            ),
+            "generation_mode": generation_mode,
+            "model": self.answer_generator.model_signature(),
+        }
+
+    def _cache_lookup(
+            self,
+            query: str,
+            cache_params: Dict[str, Any],
+            query_embedding: Optional[List[float]] = None,
+    ) -> Tuple[Optional[Dict[str, Any]], Optional[List[float]]]:
+        """Check the answer cache (see `AnswerCache.lookup`); (None, None) without one."""
+        if self.answer_cache is None:
+            return None, None
+        return self.answer_cache.lookup(
+            query, cache_params, self.retriever.embedding_model.embed_query, query_embedding
+        )
+
+    def cache_stats(self) -> Dict[str, Tuple[int, int]]:
+        """Hit and miss counts of every cache the pipeline uses, by cache name."""
+        stats = {}
+        if self.answer_cache is not None:
+            answer_stats = self.answer_cache.stats()
+            stats["answer"] = (answer_stats["hits"], answer_stats["misses"])
+        if self.compressor is not None:
+            stats["span_embeddings"] = (self.compressor.cache_hits, self.compressor.cache_misses)
+        token_counter = self.answer_generator.context_packer.token_counter
+        stats["token_counts"] = (token_counter.hits, token_counter.misses)
+        template_info = compile_template.cache_info()
+        stats["compiled_templates"] = (template_info.hits, template_info.misses)
+        return stats
+
+    def cache_sizes(self) -> Dict[str, Tuple[int, int]]:
+        """Entries and approximate bytes held by every cache the pipeline uses, by cache name."""
+        sizes = {}
+        if self.answer_cache is not None:
+            answer_stats = self.answer_cache.stats()
+            sizes["answer"] = (answer_stats["entries"], answer_stats["bytes"])
+        if self.compressor is not None:
+            sizes["span_embeddings"] = (self.compressor.cache_entries, self.compressor.cache_bytes)
+        token_counter = self.answer_generator.context_packer.token_counter
+        sizes["token_counts"] = (token_counter.cache_entries, token_counter.cache_bytes)
+        return sizes
+
+    async def aclose(self) -> None:
+        """Release the async connections the pipeline opened on the running event loop."""
+        await self.retriever.vector_store.aclose()
+
+    def retrieve_context(
+            self,
+            query: str,
+            top_k: Optional[int] = None,
+            use_query_expansion: bool = False,
+            rerank_results: bool = True,
+            query_embedding: Optional[List[float]] = None,
+    ) -> Dict[str, Any]:
+        """Run the retrieval half of the pipeline.
+
+        Args:
+            query: User query
+            top_k: Number of documents to retrieve
+            use_query_expansion: Whether to expand the query
+            rerank_results: Whether to rerank results
+            query_embedding: Precomputed embedding of the raw query, if any
+
+        Returns:
+            Dictionary with sources, raw and formatted chunks, and the query
+        """
+        # Retrieve relevant documents
+        retrieved_chunks, sources = self.retriever.retrieve(
+            query=query,
+            top_k=top_k or self.default_top_k,
+            use_query_expansion=use_query_expansion,
+            rerank_results=rerank_results,
+            query_embedding=query_embedding
+        )
+        return self._format_retrieval(query, retrieved_chunks, sources)
+
+    @staticmethod
+    def _format_retrieval(
+            query: str,
+            retrieved_chunks: List[str],
+            sources: List[Dict[str, Any]],
+    ) -> Dict[str, Any]:
+        """Build the retrieval dictionary shared by every result."""
         # Create formatted chunks for better display
         formatted_chunks = []
         for i, (chunk, source) in enumerate(zip(retrieved_chunks, sources)):
@@ -164,16 +1867,13 @@ class RAGPipeline:
                 "score": source["score"]
             })
 
-        # Add retrieval metadata and documents to result
-        result.update({
+        return {
             "sources": sources,
             "retrieved_chunks": retrieved_chunks,  # Raw chunks
             "formatted_chunks": formatted_chunks,  # Nicely formatted for display
             "retrieval_count": len(retrieved_chunks),
             "query": query,
-        })
-
-        return result
+        }
 
 
 if __name__ == "__main__":
@@ -0,0 +1,123 @@
+"""
+Helpers for running the pipeline's async task graph.
+
+`gather_cancelling` runs independent stages concurrently and cancels the
+siblings of a failed stage. `run_sync` is the synchronous façade: it runs a
+coroutine on one long-lived background event loop, so async clients and
+their connection pools survive across calls from sync code such as Streamlit.
+"""
+import asyncio
+import logging
+import contextvars
+import concurrent.futures
+import threading
+from typing import Any, Awaitable, Coroutine, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+async def gather_cancelling(*awaitables: Awaitable[Any]) -> List[Any]:
+    """Await all awaitables concurrently, returning results in order.
+
+    If one fails, the others are cancelled and the first error is raised. If
+    the caller is cancelled, every child task is cancelled too.
+    """
+    tasks = [asyncio.ensure_future(aw) for aw in awaitables]
+    try:
+        done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+        for task in done:
+            if task.exception() is not None:
+                raise task.exception()
+        return [task.result() for task in tasks]
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+
+
+class EventLoopThread:
+    """An event loop running forever on a daemon thread."""
+
+    def __init__(self, name: str = "rag-event-loop"):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, daemon=True, name=name)
+        self._thread.start()
+
+    def _run(self) -> None:
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def run(self, coro: Coroutine[Any, Any, Any], timeout: Optional[float] = None) -> Any:
+        """Run a coroutine on the loop and block until it finishes.
+
+        If the wait times out or the calling thread is interrupted, the
+        coroutine is cancelled before the error propagates.
+        """
+        future = self.submit(coro)
+        try:
+            return future.result(timeout)
+        except BaseException:
+            future.cancel()
+            raise
+
+    def submit(self, coro: Coroutine[Any, Any, Any]) -> "concurrent.futures.Future":
+        """Schedule a coroutine on the loop without waiting for it.
+
+        Like `asyncio.run_coroutine_threadsafe`, but the task runs in a copy of
+        the caller's context, so context variables (e.g. the active trace
+        span) carry over from the calling thread. Cancelling the returned
+        future cancels the task.
+        """
+        context = contextvars.copy_context()
+        future: "concurrent.futures.Future" = concurrent.futures.Future()
+
+        def start() -> None:
+            if future.cancelled():
+                coro.close()
+                return
+            task = context.run(self.loop.create_task, coro)
+
+            def finished(done: "asyncio.Task") -> None:
+                if future.cancelled():
+                    return
+                try:
+                    if done.cancelled():
+                        future.cancel()
+                    elif done.exception() is not None:
+                        future.set_exception(done.exception())
+                    else:
+                        future.set_result(done.result())
+                except concurrent.futures.InvalidStateError:
+                    pass  # Cancelled from the calling thread in the meantime
+
+            task.add_done_callback(finished)
+            future.add_done_callback(
+                lambda f: f.cancelled() and self.loop.call_soon_threadsafe(task.cancel)
+            )
+
+        self.loop.call_soon_threadsafe(start)
+        return future
+
+    def stop(self) -> None:
+        """Stop the loop and wait for its thread to exit."""
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout=5)
+
+
+_loop_thread: Optional[EventLoopThread] = None
+_loop_lock = threading.Lock()
+
+
+def get_event_loop_thread() -> EventLoopThread:
+    """Return the process-wide background event loop."""
+    global _loop_thread
+    if _loop_thread is None:
+        with _loop_lock:
+            if _loop_thread is None:
+                _loop_thread = EventLoopThread()
+    return _loop_thread
+
+
+def run_sync(coro: Coroutine[Any, Any, Any], timeout: Optional[float] = None) -> Any:
+    """Run a coroutine from synchronous code on the shared background loop."""
+    return get_event_loop_thread().run(coro, timeout)
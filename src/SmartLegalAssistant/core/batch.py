@@ -0,0 +1,108 @@
+"""
+Helpers for batch query runs.
+
+`BatchProgress` appends each finished result to a JSONL file as it completes,
+so an interrupted run can be resumed and only the unanswered questions are
+sent to the APIs again. The file starts with a hash of the run's answer
+parameters, and a run with other parameters refuses to resume from it.
+"""
+import os
+import json
+import hashlib
+import logging
+import threading
+from typing import Any, Dict, Iterator, List, Optional
+
+from SmartLegalAssistant.core.answer_cache import _TRANSIENT_KEYS
+
+logger = logging.getLogger(__name__)
+
+
+def iter_batches(items: List[Any], size: int) -> Iterator[List[Any]]:
+    """Yield consecutive slices of at most `size` items."""
+    for start in range(0, len(items), max(1, size)):
+        yield items[start:start + size]
+
+
+class BatchProgress:
+    """Append-only JSONL record of completed batch results.
+
+    The first line is {"params_hash"}, then each line is {"index", "query",
+    "result"}. A result only counts as done for a later run if both the index
+    and the query text still match.
+    """
+
+    def __init__(self, path: Optional[str], params: Optional[Dict[str, Any]] = None):
+        """Open (or create) a progress file.
+
+        Args:
+            path: JSONL file path; None keeps progress in memory only
+            params: Every parameter that affects the answers (as used for the
+                answer cache key)
+
+        Raises:
+            ValueError: If the file holds results for other parameters
+        """
+        self.path = path
+        self.params_hash = hashlib.sha256(
+            json.dumps(params or {}, sort_keys=True, default=str).encode("utf-8")
+        ).hexdigest()[:16]
+        self._lock = threading.Lock()
+        self._file = None
+        self.completed: Dict[int, Dict[str, Any]] = self._load() if path else {}
+
+    def _load(self) -> Dict[int, Dict[str, Any]]:
+        completed: Dict[int, Dict[str, Any]] = {}
+        if not os.path.exists(self.path):
+            return completed
+        params_hash = None
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line_no, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                    if line_no == 1 and "params_hash" in record:
+                        params_hash = record["params_hash"]
+                        continue
+                    completed[int(record["index"])] = record
+                except (ValueError, KeyError, TypeError):
+                    # A run killed mid-write leaves a truncated last line
+                    logger.warning(f"Skipping unreadable progress line {line_no} in {self.path}")
+        if completed and params_hash != self.params_hash:
+            raise ValueError(
+                f"Progress file {self.path} holds results for other parameters; "
+                f"use a new progress file or delete it to start over"
+            )
+        return completed
+
+    def is_done(self, index: int, query: str) -> bool:
+        record = self.completed.get(index)
+        return record is not None and record.get("query") == query
+
+    def record(self, index: int, query: str, result: Dict[str, Any]) -> None:
+        """Persist one finished result."""
+        record = {
+            "index": index,
+            "query": query,
+            "result": {k: v for k, v in result.items() if k not in _TRANSIENT_KEYS},
+        }
+        with self._lock:
+            self.completed[index] = record
+            if not self.path:
+                return
+            if self._file is None:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                self._file = open(self.path, "a", encoding="utf-8")
+                if self._file.tell() == 0:
+                    self._file.write(json.dumps({"params_hash": self.params_hash}) + "\n")
+            self._file.write(json.dumps(record, default=str) + "\n")
+            self._file.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
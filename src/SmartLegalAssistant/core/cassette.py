@@ -0,0 +1,633 @@
+"""
+Record/replay of Together and Pinecone traffic.
+
+In record mode, the Together clients and the vector store built by the
+factories (`get_embedding_model`, `get_language_model`, `get_reranker`,
+`get_vector_store`) are wrapped. Every request/response pair is appended
+with its observed latency to a gzip-compressed JSONL cassette. In replay
+mode the factories build cassette-backed stand-ins instead. They answer
+from the file without network access or API keys, and can optionally sleep
+for the recorded latencies so timings stay realistic.
+
+Requests are matched on a hash of everything that affects the response
+(model, inputs, sampling parameters, query vector and top_k). Repeated
+identical requests are replayed in recorded order, so a 429 followed by a
+successful retry replays the same way. Failed calls are recorded too, and
+replay raises an error carrying the original status code.
+
+Environment:
+    RAG_CASSETTE_MODE: "record", "replay" or "off" (default)
+    RAG_CASSETTE_PATH: Cassette file (default cassettes/session.jsonl.gz)
+    RAG_CASSETTE_LATENCY: Replay latency scale; 0 serves immediately (default),
+        1 reproduces the recorded timings
+"""
+import os
+import json
+import gzip
+import atexit
+import time
+import base64
+import asyncio
+import hashlib
+import logging
+import threading
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+from dotenv import load_dotenv
+
+from SmartLegalAssistant.core.rate_limiter import is_rate_limit_error, is_timeout_error
+from SmartLegalAssistant.core.vector_store import VectorStore
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+MODES = ("record", "replay")
+
+
+class CassetteMiss(KeyError):
+    """Raised in replay mode when a request was never recorded."""
+
+
+class ReplayedError(RuntimeError):
+    """A recorded API failure, raised again in replay mode."""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class ReplayedTimeout(ReplayedError, TimeoutError):
+    """A recorded timeout, raised again in replay mode."""
+
+
+def request_key(kind: str, **request: Any) -> str:
+    """Stable hash of a request's content."""
+    payload = json.dumps({"kind": kind, **request}, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+
+def vector_digest(vector: List[float]) -> str:
+    """Hash of a query vector at float32 precision."""
+    return hashlib.sha256(np.asarray(vector, dtype=np.float32).tobytes()).hexdigest()[:32]
+
+
+def encode_vector(vector: List[float]) -> str:
+    return base64.b64encode(np.asarray(vector, dtype=np.float32).tobytes()).decode("ascii")
+
+
+def decode_vector(data: str) -> List[float]:
+    return np.frombuffer(base64.b64decode(data), dtype=np.float32).tolist()
+
+
+class Cassette:
+    """A gzip JSONL file of recorded interactions.
+
+    Each line is {"kind", "key", "ms", "response"} or, for failed calls,
+    {"kind", "key", "ms", "error": {"type", "message", "status", "timeout"}}.
+    Streamed completions also record "ttft_ms" (time to first token).
+    """
+
+    def __init__(self, path: str, mode: str = "replay", latency_scale: float = 0.0):
+        """Open a cassette.
+
+        Args:
+            path: Cassette file
+            mode: "record" appends to the file, "replay" serves from it
+            latency_scale: Multiplier applied to recorded latencies on replay
+        """
+        if mode not in MODES:
+            raise ValueError(f"Unknown cassette mode '{mode}', expected one of {MODES}")
+        self.path = path
+        self.mode = mode
+        self.latency_scale = latency_scale
+        self._lock = threading.Lock()
+        self._file = None
+        self._entries: Dict[str, List[Dict[str, Any]]] = {}
+        self._cursors: Dict[str, int] = {}
+        self.stats = {"recorded": 0, "replayed": 0, "misses": 0}
+        if mode == "replay":
+            self._load()
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            raise FileNotFoundError(f"Cassette {self.path} does not exist; record one with RAG_CASSETTE_MODE=record")
+        with gzip.open(self.path, "rt", encoding="utf-8") as f:
+            for line_no, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    entry = json.loads(line)
+                    self._entries.setdefault(entry["key"], []).append(entry)
+                except (ValueError, KeyError):
+                    logger.warning(f"Skipping unreadable cassette line {line_no} in {self.path}")
+        count = sum(len(entries) for entries in self._entries.values())
+        logger.info(f"Loaded {count} recorded interactions from {self.path}")
+
+    # ------------------------------------------------------------------
+    # Recording
+    # ------------------------------------------------------------------
+
+    def record(self, kind: str, key: str, seconds: float, response: Any = None,
+               error: Optional[BaseException] = None, **extra: Any) -> None:
+        """Append one interaction."""
+        entry = {"kind": kind, "key": key, "ms": round(seconds * 1000, 2), **extra}
+        if error is not None:
+            entry["error"] = {
+                "type": type(error).__name__,
+                "message": str(error)[:500],
+                "status": getattr(error, "status_code", None) or (429 if is_rate_limit_error(error) else None),
+                "timeout": is_timeout_error(error),
+            }
+        else:
+            entry["response"] = response
+        line = json.dumps(entry, separators=(",", ":"), default=str) + "\n"
+        with self._lock:
+            if self._file is None:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                # Appending adds a new gzip member; readers see one stream
+                self._file = gzip.open(self.path, "at", encoding="utf-8")
+            self._file.write(line)
+            self._file.flush()
+            self.stats["recorded"] += 1
+
+    # ------------------------------------------------------------------
+    # Replay
+    # ------------------------------------------------------------------
+
+    def lookup(self, kind: str, key: str) -> Dict[str, Any]:
+        """Next recorded interaction for a request (cycling through repeats).
+
+        Raises:
+            CassetteMiss: If the request was never recorded
+        """
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                self.stats["misses"] += 1
+                raise CassetteMiss(f"No recorded {kind} call matches this request in {self.path}")
+            cursor = self._cursors.get(key, 0)
+            self._cursors[key] = cursor + 1
+            self.stats["replayed"] += 1
+            return entries[cursor % len(entries)]
+
+    def delay(self, entry: Dict[str, Any], field: str = "ms") -> float:
+        """Seconds to wait before serving a replayed response."""
+        return entry.get(field, 0.0) / 1000 * self.latency_scale
+
+    @staticmethod
+    def raise_if_error(entry: Dict[str, Any]) -> None:
+        error = entry.get("error")
+        if error is None:
+            return
+        message = f"{error['type']}: {error['message']} (replayed)"
+        if error.get("timeout"):
+            raise ReplayedTimeout(message, error.get("status"))
+        raise ReplayedError(message, error.get("status"))
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+# ---------------------------------------------------------------------------
+# Response encoding (only the fields the pipeline reads are kept)
+# ---------------------------------------------------------------------------
+
+def _embeddings_request(model: str, input: Any, kwargs: Dict[str, Any]) -> str:
+    return request_key("embeddings", model=model, input=input, **kwargs)
+
+
+def _rerank_request(model: str, query: str, documents: Any, top_n: Optional[int], kwargs: Dict[str, Any]) -> str:
+    return request_key("rerank", model=model, query=query, documents=documents, top_n=top_n, **kwargs)
+
+
+def _chat_request(model: str, messages: Any, kwargs: Dict[str, Any]) -> str:
+    # Streamed and non-streamed calls share recordings
+    return request_key("chat", model=model, messages=messages,
+                       **{k: v for k, v in kwargs.items() if k != "stream"})
+
+
+def _encode_embeddings(response: Any) -> Dict[str, Any]:
+    return {"embeddings": [encode_vector(item.embedding) for item in response.data]}
+
+
+def _decode_embeddings(response: Dict[str, Any]) -> SimpleNamespace:
+    return SimpleNamespace(data=[
+        SimpleNamespace(index=i, embedding=decode_vector(data)) for i, data in enumerate(response["embeddings"])
+    ])
+
+
+def _encode_rerank(response: Any) -> Dict[str, Any]:
+    return {"results": [[result.index, result.relevance_score] for result in response.results]}
+
+
+def _decode_rerank(response: Dict[str, Any]) -> SimpleNamespace:
+    return SimpleNamespace(results=[
+        SimpleNamespace(index=index, relevance_score=score) for index, score in response["results"]
+    ])
+
+
+def _completion(text: str) -> SimpleNamespace:
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=text))])
+
+
+def _chunk(delta: str) -> SimpleNamespace:
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=delta))])
+
+
+def _stream_deltas(response: Dict[str, Any]) -> List[str]:
+    return response.get("deltas") or [response["text"]]
+
+
+def _encode_matches(result: Any) -> Dict[str, Any]:
+    if hasattr(result, "to_dict"):
+        result = result.to_dict()
+    return {"matches": [
+        {key: match[key] for key in ("id", "score", "metadata") if match.get(key) is not None}
+        for match in result.get("matches", [])
+    ]}
+
+
+def _token_interval(cassette: Cassette, entry: Dict[str, Any], deltas: List[str]) -> float:
+    generation_ms = max(0.0, entry.get("ms", 0.0) - entry.get("ttft_ms", 0.0))
+    return generation_ms / 1000 * cassette.latency_scale / max(1, len(deltas))
+
+
+# ---------------------------------------------------------------------------
+# Recording clients
+# ---------------------------------------------------------------------------
+
+class _RecordingStream:
+    """Passes a completion stream through, recording it once fully consumed."""
+
+    def __init__(self, stream: Any, cassette: Cassette, key: str, started: float):
+        self._stream = stream
+        self._cassette = cassette
+        self._key = key
+        self._started = started
+
+    def __iter__(self):
+        deltas, first = [], None
+        for chunk in self._stream:
+            if first is None:
+                first = time.perf_counter()
+            if chunk.choices and chunk.choices[0].delta.content:
+                deltas.append(chunk.choices[0].delta.content)
+            yield chunk
+        # Streams abandoned early are not recorded
+        self._cassette.record(
+            "chat", self._key, time.perf_counter() - self._started, {"text": "".join(deltas), "deltas": deltas},
+            ttft_ms=round(((first or time.perf_counter()) - self._started) * 1000, 2),
+        )
+
+    def close(self) -> None:
+        close = getattr(self._stream, "close", None)
+        if close:
+            close()
+
+
+class _AsyncRecordingStream(_RecordingStream):
+    async def __aiter__(self):
+        deltas, first = [], None
+        async for chunk in self._stream:
+            if first is None:
+                first = time.perf_counter()
+            if chunk.choices and chunk.choices[0].delta.content:
+                deltas.append(chunk.choices[0].delta.content)
+            yield chunk
+        self._cassette.record(
+            "chat", self._key, time.perf_counter() - self._started, {"text": "".join(deltas), "deltas": deltas},
+            ttft_ms=round(((first or time.perf_counter()) - self._started) * 1000, 2),
+        )
+
+    async def close(self) -> None:
+        close = getattr(self._stream, "aclose", None) or getattr(self._stream, "close", None)
+        if close:
+            result = close()
+            if asyncio.iscoroutine(result):
+                await result
+
+
+class RecordingTogether:
+    """Wraps a `Together` client and records embedding, rerank and chat calls."""
+
+    def __init__(self, client: Any, cassette: Cassette):
+        self._client = client
+        self._cassette = cassette
+        self.embeddings = SimpleNamespace(create=self._embeddings)
+        self.rerank = SimpleNamespace(create=self._rerank)
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._chat))
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._client, name)
+
+    def _call(self, kind: str, key: str, fn: Callable, encode: Callable, **kwargs: Any) -> Any:
+        started = time.perf_counter()
+        try:
+            response = fn(**kwargs)
+        except Exception as e:
+            self._cassette.record(kind, key, time.perf_counter() - started, error=e)
+            raise
+        self._cassette.record(kind, key, time.perf_counter() - started, encode(response))
+        return response
+
+    def _embeddings(self, model: str, input: Any, **kwargs: Any) -> Any:
+        return self._call("embeddings", _embeddings_request(model, input, kwargs), self._client.embeddings.create,
+                          _encode_embeddings, model=model, input=input, **kwargs)
+
+    def _rerank(self, model: str, query: str, documents: Any, top_n: Optional[int] = None, **kwargs: Any) -> Any:
+        return self._call("rerank", _rerank_request(model, query, documents, top_n, kwargs), self._client.rerank.create,
+                          _encode_rerank, model=model, query=query, documents=documents, top_n=top_n, **kwargs)
+
+    def _chat(self, model: str, messages: Any, **kwargs: Any) -> Any:
+        key = _chat_request(model, messages, kwargs)
+        create = self._client.chat.completions.create
+        if not kwargs.get("stream"):
+            return self._call("chat", key, create, lambda r: {"text": r.choices[0].message.content},
+                              model=model, messages=messages, **kwargs)
+        started = time.perf_counter()
+        try:
+            stream = create(model=model, messages=messages, **kwargs)
+        except Exception as e:
+            self._cassette.record("chat", key, time.perf_counter() - started, error=e)
+            raise
+        return _RecordingStream(stream, self._cassette, key, started)
+
+
+class AsyncRecordingTogether:
+    """Async counterpart of `RecordingTogether`.
+
+    The shared `AsyncTogether` client is bound to an event loop, so it is
+    resolved on every call rather than held.
+    """
+
+    def __init__(self, client_factory: Callable[[], Any], cassette: Cassette):
+        self._client_factory = client_factory
+        self._cassette = cassette
+        self.embeddings = SimpleNamespace(create=self._embeddings)
+        self.rerank = SimpleNamespace(create=self._rerank)
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._chat))
+
+    async def _call(self, kind: str, key: str, fn: Callable, encode: Callable, **kwargs: Any) -> Any:
+        started = time.perf_counter()
+        try:
+            response = await fn(**kwargs)
+        except Exception as e:
+            self._cassette.record(kind, key, time.perf_counter() - started, error=e)
+            raise
+        self._cassette.record(kind, key, time.perf_counter() - started, encode(response))
+        return response
+
+    async def _embeddings(self, model: str, input: Any, **kwargs: Any) -> Any:
+        return await self._call("embeddings", _embeddings_request(model, input, kwargs),
+                                self._client_factory().embeddings.create, _encode_embeddings,
+                                model=model, input=input, **kwargs)
+
+    async def _rerank(self, model: str, query: str, documents: Any, top_n: Optional[int] = None,
+                      **kwargs: Any) -> Any:
+        return await self._call("rerank", _rerank_request(model, query, documents, top_n, kwargs),
+                                self._client_factory().rerank.create, _encode_rerank,
+                                model=model, query=query, documents=documents, top_n=top_n, **kwargs)
+
+    async def _chat(self, model: str, messages: Any, **kwargs: Any) -> Any:
+        key = _chat_request(model, messages, kwargs)
+        create = self._client_factory().chat.completions.create
+        if not kwargs.get("stream"):
+            return await self._call("chat", key, create, lambda r: {"text": r.choices[0].message.content},
+                                    model=model, messages=messages, **kwargs)
+        started = time.perf_counter()
+        try:
+            stream = await create(model=model, messages=messages, **kwargs)
+        except Exception as e:
+            self._cassette.record("chat", key, time.perf_counter() - started, error=e)
+            raise
+        return _AsyncRecordingStream(stream, self._cassette, key, started)
+
+
+# ---------------------------------------------------------------------------
+# Replay clients
+# ---------------------------------------------------------------------------
+
+class _ReplayStream:
+    def __init__(self, deltas: List[str], interval: float):
+        self._deltas = deltas
+        self._interval = interval
+        self._closed = False
+
+    def __iter__(self):
+        for delta in self._deltas:
+            if self._closed:
+                return
+            if self._interval:
+                time.sleep(self._interval)
+            yield _chunk(delta)
+
+    def close(self) -> None:
+        self._closed = True
+
+
+class _AsyncReplayStream(_ReplayStream):
+    async def __aiter__(self):
+        for delta in self._deltas:
+            if self._closed:
+                return
+            if self._interval:
+                await asyncio.sleep(self._interval)
+            yield _chunk(delta)
+
+    async def close(self) -> None:
+        self._closed = True
+
+
+class ReplayTogether:
+    """Serves embedding, rerank and chat calls from a cassette."""
+
+    def __init__(self, cassette: Cassette):
+        self._cassette = cassette
+        self.embeddings = SimpleNamespace(create=self._embeddings)
+        self.rerank = SimpleNamespace(create=self._rerank)
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._chat))
+
+    def _replay(self, kind: str, key: str, field: str = "ms") -> Dict[str, Any]:
+        entry = self._cassette.lookup(kind, key)
+        time.sleep(self._cassette.delay(entry, field if "error" not in entry else "ms"))
+        self._cassette.raise_if_error(entry)
+        return entry
+
+    def _embeddings(self, model: str, input: Any, **kwargs: Any) -> SimpleNamespace:
+        entry = self._replay("embeddings", _embeddings_request(model, input, kwargs))
+        return _decode_embeddings(entry["response"])
+
+    def _rerank(self, model: str, query: str, documents: Any, top_n: Optional[int] = None,
+                **kwargs: Any) -> SimpleNamespace:
+        entry = self._replay("rerank", _rerank_request(model, query, documents, top_n, kwargs))
+        return _decode_rerank(entry["response"])
+
+    def _chat(self, model: str, messages: Any, **kwargs: Any) -> Any:
+        if not kwargs.get("stream"):
+            entry = self._replay("chat", _chat_request(model, messages, kwargs))
+            return _completion(entry["response"]["text"])
+        entry = self._replay("chat", _chat_request(model, messages, kwargs), "ttft_ms")
+        deltas = _stream_deltas(entry["response"])
+        return _ReplayStream(deltas, _token_interval(self._cassette, entry, deltas))
+
+
+class AsyncReplayTogether(ReplayTogether):
+    """Async counterpart of `ReplayTogether`."""
+
+    async def _areplay(self, kind: str, key: str, field: str = "ms") -> Dict[str, Any]:
+        entry = self._cassette.lookup(kind, key)
+        await asyncio.sleep(self._cassette.delay(entry, field if "error" not in entry else "ms"))
+        self._cassette.raise_if_error(entry)
+        return entry
+
+    async def _embeddings(self, model: str, input: Any, **kwargs: Any) -> SimpleNamespace:
+        entry = await self._areplay("embeddings", _embeddings_request(model, input, kwargs))
+        return _decode_embeddings(entry["response"])
+
+    async def _rerank(self, model: str, query: str, documents: Any, top_n: Optional[int] = None,
+                      **kwargs: Any) -> SimpleNamespace:
+        entry = await self._areplay("rerank", _rerank_request(model, query, documents, top_n, kwargs))
+        return _decode_rerank(entry["response"])
+
+    async def _chat(self, model: str, messages: Any, **kwargs: Any) -> Any:
+        if not kwargs.get("stream"):
+            entry = await self._areplay("chat", _chat_request(model, messages, kwargs))
+            return _completion(entry["response"]["text"])
+        entry = await self._areplay("chat", _chat_request(model, messages, kwargs), "ttft_ms")
+        deltas = _stream_deltas(entry["response"])
+        return _AsyncReplayStream(deltas, _token_interval(self._cassette, entry, deltas))
+
+
+# ---------------------------------------------------------------------------
+# Vector store
+# ---------------------------------------------------------------------------
+
+class CassetteVectorStore(VectorStore):
+    """Records queries against a vector store, or replays them without one."""
+
+    def __init__(self, store: Optional[VectorStore], cassette: Cassette):
+        """Wrap a vector store.
+
+        Args:
+            store: Store to record (None in replay mode)
+            cassette: Cassette to record to or replay from
+        """
+        self.store = store
+        self.cassette = cassette
+
+    def __getattr__(self, name: str) -> Any:
+        store = self.__dict__.get("store")
+        if store is None:
+            raise AttributeError(name)
+        return getattr(store, name)
+
+    @staticmethod
+    def _key(vector: List[float], top_k: int, include_metadata: bool, filter: Optional[Dict[str, Any]]) -> str:
+        return request_key("query", vector=vector_digest(vector), top_k=top_k,
+                           include_metadata=include_metadata, filter=filter)
+
+    def query(self, vector: List[float], top_k: int = 30, include_metadata: bool = True,
+              filter: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        key = self._key(vector, top_k, include_metadata, filter)
+        if self.cassette.mode == "replay":
+            entry = self.cassette.lookup("query", key)
+            time.sleep(self.cassette.delay(entry))
+            self.cassette.raise_if_error(entry)
+            return entry["response"]
+        started = time.perf_counter()
+        try:
+            result = self.store.query(vector, top_k, include_metadata=include_metadata, filter=filter)
+        except Exception as e:
+            self.cassette.record("query", key, time.perf_counter() - started, error=e)
+            raise
+        self.cassette.record("query", key, time.perf_counter() - started, _encode_matches(result))
+        return result
+
+    async def aquery(self, vector: List[float], top_k: int = 30, include_metadata: bool = True,
+                     filter: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        key = self._key(vector, top_k, include_metadata, filter)
+        if self.cassette.mode == "replay":
+            entry = self.cassette.lookup("query", key)
+            await asyncio.sleep(self.cassette.delay(entry))
+            self.cassette.raise_if_error(entry)
+            return entry["response"]
+        started = time.perf_counter()
+        try:
+            result = await self.store.aquery(vector, top_k, include_metadata=include_metadata, filter=filter)
+        except Exception as e:
+            self.cassette.record("query", key, time.perf_counter() - started, error=e)
+            raise
+        self.cassette.record("query", key, time.perf_counter() - started, _encode_matches(result))
+        return result
+
+    async def aclose(self) -> None:
+        aclose = getattr(self.store, "aclose", None)
+        if aclose:
+            await aclose()
+
+
+# ---------------------------------------------------------------------------
+# Factory integration
+# ---------------------------------------------------------------------------
+
+_cassette: Optional[Cassette] = None
+_cassette_lock = threading.Lock()
+
+
+def get_cassette() -> Optional[Cassette]:
+    """Return the process-wide cassette configured by RAG_CASSETTE_*, or None when off."""
+    global _cassette
+    mode = os.getenv("RAG_CASSETTE_MODE", "off").lower()
+    if mode not in MODES:
+        return None
+    if _cassette is None:
+        with _cassette_lock:
+            if _cassette is None:
+                _cassette = Cassette(
+                    os.getenv("RAG_CASSETTE_PATH", "cassettes/session.jsonl.gz"),
+                    mode=mode,
+                    latency_scale=float(os.getenv("RAG_CASSETTE_LATENCY", "0")),
+                )
+                atexit.register(_cassette.close)
+                logger.info(f"Cassette {mode} mode: {_cassette.path}")
+    return _cassette
+
+
+def together_client_kwargs(kwargs: Dict[str, Any], cassette: Optional[Cassette] = None) -> Dict[str, Any]:
+    """Add recording or replaying clients to a Together wrapper's constructor kwargs.
+
+    Kwargs that already carry a `client` are left alone, as is everything
+    when no cassette is active.
+    """
+    cassette = cassette or get_cassette()
+    if cassette is None or kwargs.get("client") is not None:
+        return kwargs
+    kwargs = dict(kwargs)
+    if cassette.mode == "replay":
+        kwargs["client"] = ReplayTogether(cassette)
+        kwargs["async_client"] = AsyncReplayTogether(cassette)
+        return kwargs
+
+    from SmartLegalAssistant.core.clients import get_async_together_client, get_together_client
+    api_key = kwargs.get("api_key")
+    kwargs["client"] = RecordingTogether(get_together_client(api_key), cassette)
+    kwargs["async_client"] = AsyncRecordingTogether(lambda: get_async_together_client(api_key), cassette)
+    return kwargs
+
+
+def cassette_vector_store(build: Callable[[], VectorStore], cassette: Optional[Cassette] = None) -> VectorStore:
+    """Build a vector store through the cassette: wrapped when recording, skipped when replaying."""
+    cassette = cassette or get_cassette()
+    if cassette is None:
+        return build()
+    if cassette.mode == "replay":
+        return CassetteVectorStore(None, cassette)
+    return CassetteVectorStore(build(), cassette)
@@ -0,0 +1,358 @@
+"""
+Process-wide registry of pooled Together AI clients.
+
+Embeddings, reranking and generation all talk to the same API host, so they
+share one keep-alive connection pool instead of each opening their own.
+"""
+import os
+import asyncio
+import inspect
+import logging
+import weakref
+import threading
+import importlib.util
+from dataclasses import dataclass, replace
+from typing import Dict, Any, Optional, Tuple
+
+from dotenv import load_dotenv
+from together import AsyncTogether, Together
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class PoolConfig:
+    """Connection pool settings for the shared Together client.
+
+    Attributes:
+        max_connections: Upper bound on open connections in the pool
+        max_keepalive_connections: Idle connections kept open for reuse
+        keepalive_expiry: Seconds an idle connection stays in the pool
+        timeout: Read/write timeout in seconds
+        connect_timeout: Connect timeout in seconds
+        http2: Negotiate HTTP/2 when the `h2` package is installed
+        max_retries: Retries performed by the SDK itself. 0 by default: the
+            rate limiter (core/rate_limiter.py) is the only retry layer, so a
+            throttled call is not retried again underneath its cool-down
+    """
+    max_connections: int = 20
+    max_keepalive_connections: int = 10
+    keepalive_expiry: float = 90.0
+    timeout: float = 60.0
+    connect_timeout: float = 10.0
+    http2: bool = True
+    max_retries: int = 0
+
+    @classmethod
+    def from_env(cls) -> "PoolConfig":
+        """Build a config from TOGETHER_POOL_* environment variables."""
+        defaults = cls()
+        return cls(
+            max_connections=int(os.getenv("TOGETHER_POOL_MAX_CONNECTIONS", defaults.max_connections)),
+            max_keepalive_connections=int(
+                os.getenv("TOGETHER_POOL_MAX_KEEPALIVE", defaults.max_keepalive_connections)
+            ),
+            keepalive_expiry=float(os.getenv("TOGETHER_POOL_KEEPALIVE_EXPIRY", defaults.keepalive_expiry)),
+            timeout=float(os.getenv("TOGETHER_POOL_TIMEOUT", defaults.timeout)),
+            connect_timeout=float(os.getenv("TOGETHER_POOL_CONNECT_TIMEOUT", defaults.connect_timeout)),
+            http2=os.getenv("TOGETHER_POOL_HTTP2", "1").lower() not in ("0", "false", "no"),
+            max_retries=int(os.getenv("TOGETHER_POOL_MAX_RETRIES", defaults.max_retries)),
+        )
+
+
+class ConnectionStats:
+    """Thread-safe counters describing how well the pool reuses connections."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.new_connections = 0
+        self.tls_handshakes = 0
+        self.http2_requests = 0
+        self.clients_created = 0
+        self.client_lookups = 0
+
+    def increment(self, name: str, amount: int = 1) -> None:
+        """Increase a counter by the given amount."""
+        with self._lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    def trace(self, event_name: str, info: Dict[str, Any]) -> None:
+        """httpcore trace callback, invoked for every connection-level event."""
+        if event_name == "connection.connect_tcp.complete":
+            self.increment("new_connections")
+        elif event_name == "connection.start_tls.complete":
+            self.increment("tls_handshakes")
+        elif event_name == "http2.send_request_headers.started":
+            self.increment("http2_requests")
+
+    async def atrace(self, event_name: str, info: Dict[str, Any]) -> None:
+        """Async variant of `trace` for clients running on an event loop."""
+        self.trace(event_name, info)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return the current counters plus the derived reuse ratio."""
+        with self._lock:
+            data = {
+                "requests": self.requests,
+                "new_connections": self.new_connections,
+                "tls_handshakes": self.tls_handshakes,
+                "http2_requests": self.http2_requests,
+                "clients_created": self.clients_created,
+                "client_lookups": self.client_lookups,
+            }
+        data["connection_reuse_ratio"] = (
+            1.0 - data["new_connections"] / data["requests"] if data["requests"] else 0.0
+        )
+        return data
+
+
+class TogetherClientRegistry:
+    """Hands out one pooled Together client per API key and base URL."""
+
+    def __init__(self, config: Optional[PoolConfig] = None):
+        """Initialize the registry.
+
+        Args:
+            config: Pool settings (defaults to values from the environment)
+        """
+        self.config = config or PoolConfig.from_env()
+        self.stats = ConnectionStats()
+        self._clients: Dict[Tuple[str, Optional[str]], Together] = {}
+        # Async connections are bound to the loop that opened them, so async
+        # clients are pooled per event loop and dropped with it.
+        self._async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._http_clients = []
+        self._lock = threading.Lock()
+
+    def get_client(self, api_key: str, base_url: Optional[str] = None) -> Together:
+        """Return the shared client for the given credentials, creating it once."""
+        key = (api_key, base_url)
+        self.stats.increment("client_lookups")
+        client = self._clients.get(key)
+        if client is not None:
+            return client
+
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                client = self._build_client(api_key, base_url)
+                self._clients[key] = client
+                self.stats.increment("clients_created")
+        return client
+
+    def get_async_client(self, api_key: str, base_url: Optional[str] = None) -> AsyncTogether:
+        """Return the shared async client for the running event loop, creating it once."""
+        loop = asyncio.get_running_loop()
+        key = (api_key, base_url)
+        self.stats.increment("client_lookups")
+        with self._lock:
+            clients = self._async_clients.setdefault(loop, {})
+            client = clients.get(key)
+            if client is None:
+                client = self._build_async_client(api_key, base_url)
+                clients[key] = client
+                self.stats.increment("clients_created")
+        return client
+
+    def async_client_for(self, api_key: str, async_client: Optional[AsyncTogether] = None,
+                         shared: bool = True) -> Optional[AsyncTogether]:
+        """Return the async client a Together caller should use on the running event loop.
+
+        Args:
+            api_key: Caller's Together AI API key
+            async_client: Client injected into the caller, used as is
+            shared: False for callers built around an injected sync client,
+                which must not fall back to the shared pool
+
+        Returns:
+            The async client, or None if the caller should run its sync client
+            on a worker thread instead
+        """
+        if async_client is not None:
+            return async_client
+        if shared:
+            return self.get_async_client(api_key)
+        return None
+
+    def metrics(self) -> Dict[str, Any]:
+        """Return pool settings and connection-reuse counters."""
+        return {
+            "pool": {
+                "max_connections": self.config.max_connections,
+                "max_keepalive_connections": self.config.max_keepalive_connections,
+                "keepalive_expiry": self.config.keepalive_expiry,
+                "http2": self._http2_enabled(),
+            },
+            "connections": self.stats.snapshot(),
+        }
+
+    def close(self) -> None:
+        """Close all pooled connections and forget cached clients.
+
+        Async clients are closed on the event loop that owns them: scheduled
+        if that loop is running, run to completion if it is idle, and
+        skipped if it is already closed (its connections went with it).
+        """
+        with self._lock:
+            for http_client in self._http_clients:
+                try:
+                    http_client.close()
+                except Exception as e:
+                    logger.debug(f"Error closing pooled HTTP client: {e}")
+            self._http_clients.clear()
+            self._clients.clear()
+            async_clients = [
+                (loop, client) for loop, clients in self._async_clients.items() for client in clients.values()
+            ]
+            self._async_clients.clear()
+        for loop, client in async_clients:
+            self._close_async_client(loop, client)
+
+    async def aclose(self) -> None:
+        """Close the async clients of the running event loop, e.g. on server shutdown."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            clients = self._async_clients.pop(loop, {})
+        for client in clients.values():
+            try:
+                await client.close()
+            except Exception as e:
+                logger.debug(f"Error closing pooled async HTTP client: {e}")
+
+    @staticmethod
+    def _close_async_client(loop: asyncio.AbstractEventLoop, client: AsyncTogether) -> None:
+        try:
+            if loop.is_closed():
+                return
+            if loop.is_running():
+                asyncio.run_coroutine_threadsafe(client.close(), loop)
+            else:
+                loop.run_until_complete(client.close())
+        except Exception as e:
+            logger.debug(f"Error closing pooled async HTTP client: {e}")
+
+    def _http2_enabled(self) -> bool:
+        return self.config.http2 and importlib.util.find_spec("h2") is not None
+
+    def _count_request(self, request) -> None:
+        """httpx request hook: count the request and attach the trace callback."""
+        self.stats.increment("requests")
+        request.extensions["trace"] = self.stats.trace
+
+    async def _acount_request(self, request) -> None:
+        self.stats.increment("requests")
+        request.extensions["trace"] = self.stats.atrace
+
+    def _httpx_settings(self) -> Dict[str, Any]:
+        import httpx
+
+        return {
+            "limits": httpx.Limits(
+                max_connections=self.config.max_connections,
+                max_keepalive_connections=self.config.max_keepalive_connections,
+                keepalive_expiry=self.config.keepalive_expiry,
+            ),
+            "timeout": httpx.Timeout(self.config.timeout, connect=self.config.connect_timeout),
+            "http2": self._http2_enabled(),
+        }
+
+    def _build_http_client(self):
+        import httpx
+
+        http_client = httpx.Client(
+            event_hooks={"request": [self._count_request]},
+            **self._httpx_settings(),
+        )
+        self._http_clients.append(http_client)
+        return http_client
+
+    def _build_async_client(self, api_key: str, base_url: Optional[str]) -> AsyncTogether:
+        kwargs = self._client_kwargs(api_key, base_url)
+        if "http_client" in inspect.signature(AsyncTogether.__init__).parameters:
+            import httpx
+
+            kwargs["http_client"] = httpx.AsyncClient(
+                event_hooks={"request": [self._acount_request]},
+                **self._httpx_settings(),
+            )
+        return AsyncTogether(**kwargs)
+
+    def _client_kwargs(self, api_key: str, base_url: Optional[str]) -> Dict[str, Any]:
+        kwargs: Dict[str, Any] = {
+            "api_key": api_key,
+            "timeout": self.config.timeout,
+            "max_retries": self.config.max_retries,
+        }
+        if base_url:
+            kwargs["base_url"] = base_url
+        return kwargs
+
+    def _build_client(self, api_key: str, base_url: Optional[str]) -> Together:
+        params = inspect.signature(Together.__init__).parameters
+        kwargs = self._client_kwargs(api_key, base_url)
+
+        # Newer SDKs accept a caller-owned httpx client; older ones keep their
+        # own per-thread session, which is still shared by every component here.
+        if "http_client" in params:
+            kwargs["http_client"] = self._build_http_client()
+        else:
+            logger.debug("Installed together SDK does not accept http_client; using SDK pooling.")
+
+        return Together(**kwargs)
+
+
+_registry: Optional[TogetherClientRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_client_registry() -> TogetherClientRegistry:
+    """Return the process-wide client registry."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = TogetherClientRegistry()
+    return _registry
+
+
+def configure_client_pool(**overrides) -> TogetherClientRegistry:
+    """Replace the process-wide registry with one using the given pool settings.
+
+    Args:
+        **overrides: PoolConfig fields to override (e.g. max_connections=50)
+
+    Returns:
+        The new registry
+    """
+    global _registry
+    with _registry_lock:
+        if _registry is not None:
+            _registry.close()
+        _registry = TogetherClientRegistry(replace(PoolConfig.from_env(), **overrides))
+    return _registry
+
+
+def get_together_client(api_key: Optional[str] = None, base_url: Optional[str] = None) -> Together:
+    """Return the shared Together client for the given (or environment) API key."""
+    api_key = api_key or os.getenv("TOGETHER_AI_API_KEY")
+    if not api_key:
+        raise ValueError("Please provide a Together AI API key or set the TOGETHER_AI_API_KEY environment variable.")
+    return get_client_registry().get_client(api_key, base_url)
+
+
+def get_async_together_client(api_key: Optional[str] = None, base_url: Optional[str] = None) -> AsyncTogether:
+    """Return the shared async Together client for the running event loop."""
+    api_key = api_key or os.getenv("TOGETHER_AI_API_KEY")
+    if not api_key:
+        raise ValueError("Please provide a Together AI API key or set the TOGETHER_AI_API_KEY environment variable.")
+    return get_client_registry().get_async_client(api_key, base_url)
+
+
+def client_metrics() -> Dict[str, Any]:
+    """Return connection-reuse metrics for the shared Together client pool."""
+    return get_client_registry().metrics()
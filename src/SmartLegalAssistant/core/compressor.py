@@ -0,0 +1,212 @@
+"""
+Extractive contextual compression between retrieval and generation.
+
+Each retrieved chunk is split into sentences and statutory clauses, every
+span is scored against the query embedding in a single vectorized pass, and
+only the best spans (plus section headers) are passed on to the LLM.
+"""
+import re
+import sys
+import math
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from SmartLegalAssistant.core.embeddings import EmbeddingModel
+from SmartLegalAssistant.utils.memory import vector_sizeof
+
+logger = logging.getLogger(__name__)
+
+# Headings such as "PART III", "Division 2", "Section 45" or "45. Duty of directors"
+HEADER_PATTERN = re.compile(r"^(PART\b|Part\b|Division\b|DIVISION\b|Section\b|SECTION\b|\d+[A-Z]?\.\s+[A-Z])")
+# Sentence ends, and the start of numbered or lettered clauses like "(2)" or "(b)"
+SPAN_BOUNDARY = re.compile(r"(?<=[.;:])\s+(?=[A-Z(])|\s+(?=\(\w{1,4}\)\s)")
+
+
+@dataclass
+class CompressionResult:
+    """Compressed chunks with size accounting."""
+    chunks: List[str]
+    original_chars: int
+    compressed_chars: int
+    spans_total: int
+    spans_kept: int
+    kept_spans: List[List[int]] = field(default_factory=list)
+
+    @property
+    def ratio(self) -> float:
+        """Fraction of the original characters that were kept."""
+        return self.compressed_chars / self.original_chars if self.original_chars else 1.0
+
+    def stats(self) -> Dict[str, float]:
+        """Summary reported in the pipeline result under "compression"."""
+        return {
+            "original_chars": self.original_chars,
+            "compressed_chars": self.compressed_chars,
+            "ratio": round(self.ratio, 4),
+            "spans_total": self.spans_total,
+            "spans_kept": self.spans_kept,
+        }
+
+
+class ExtractiveCompressor:
+    """Keeps only the query-relevant sentences and clauses of each chunk."""
+
+    def __init__(
+        self,
+        embedding_model: EmbeddingModel,
+        compression_ratio: float = 0.4,
+        min_spans_per_chunk: int = 1,
+        keep_headers: bool = True,
+        min_span_chars: int = 25,
+        cache_size: int = 50000,
+    ):
+        """Initialize the compressor.
+
+        Args:
+            embedding_model: Model used to embed spans and the query
+            compression_ratio: Fraction of spans to keep across all chunks
+            min_spans_per_chunk: Spans kept from every chunk regardless of rank
+            keep_headers: Always keep a chunk's section header line
+            min_span_chars: Shorter fragments are merged into their neighbour
+            cache_size: Number of span embeddings kept in the LRU cache
+        """
+        if not 0 < compression_ratio <= 1:
+            raise ValueError("compression_ratio must be in (0, 1]")
+        self.embedding_model = embedding_model
+        self.compression_ratio = compression_ratio
+        self.min_spans_per_chunk = min_spans_per_chunk
+        self.keep_headers = keep_headers
+        self.min_span_chars = min_span_chars
+        self.cache_size = cache_size
+
+        self._cache: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.cache_bytes = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    @property
+    def cache_entries(self) -> int:
+        return len(self._cache)
+
+    def split_spans(self, chunk: str) -> Tuple[Optional[str], List[str]]:
+        """Split a chunk into an optional header line and its sentence/clause spans."""
+        lines = [line.strip() for line in chunk.strip().splitlines() if line.strip()]
+        if not lines:
+            return None, []
+
+        header = None
+        if self.keep_headers and len(lines[0]) <= 120 and HEADER_PATTERN.match(lines[0]):
+            header = lines.pop(0)
+
+        spans: List[str] = []
+        for line in lines:
+            for piece in SPAN_BOUNDARY.split(line):
+                piece = piece.strip()
+                if not piece:
+                    continue
+                if spans and len(piece) < self.min_span_chars:
+                    spans[-1] = f"{spans[-1]} {piece}"
+                else:
+                    spans.append(piece)
+        return header, spans
+
+    def _embed_spans(self, spans: List[str]) -> np.ndarray:
+        """Embed spans, calling the model once for all uncached spans."""
+        with self._lock:
+            found: Dict[str, List[float]] = {}
+            for span in spans:
+                if span not in found and span in self._cache:
+                    self._cache.move_to_end(span)
+                    found[span] = self._cache[span]
+            missing = [span for span in dict.fromkeys(spans) if span not in found]
+            self.cache_hits += len(spans) - len(missing)
+            self.cache_misses += len(missing)
+
+        if missing:
+            vectors = self.embedding_model.embed_documents(missing)
+            found.update(zip(missing, vectors))
+            with self._lock:
+                for span, vector in zip(missing, vectors):
+                    if span not in self._cache:
+                        self.cache_bytes += sys.getsizeof(span) + vector_sizeof(vector)
+                    self._cache[span] = vector
+                while len(self._cache) > self.cache_size:
+                    evicted, evicted_vector = self._cache.popitem(last=False)
+                    self.cache_bytes -= sys.getsizeof(evicted) + vector_sizeof(evicted_vector)
+
+        # Rows come from this call's lookups, so evictions above cannot drop a requested span
+        return np.asarray([found[span] for span in spans], dtype=np.float32)
+
+    def compress(
+        self,
+        query: str,
+        chunks: List[str],
+        query_embedding: Optional[List[float]] = None,
+        compression_ratio: Optional[float] = None,
+    ) -> CompressionResult:
+        """Compress chunks down to their most query-relevant spans.
+
+        Args:
+            query: User query
+            chunks: Retrieved chunks, in rank order
+            query_embedding: Precomputed query embedding, if available
+            compression_ratio: Override of the configured ratio
+
+        Returns:
+            Compressed chunks (same order and count as the input) with stats
+        """
+        ratio = compression_ratio or self.compression_ratio
+        original_chars = sum(len(chunk) for chunk in chunks)
+
+        split = [self.split_spans(chunk) for chunk in chunks]
+        flat = [(c, s, span) for c, (_, spans) in enumerate(split) for s, span in enumerate(spans)]
+        if not flat:
+            return CompressionResult(list(chunks), original_chars, original_chars, 0, 0)
+
+        if query_embedding is None:
+            query_embedding = self.embedding_model.embed_query(query)
+
+        matrix = self._embed_spans([span for _, _, span in flat])
+        vector = np.asarray(query_embedding, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1) * (np.linalg.norm(vector) or 1.0)
+        similarities = matrix @ vector / np.where(norms == 0, 1.0, norms)
+
+        keep_count = max(1, math.ceil(ratio * len(flat)))
+        keep = set(np.argsort(-similarities)[:keep_count].tolist())
+
+        by_chunk: Dict[int, List[int]] = {}
+        for i, (chunk_idx, _, _) in enumerate(flat):
+            by_chunk.setdefault(chunk_idx, []).append(i)
+
+        # Guarantee every chunk contributes its best spans, so sources stay aligned
+        for positions in by_chunk.values():
+            best = sorted(positions, key=lambda i: -similarities[i])
+            keep.update(best[:self.min_spans_per_chunk])
+
+        compressed, kept_spans = [], []
+        for c, (header, spans) in enumerate(split):
+            kept = [flat[i][1] for i in by_chunk.get(c, []) if i in keep]
+            kept_spans.append(kept)
+            parts = [header] if header else []
+            previous = None
+            for s in kept:
+                if previous is not None and s != previous + 1:
+                    parts.append("...")
+                parts.append(spans[s])
+                previous = s
+            compressed.append(" ".join(parts) if parts else chunks[c])
+
+        return CompressionResult(
+            chunks=compressed,
+            original_chars=original_chars,
+            compressed_chars=sum(len(chunk) for chunk in compressed),
+            spans_total=len(flat),
+            spans_kept=sum(len(k) for k in kept_spans),
+            kept_spans=kept_spans,
+        )
@@ -0,0 +1,235 @@
+"""
+Token-budgeted context packing for answer generation.
+
+Chunks are selected whole, by relevance, until a token budget is filled.
+A chunk is only cut when not even the best one fits on its own.
+"""
+import sys
+import logging
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class TokenCounter:
+    """Counts tokens with tiktoken, caching the count for each distinct chunk."""
+
+    def __init__(self, encoding_name: str = "cl100k_base", cache_size: int = 20000):
+        """Initialize the counter.
+
+        Args:
+            encoding_name: tiktoken encoding used as the tokenizer
+            cache_size: Number of per-text counts kept in the LRU cache
+        """
+        self.encoding_name = encoding_name
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, int]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.cache_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+        try:
+            import tiktoken
+            self._encoding = tiktoken.get_encoding(encoding_name)
+        except Exception as e:
+            # Offline hosts cannot download the BPE file; estimate instead
+            logger.warning(f"tiktoken encoding '{encoding_name}' unavailable ({e}); estimating tokens")
+            self._encoding = None
+
+    @property
+    def cache_entries(self) -> int:
+        return len(self._cache)
+
+    @property
+    def name(self) -> str:
+        """Identifier of the tokenizer, used to key cached static counts."""
+        return self.encoding_name if self._encoding is not None else "estimate"
+
+    def _encode(self, text: str) -> List[int]:
+        return self._encoding.encode(text, disallowed_special=())
+
+    def count(self, text: str) -> int:
+        """Return the number of tokens in `text`."""
+        with self._lock:
+            cached = self._cache.get(text)
+            if cached is not None:
+                self._cache.move_to_end(text)
+                self.hits += 1
+                return cached
+
+        tokens = self.count_uncached(text)
+
+        with self._lock:
+            self.misses += 1
+            if text not in self._cache:
+                self.cache_bytes += sys.getsizeof(text) + sys.getsizeof(tokens)
+            self._cache[text] = tokens
+            if len(self._cache) > self.cache_size:
+                evicted, evicted_tokens = self._cache.popitem(last=False)
+                self.cache_bytes -= sys.getsizeof(evicted) + sys.getsizeof(evicted_tokens)
+        return tokens
+
+    def count_uncached(self, text: str) -> int:
+        """Count tokens in `text` without the cache, for one-off texts like prompts and answers."""
+        return len(self._encode(text)) if self._encoding is not None else (len(text) + 3) // 4
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """Cut `text` down to at most `max_tokens` tokens."""
+        if max_tokens <= 0:
+            return ""
+        if self._encoding is None:
+            return text[:max_tokens * 4]
+        return self._encoding.decode(self._encode(text)[:max_tokens])
+
+
+@lru_cache(maxsize=None)
+def get_token_counter(encoding_name: str = "cl100k_base") -> TokenCounter:
+    """Return the process-wide token counter for an encoding, sharing its cache."""
+    return TokenCounter(encoding_name)
+
+
+@dataclass
+class PackedContext:
+    """Result of packing chunks into a token budget."""
+    context: str
+    tokens_used: int
+    tokens_dropped: int
+    selected_indices: List[int] = field(default_factory=list)
+    dropped_indices: List[int] = field(default_factory=list)
+    split_chunk: bool = False
+
+    @property
+    def chunks_used(self) -> int:
+        return len(self.selected_indices)
+
+    @property
+    def chunks_dropped(self) -> int:
+        return len(self.dropped_indices)
+
+
+class ContextPacker:
+    """Fills a token budget with whole chunks, ordered by relevance."""
+
+    def __init__(
+        self,
+        max_tokens: int = 3000,
+        strategy: str = "greedy",
+        separator: str = "\n\n---\n\n",
+        allow_split_fallback: bool = True,
+        token_counter: Optional[TokenCounter] = None,
+    ):
+        """Initialize the packer.
+
+        Args:
+            max_tokens: Token budget for the packed context
+            strategy: "greedy" (by score) or "knapsack" (maximize total score)
+            separator: String placed between chunks
+            allow_split_fallback: Truncate the best chunk when no chunk fits whole
+            token_counter: Token counter (defaults to the shared cl100k_base counter)
+        """
+        if strategy not in ("greedy", "knapsack"):
+            raise ValueError(f"Unsupported packing strategy: {strategy}")
+        self.max_tokens = max_tokens
+        self.strategy = strategy
+        self.separator = separator
+        self.allow_split_fallback = allow_split_fallback
+        self.token_counter = token_counter or get_token_counter()
+
+    def pack(
+        self,
+        chunks: List[str],
+        scores: Optional[List[float]] = None,
+        max_tokens: Optional[int] = None,
+    ) -> PackedContext:
+        """Select chunks that fit the budget and join them.
+
+        Args:
+            chunks: Candidate chunks, in retrieval order
+            scores: Relevance score per chunk (defaults to retrieval order)
+            max_tokens: Override of the configured budget
+
+        Returns:
+            The packed context with token accounting
+        """
+        budget = self.max_tokens if max_tokens is None else max_tokens
+        if not chunks:
+            return PackedContext(context="", tokens_used=0, tokens_dropped=0)
+
+        if scores is None:
+            # Earlier chunks rank higher when no scores are given
+            scores = [float(len(chunks) - i) for i in range(len(chunks))]
+
+        sizes = [self.token_counter.count(chunk) for chunk in chunks]
+        # Every chunk after the first also pays for one separator
+        separator_tokens = self.token_counter.count(self.separator)
+        costs = [size + separator_tokens for size in sizes]
+        capacity = budget + separator_tokens
+
+        ranked = sorted(range(len(chunks)), key=lambda i: scores[i], reverse=True)
+        if self.strategy == "knapsack":
+            selected = self._knapsack(ranked, costs, scores, capacity)
+        else:
+            selected = self._greedy(ranked, costs, capacity)
+
+        if not selected and self.allow_split_fallback and budget > 0:
+            best = ranked[0]
+            truncated = self.token_counter.truncate(chunks[best], budget)
+            logger.debug(f"No chunk fits in {budget} tokens; truncating the top-ranked chunk")
+            dropped = [i for i in ranked if i != best]
+            return PackedContext(
+                context=truncated,
+                tokens_used=self.token_counter.count(truncated),
+                tokens_dropped=sum(sizes[i] for i in dropped) + sizes[best] - budget,
+                selected_indices=[best],
+                dropped_indices=dropped,
+                split_chunk=True,
+            )
+
+        selected_set = set(selected)
+        dropped = [i for i in ranked if i not in selected_set]
+        context = self.separator.join(chunks[i] for i in selected)
+        return PackedContext(
+            context=context,
+            tokens_used=sum(sizes[i] for i in selected) + separator_tokens * max(0, len(selected) - 1),
+            tokens_dropped=sum(sizes[i] for i in dropped),
+            selected_indices=selected,
+            dropped_indices=dropped,
+        )
+
+    @staticmethod
+    def _greedy(ranked: List[int], costs: List[int], capacity: int) -> List[int]:
+        selected, used = [], 0
+        for i in ranked:
+            if used + costs[i] <= capacity:
+                selected.append(i)
+                used += costs[i]
+        return selected
+
+    @staticmethod
+    def _knapsack(ranked: List[int], costs: List[int], scores: List[float], capacity: int) -> List[int]:
+        """0/1 knapsack maximizing the summed score; returns picks in rank order."""
+        if capacity <= 0:
+            return []
+        items = [i for i in ranked if costs[i] <= capacity]
+        best = [0.0] * (capacity + 1)
+        keep = [[False] * (capacity + 1) for _ in items]
+        for n, i in enumerate(items):
+            # Shift so that low or negative scores still count as some value
+            value = max(scores[i], 0.0) + 1e-6
+            for c in range(capacity, costs[i] - 1, -1):
+                candidate = best[c - costs[i]] + value
+                if candidate > best[c]:
+                    best[c] = candidate
+                    keep[n][c] = True
+
+        chosen, c = set(), capacity
+        for n in range(len(items) - 1, -1, -1):
+            if keep[n][c]:
+                chosen.add(items[n])
+                c -= costs[items[n]]
+        return [i for i in ranked if i in chosen]
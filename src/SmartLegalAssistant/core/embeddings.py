@@ -2,10 +2,13 @@
 
 # Embeddings model for text vectorization
 import os
-from typing import List
+import asyncio
+from typing import List, Optional
 from abc import ABC, abstractmethod
 from dotenv import load_dotenv
 from together import Together
+from SmartLegalAssistant.core.clients import get_client_registry, get_together_client
+from SmartLegalAssistant.core.rate_limiter import APIGovernor, get_governor
 from SmartLegalAssistant.utils.exception import CustomException
 
 # Load environment variables from .env
@@ -29,15 +32,45 @@ class EmbeddingModel(ABC):
         """Embeds a list of documents into a list of vector representations."""
         pass
 
+    async def aembed_query(self, text: str) -> List[float]:
+        """Async variant of embedding a single query.
+
+        The default runs the blocking implementation in a worker thread.
+        """
+        return await asyncio.to_thread(self.embed, text)
+
+    async def aembed_documents(self, documents: List[str]) -> List[List[float]]:
+        """Async variant of `embed_documents` (defaults to a worker thread)."""
+        return await asyncio.to_thread(self.embed_documents, documents)
+
 
 class TogetherAIEmbeddings(EmbeddingModel):
     """Embeddings model for text vectorization using TogetherAI."""
 
-    def __init__(self, model_name: str = "BAAI/bge-large-en-v1.5", api_key: str = None):
-        """Initialize Together AI Embeddings model."""
+    def __init__(self, model_name: str = "BAAI/bge-large-en-v1.5", api_key: str = None,
+                 client: Optional[Together] = None, governor: Optional[APIGovernor] = None,
+                 call_type: str = "embedding", async_client=None):
+        """Initialize Together AI Embeddings model.
+
+        Args:
+            model_name: Together AI embedding model to use
+            api_key: Together AI API key
+            client: Pre-built client (defaults to the shared pooled client)
+            governor: Rate limiter shared with other Together callers
+            call_type: Governor call type; use "ingestion" for background indexing jobs
+            async_client: Pre-built AsyncTogether client for the async methods
+        """
         self.model_name = model_name
         self.api_key = api_key or os.getenv("TOGETHER_AI_API_KEY")
-        self.client = None  # Initialize client to None
+        self.client = client
+        self.async_client = async_client
+        # An injected sync client means no shared async client should be used
+        self._shared_async = client is None
+        self.governor = governor or get_governor()
+        self.call_type = call_type
+
+        if self.client is not None:
+            return
 
         if not self.api_key:
             raise ValueError(
@@ -45,7 +78,7 @@ class TogetherAIEmbeddings(EmbeddingModel):
             )
 
         try:
-            self.client = Together(api_key=self.api_key)
+            self.client = get_together_client(self.api_key)
         except Exception as e:
             raise CustomException(
                 e,
@@ -65,7 +98,9 @@ class TogetherAIEmbeddings(EmbeddingModel):
     def embed_query(self, text: str) -> List[float]:
         """Embeds the given text into a vector representation."""
         try:
-            response = self.client.embeddings.create(
+            response = self.governor.call(
+                self.call_type,
+                self.client.embeddings.create,
                 model=self.model_name,
                 input=[text]
             )
@@ -81,7 +116,51 @@ class TogetherAIEmbeddings(EmbeddingModel):
     def embed_documents(self, documents: List[str]) -> List[List[float]]:
         """Embeds a list of documents into a list of vector representations."""
         try:
-            response = self.client.embeddings.create(
+            response = self.governor.call(
+                self.call_type,
+                self.client.embeddings.create,
+                model=self.model_name,
+                input=documents
+            )
+            return [doc.embedding for doc in response.data]
+        except Exception as e:
+            raise CustomException(
+                e,
+                error_type="TogetherAIEmbeddingError",
+                context={"model_name": self.model_name, "input_documents": documents},
+                log_immediately=True,
+            )
+
+    async def aembed_query(self, text: str) -> List[float]:
+        """Embeds the given text without blocking the event loop."""
+        client = get_client_registry().async_client_for(self.api_key, self.async_client, self._shared_async)
+        if client is None:
+            return await super().aembed_query(text)
+        try:
+            response = await self.governor.acall(
+                self.call_type,
+                client.embeddings.create,
+                model=self.model_name,
+                input=[text]
+            )
+            return response.data[0].embedding
+        except Exception as e:
+            raise CustomException(
+                e,
+                error_type="TogetherAIEmbeddingError",
+                context={"model_name": self.model_name, "input_text": text},
+                log_immediately=True,
+            )
+
+    async def aembed_documents(self, documents: List[str]) -> List[List[float]]:
+        """Embeds a list of documents without blocking the event loop."""
+        client = get_client_registry().async_client_for(self.api_key, self.async_client, self._shared_async)
+        if client is None:
+            return await super().aembed_documents(documents)
+        try:
+            response = await self.governor.acall(
+                self.call_type,
+                client.embeddings.create,
                 model=self.model_name,
                 input=documents
             )
@@ -96,9 +175,14 @@ class TogetherAIEmbeddings(EmbeddingModel):
 
 
 def get_embedding_model(model_type: str = "together", **kwargs) -> EmbeddingModel:
-    """Factory function to create embedding models."""
+    """Factory function to create embedding models.
+
+    With RAG_CASSETTE_MODE set, the Together client records to or replays from
+    the cassette (see core/cassette.py).
+    """
     if model_type == "together":
-        return TogetherAIEmbeddings(**kwargs)
+        from SmartLegalAssistant.core.cassette import together_client_kwargs
+        return TogetherAIEmbeddings(**together_client_kwargs(kwargs))
     else:
         raise ValueError(f"Unsupported embedding model type: {model_type}")
 
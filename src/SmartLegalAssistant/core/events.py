@@ -0,0 +1,122 @@
+"""
+Typed progress events emitted by `RAGPipeline.stream_events`.
+
+A request produces, in order:
+
+- `RetrievalStarted`
+- `SourcesReady` as soon as the vector search returns (in similarity order,
+  before reranking), or straight from a cached answer or prepared context
+- `RerankDone` with the reranked sources, when reranking runs
+- `AnswerDelta` for every piece of answer text as it is generated
+- `Final` with the complete result and timings
+
+Each event has an `event` name and a JSON-ready `to_dict()`, which is what
+the HTTP API sends as Server-Sent Events. The helpers at the bottom turn
+pipeline results into events; the pipeline decides which of them to send.
+"""
+import time
+from dataclasses import dataclass, field, fields
+from typing import Any, Callable, ClassVar, Dict, Iterator, List, Optional
+
+# Live streams of a generation result, never part of an event
+_STREAM_KEYS = ("answer_stream", "section_stream")
+# Result keys carried by earlier events (or live streams), left out of Final.to_dict()
+_FINAL_EXCLUDED = _STREAM_KEYS + ("retrieved_chunks", "formatted_chunks", "sources")
+
+
+@dataclass
+class PipelineEvent:
+    """Base class of pipeline events."""
+
+    event: ClassVar[str] = "event"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {f.name: getattr(self, f.name) for f in fields(self)}
+
+
+@dataclass
+class RetrievalStarted(PipelineEvent):
+    """Retrieval has begun."""
+
+    event: ClassVar[str] = "retrieval_started"
+    query: str
+    top_k: int
+
+
+@dataclass
+class SourcesReady(PipelineEvent):
+    """Sources are known; `reranked` is False while reranking is still to come."""
+
+    event: ClassVar[str] = "sources"
+    sources: List[Dict[str, Any]]
+    reranked: bool
+    elapsed_ms: float
+
+
+@dataclass
+class RerankDone(PipelineEvent):
+    """Sources in their final, reranked order."""
+
+    event: ClassVar[str] = "rerank_done"
+    sources: List[Dict[str, Any]]
+    rerank_ms: float
+    elapsed_ms: float
+
+
+@dataclass
+class AnswerDelta(PipelineEvent):
+    """A piece of answer text; `section` names the perspective in perspectives mode."""
+
+    event: ClassVar[str] = "token"
+    delta: str
+    section: Optional[str] = None
+
+
+@dataclass
+class Final(PipelineEvent):
+    """The finished result, plus the prepared context for reuse with another template.
+
+    `prepared` is None when the answer came from the answer cache.
+    """
+
+    event: ClassVar[str] = "final"
+    result: Dict[str, Any]
+    prepared: Optional[Dict[str, Any]] = field(default=None, repr=False)
+
+    @classmethod
+    def from_result(cls, result: Dict[str, Any], prepared: Optional[Dict[str, Any]] = None) -> "Final":
+        """Final event for a result whose streams have been read."""
+        return cls(result={key: value for key, value in result.items() if key not in _STREAM_KEYS},
+                   prepared=prepared)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {key: value for key, value in self.result.items() if key not in _FINAL_EXCLUDED}
+
+
+def elapsed_clock() -> Callable[[], float]:
+    """Milliseconds since this call, as reported in `elapsed_ms`."""
+    started = time.perf_counter()
+    return lambda: round((time.perf_counter() - started) * 1000, 3)
+
+
+def answer_events(result: Dict[str, Any]) -> Iterator[AnswerDelta]:
+    """AnswerDelta events for a result's section stream, or else its answer stream.
+
+    The stream is closed when it ends or the events are abandoned, which
+    stops generation.
+    """
+    sectioned = "section_stream" in result
+    stream = result["section_stream"] if sectioned else result["answer_stream"]
+    try:
+        for item in stream:
+            yield AnswerDelta(delta=item[1], section=item[0]) if sectioned else AnswerDelta(delta=item)
+    finally:
+        close = getattr(stream, "close", None)
+        if close:
+            close()
+
+
+def cached_answer_events(cached: Dict[str, Any], elapsed_ms: Callable[[], float]) -> Iterator[PipelineEvent]:
+    """Sources and answer of a cached result; its sources are final, no rerank follows."""
+    yield SourcesReady(sources=cached.get("sources", []), reranked=True, elapsed_ms=elapsed_ms())
+    yield AnswerDelta(delta=cached["answer"])
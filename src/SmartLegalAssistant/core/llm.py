@@ -3,7 +3,8 @@
 Language model integration for response generation.
 """
 import os
-from typing import List, Optional
+import asyncio
+from typing import AsyncIterator, Iterator, List, Optional
 from abc import ABC, abstractmethod
 
 from dotenv import load_dotenv  # <-- Important for local .env files
@@ -18,27 +19,64 @@ class LanguageModel(ABC):
         """Generate a response from the language model."""
         pass
 
+    def generate_stream(self, prompt: str, **kwargs) -> Iterator[str]:
+        """Yield the response incrementally as text deltas.
+
+        Models without native streaming fall back to a single delta.
+        """
+        yield self.generate(prompt, **kwargs)
+
+    async def agenerate(self, prompt: str, **kwargs) -> str:
+        """Async variant of `generate` (defaults to a worker thread)."""
+        return await asyncio.to_thread(self.generate, prompt, **kwargs)
+
+    async def agenerate_stream(self, prompt: str, **kwargs) -> AsyncIterator[str]:
+        """Async variant of `generate_stream` (defaults to a single delta)."""
+        yield await self.agenerate(prompt, **kwargs)
+
 
 class TogetherAILanguageModel(LanguageModel):
     """Language model implementation using Together AI."""
 
-    def __init__(self, model_name: str = "mistralai/Mistral-Small-24B-Instruct-2501", api_key: Optional[str] = None):
-        """Initialize Together AI language model."""
-        from together import Together  # Delayed import to avoid unnecessary dependency issues
+    def __init__(self, model_name: str = "mistralai/Mistral-Small-24B-Instruct-2501", api_key: Optional[str] = None,
+                 client=None, governor=None, async_client=None):
+        """Initialize Together AI language model.
+
+        Args:
+            model_name: Together AI chat model to use
+            api_key: Together AI API key
+            client: Pre-built Together client (defaults to the shared pooled client)
+            governor: Rate limiter shared with other Together callers
+            async_client: Pre-built AsyncTogether client for the async methods
+        """
+        # Delayed import to avoid unnecessary dependency issues
+        from SmartLegalAssistant.core.clients import get_together_client
+        from SmartLegalAssistant.core.rate_limiter import get_governor
 
         self.model_name = model_name
         self.api_key = api_key or os.getenv("TOGETHER_AI_API_KEY")
+        self.client = client
+        self.async_client = async_client
+        # An injected sync client means no shared async client should be used
+        self._shared_async = client is None
+        self.governor = governor or get_governor()
 
-        if not self.api_key:
-            raise ValueError("Please provide a Together AI API key or set the TOGETHER_AI_API_KEY environment variable.")
+        if self.client is None:
+            if not self.api_key:
+                raise ValueError("Please provide a Together AI API key or set the TOGETHER_AI_API_KEY environment variable.")
 
-        self.client = Together(api_key=self.api_key)
+            self.client = get_together_client(self.api_key)
 
     def generate(self, prompt: str, temperature: float = 0.2, max_tokens: int = 1000,
-                 stop_sequences: Optional[List[str]] = None) -> str:
-        """Generate a response from the Together AI model."""
+                 stop_sequences: Optional[List[str]] = None, call_type: str = "generation") -> str:
+        """Generate a response from the Together AI model.
+
+        `call_type` selects the rate-limiter priority (e.g. "expansion" for query rewriting).
+        """
         try:
-            response = self.client.chat.completions.create(
+            response = self.governor.call(
+                call_type,
+                self.client.chat.completions.create,
                 model=self.model_name,
                 messages=[{"role": "user", "content": prompt}],
                 temperature=temperature,
@@ -49,11 +87,101 @@ class TogetherAILanguageModel(LanguageModel):
         except Exception as e:
             raise RuntimeError(f"Error during Together AI generation: {e}")
 
+    def generate_stream(self, prompt: str, temperature: float = 0.2, max_tokens: int = 1000,
+                        stop_sequences: Optional[List[str]] = None,
+                        call_type: str = "generation") -> Iterator[str]:
+        """Stream a response from the Together AI model as text deltas.
+
+        The governor slot is held until the stream is exhausted or closed.
+        """
+        stream = self.governor.stream(
+            call_type,
+            self.client.chat.completions.create,
+            model=self.model_name,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=temperature,
+            max_tokens=max_tokens,
+            stop=stop_sequences,
+            stream=True
+        )
+        try:
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    yield delta
+        except Exception as e:
+            raise RuntimeError(f"Error during Together AI streaming: {e}")
+        finally:
+            # Releases the slot and the pooled connection if the consumer stops early
+            stream.close()
+
+    async def agenerate(self, prompt: str, temperature: float = 0.2, max_tokens: int = 1000,
+                        stop_sequences: Optional[List[str]] = None, call_type: str = "generation") -> str:
+        """Generate a response without blocking the event loop."""
+        from SmartLegalAssistant.core.clients import get_client_registry
+        client = get_client_registry().async_client_for(self.api_key, self.async_client, self._shared_async)
+        if client is None:
+            return await super().agenerate(prompt, temperature=temperature, max_tokens=max_tokens,
+                                           stop_sequences=stop_sequences, call_type=call_type)
+        try:
+            response = await self.governor.acall(
+                call_type,
+                client.chat.completions.create,
+                model=self.model_name,
+                messages=[{"role": "user", "content": prompt}],
+                temperature=temperature,
+                max_tokens=max_tokens,
+                stop=stop_sequences
+            )
+            return response.choices[0].message.content
+        except Exception as e:
+            raise RuntimeError(f"Error during Together AI generation: {e}")
+
+    async def agenerate_stream(self, prompt: str, temperature: float = 0.2, max_tokens: int = 1000,
+                               stop_sequences: Optional[List[str]] = None,
+                               call_type: str = "generation") -> AsyncIterator[str]:
+        """Stream a response as text deltas without blocking the event loop.
+
+        Like `generate_stream`, the governor slot is held until the stream ends.
+        """
+        from SmartLegalAssistant.core.clients import get_client_registry
+        client = get_client_registry().async_client_for(self.api_key, self.async_client, self._shared_async)
+        if client is None:
+            async for delta in super().agenerate_stream(prompt, temperature=temperature, max_tokens=max_tokens,
+                                                        stop_sequences=stop_sequences, call_type=call_type):
+                yield delta
+            return
+
+        stream = self.governor.astream(
+            call_type,
+            client.chat.completions.create,
+            model=self.model_name,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=temperature,
+            max_tokens=max_tokens,
+            stop=stop_sequences,
+            stream=True
+        )
+        try:
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    yield delta
+        except Exception as e:
+            raise RuntimeError(f"Error during Together AI streaming: {e}")
+        finally:
+            await stream.aclose()
+
 
 def get_language_model(model_type: str = "together", **kwargs) -> LanguageModel:
-    """Factory to create a language model instance."""
+    """Factory to create a language model instance (cassette-aware, see core/cassette.py)."""
     if model_type == "together":
-        return TogetherAILanguageModel(**kwargs)
+        from SmartLegalAssistant.core.cassette import together_client_kwargs
+        return TogetherAILanguageModel(**together_client_kwargs(kwargs))
     else:
         raise ValueError(f"Unsupported language model type: {model_type}")
 
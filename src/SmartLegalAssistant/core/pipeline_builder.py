@@ -0,0 +1,111 @@
+"""
+Builds the RAG pipeline served by the Streamlit app and the HTTP API.
+
+Every component comes from its environment-configured factory, so both
+front ends run the same stack. Stages that change the answers (model
+routing, near-duplicate cache hits, compression, speculation) are off
+unless enabled here.
+
+Configuration (environment):
+    PINECONE_INDEX_NAME, PINECONE_NAMESPACE
+    LLM_ROUTING=0                       # 1 routes simple lookups to the small model
+    ANSWER_CACHE_DIR=cache/answers
+    ANSWER_CACHE_TTL_SECONDS=604800
+    ANSWER_CACHE_SEMANTIC_THRESHOLD=    # e.g. 0.97; unset matches exact queries only
+    EXTRACTIVE_COMPRESSION=0            # 1 attaches the compressor
+    COMPRESSION_RATIO=0.4
+    SPECULATIVE_GENERATION=0
+    SPECULATION_THRESHOLD=0.8
+    ASYNC_PIPELINE=0
+"""
+import os
+import logging
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+
+def build_rag_pipeline():
+    """Build a RAGPipeline from the environment-configured components.
+
+    The factories are looked up when called (not at import), so tools that
+    patch them (benchmarks, replay) also apply here.
+
+    Returns:
+        RAGPipeline instance
+    """
+    from SmartLegalAssistant.core.embeddings import get_embedding_model
+    from SmartLegalAssistant.core.vector_store import get_vector_store
+    from SmartLegalAssistant.core.llm import get_language_model
+    from SmartLegalAssistant.core.reranker import get_reranker
+    from SmartLegalAssistant.core.answer_generator import AnswerGenerator, RAGPipeline
+    from SmartLegalAssistant.core.answer_cache import AnswerCache
+    from SmartLegalAssistant.core.compressor import ExtractiveCompressor
+    from SmartLegalAssistant.core.router import get_llm_router
+    from SmartLegalAssistant.core.retriever import Retriever
+
+    # Initialize embedding model
+    embedding_model = get_embedding_model(model_type="together")
+
+    # Initialize vector store
+    vector_store = get_vector_store(
+        store_type="pinecone",
+        index_name=os.getenv("PINECONE_INDEX_NAME"),
+        namespace=os.getenv("PINECONE_NAMESPACE", "")
+    )
+
+    # Initialize LLM
+    llm = get_language_model(model_type="together")
+
+    # Initialize reranker
+    reranker = get_reranker(reranker_type="together_ai")
+
+    # Initialize retriever
+    retriever = Retriever(
+        embedding_model=embedding_model,
+        vector_store=vector_store,
+        reranker=reranker,
+        llm=llm
+    )
+
+    # Route simple lookups to a smaller, faster model (opt in with LLM_ROUTING=1)
+    router = get_llm_router(default_llm=llm) if os.getenv("LLM_ROUTING", "0") == "1" else None
+
+    # Initialize answer generator
+    answer_generator = AnswerGenerator(
+        llm=llm,
+        default_template_type="legal_assistant",
+        temperature=0.2,
+        router=router
+    )
+
+    # Initialize answer cache (near-duplicate matching reuses the query embedding)
+    semantic_threshold = os.getenv("ANSWER_CACHE_SEMANTIC_THRESHOLD")
+    answer_cache = AnswerCache(
+        cache_dir=os.getenv("ANSWER_CACHE_DIR", "cache/answers"),
+        ttl_seconds=float(os.getenv("ANSWER_CACHE_TTL_SECONDS", 7 * 24 * 3600)),
+        semantic_threshold=float(semantic_threshold) if semantic_threshold else None
+    )
+
+    # Initialize extractive compression (used when requested per query)
+    compressor = None
+    if os.getenv("EXTRACTIVE_COMPRESSION", "0") == "1":
+        compressor = ExtractiveCompressor(
+            embedding_model=embedding_model,
+            compression_ratio=float(os.getenv("COMPRESSION_RATIO", "0.4"))
+        )
+
+    # Initialize RAG pipeline
+    return RAGPipeline(
+        retriever=retriever,
+        answer_generator=answer_generator,
+        default_top_k=25,
+        answer_cache=answer_cache,
+        compressor=compressor,
+        speculative=os.getenv("SPECULATIVE_GENERATION", "0") == "1",
+        speculation_threshold=float(os.getenv("SPECULATION_THRESHOLD", "0.8")),
+        use_async=os.getenv("ASYNC_PIPELINE", "0") == "1"
+    )
@@ -0,0 +1,533 @@
+"""
+Client-side rate limiting and concurrency control for the Together AI API.
+
+Every Together-backed component spends the same API key's request budget, so
+they all acquire slots from one shared governor. Callers queue by priority
+instead of failing, and 429 responses put the whole process into a short
+cool-down before the call is retried. Timeouts, dropped connections and 5xx
+responses are retried with a back-off for that call only. The Together SDK's
+own retries are off (see core/clients.py), so this is the only retry layer.
+"""
+import os
+import time
+import asyncio
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager, asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Callable, Deque, Dict, Iterable, Iterator, List, Optional
+
+from dotenv import load_dotenv
+
+from SmartLegalAssistant.utils import metrics
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+BACKEND_CALL_SECONDS = metrics.histogram(
+    "rag_backend_call_duration_seconds", "Latency of remote API calls", ["backend", "call_type"]
+)
+BACKEND_ERRORS = metrics.counter(
+    "rag_backend_errors_total", "Failed remote API calls by kind (error, timeout, rate_limited, queue_timeout)",
+    ["backend", "call_type", "kind"]
+)
+QUEUE_WAIT_SECONDS = metrics.histogram(
+    "rag_api_queue_wait_seconds", "Time spent waiting for a Together API slot", ["call_type"]
+)
+
+
+@dataclass(frozen=True)
+class CallTypeLimit:
+    """Scheduling policy for one kind of API call.
+
+    Attributes:
+        priority: Lower values are served first when callers are queued
+        max_concurrency: Cap on in-flight calls of this type (None = global cap only)
+    """
+    priority: int
+    max_concurrency: Optional[int] = None
+
+
+# User-facing generation is served ahead of retrieval calls, bulk runs
+# (`RAGPipeline.process_queries`) generate behind interactive traffic, and
+# background ingestion only gets a small share of the concurrency budget.
+DEFAULT_CALL_LIMITS: Dict[str, CallTypeLimit] = {
+    "generation": CallTypeLimit(priority=0),
+    "embedding": CallTypeLimit(priority=1),
+    "rerank": CallTypeLimit(priority=1),
+    "expansion": CallTypeLimit(priority=2),
+    "batch_generation": CallTypeLimit(priority=3),
+    "ingestion": CallTypeLimit(priority=9, max_concurrency=2),
+}
+
+
+class RateLimitTimeout(TimeoutError):
+    """Raised when a caller waited longer than the governor's max_queue_wait."""
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at a fixed rate (not thread-safe)."""
+
+    def __init__(self, rate: float, capacity: float):
+        """Initialize the bucket.
+
+        Args:
+            rate: Tokens added per second
+            capacity: Maximum number of tokens (burst size)
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def delay_for(self, amount: float, now: Optional[float] = None) -> float:
+        """Return seconds until `amount` tokens are available (0.0 if they are now)."""
+        self._refill(now or time.monotonic())
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def consume(self, amount: float) -> None:
+        """Remove tokens from the bucket."""
+        self.tokens -= amount
+
+    def drain(self) -> None:
+        """Empty the bucket, e.g. after the server reported a rate limit."""
+        self.tokens = 0.0
+        self.updated_at = time.monotonic()
+
+
+class _Ticket:
+    """A queued request for a slot."""
+    __slots__ = ("priority", "seq", "call_type", "cost", "enqueued_at")
+
+    def __init__(self, priority: int, seq: int, call_type: str, cost: float):
+        self.priority = priority
+        self.seq = seq
+        self.call_type = call_type
+        self.cost = cost
+        self.enqueued_at = time.monotonic()
+
+    def sort_key(self):
+        return self.priority, self.seq
+
+
+def is_rate_limit_error(error: BaseException) -> bool:
+    """Return True if the exception represents an HTTP 429 from the API."""
+    if type(error).__name__ == "RateLimitError":
+        return True
+    status = getattr(error, "status_code", None) or getattr(error, "http_status", None)
+    return status == 429
+
+
+def is_timeout_error(error: Optional[BaseException]) -> bool:
+    """Return True if the exception is a client-side or HTTP timeout."""
+    if isinstance(error, (TimeoutError, asyncio.TimeoutError)):
+        return True
+    return error is not None and "Timeout" in type(error).__name__
+
+
+def is_transient_error(error: BaseException) -> bool:
+    """Return True for failures worth retrying: timeouts, dropped connections and 5xx responses."""
+    if is_timeout_error(error) or type(error).__name__ == "APIConnectionError":
+        return True
+    status = getattr(error, "status_code", None) or getattr(error, "http_status", None)
+    return isinstance(status, int) and (status >= 500 or status == 408)
+
+
+def _retry_after(error: BaseException) -> Optional[float]:
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        value = headers.get("retry-after")
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+class APIGovernor:
+    """Token bucket plus concurrency semaphore shared by all Together API callers."""
+
+    def __init__(
+        self,
+        requests_per_second: float = 10.0,
+        burst: Optional[float] = None,
+        max_concurrency: int = 8,
+        call_limits: Optional[Dict[str, CallTypeLimit]] = None,
+        max_retries: int = 5,
+        max_transient_retries: int = 2,
+        backoff_base: float = 0.5,
+        backoff_max: float = 30.0,
+        max_queue_wait: Optional[float] = None,
+        poll_interval: float = 0.05,
+    ):
+        """Initialize the governor.
+
+        Args:
+            requests_per_second: Sustained request rate allowed for the API key
+            burst: Bucket capacity (defaults to one second of requests)
+            max_concurrency: Maximum in-flight calls across all call types
+            call_limits: Per-call-type priorities and concurrency caps
+            max_retries: Retries after a 429 before the error is raised
+            max_transient_retries: Retries after a timeout, connection error or 5xx
+            backoff_base: First cool-down after a 429 (or back-off after a
+                transient error), doubled on each retry
+            backoff_max: Upper bound for a single cool-down
+            max_queue_wait: Give up waiting for a slot after this many seconds (None = wait)
+            poll_interval: Longest a waiter sleeps before re-checking the queue
+        """
+        self.bucket = TokenBucket(requests_per_second, burst or max(1.0, requests_per_second))
+        self.max_concurrency = max_concurrency
+        self.call_limits = dict(DEFAULT_CALL_LIMITS)
+        self.call_limits.update(call_limits or {})
+        self.max_retries = max_retries
+        self.max_transient_retries = max_transient_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_queue_wait = max_queue_wait
+        self.poll_interval = poll_interval
+
+        self._lock = threading.Lock()
+        self._condition = threading.Condition(self._lock)
+        self._waiters: List[_Ticket] = []
+        self._seq = 0
+        self._in_flight = 0
+        self._in_flight_by_type: Dict[str, int] = {}
+        self._cooldown_until = 0.0
+        self._stats: Dict[str, Dict[str, Any]] = {}
+
+    @classmethod
+    def from_env(cls) -> "APIGovernor":
+        """Build a governor from TOGETHER_RATE_LIMIT_* environment variables."""
+        max_wait = os.getenv("TOGETHER_RATE_LIMIT_MAX_QUEUE_WAIT")
+        burst = os.getenv("TOGETHER_RATE_LIMIT_BURST")
+        return cls(
+            requests_per_second=float(os.getenv("TOGETHER_RATE_LIMIT_RPS", "10")),
+            burst=float(burst) if burst else None,
+            max_concurrency=int(os.getenv("TOGETHER_MAX_CONCURRENCY", "8")),
+            max_retries=int(os.getenv("TOGETHER_RATE_LIMIT_MAX_RETRIES", "5")),
+            max_transient_retries=int(os.getenv("TOGETHER_TRANSIENT_MAX_RETRIES", "2")),
+            max_queue_wait=float(max_wait) if max_wait else None,
+        )
+
+    # ------------------------------------------------------------------
+    # Slot acquisition
+    # ------------------------------------------------------------------
+
+    def _limit(self, call_type: str) -> CallTypeLimit:
+        return self.call_limits.get(call_type) or CallTypeLimit(priority=5)
+
+    def _enqueue(self, call_type: str, cost: float) -> _Ticket:
+        with self._lock:
+            self._seq += 1
+            ticket = _Ticket(self._limit(call_type).priority, self._seq, call_type, cost)
+            self._waiters.append(ticket)
+            self._waiters.sort(key=_Ticket.sort_key)
+            return ticket
+
+    def _has_capacity(self, call_type: str) -> bool:
+        if self._in_flight >= self.max_concurrency:
+            return False
+        cap = self._limit(call_type).max_concurrency
+        return cap is None or self._in_flight_by_type.get(call_type, 0) < cap
+
+    def _try_acquire(self, ticket: _Ticket) -> float:
+        """Grant the slot if possible; otherwise return seconds to wait. Caller holds the lock."""
+        now = time.monotonic()
+        if now < self._cooldown_until:
+            return self._cooldown_until - now
+
+        # A higher-priority caller that could run right now goes first.
+        for other in self._waiters:
+            if other is ticket:
+                break
+            if self._has_capacity(other.call_type):
+                return self.poll_interval
+
+        if not self._has_capacity(ticket.call_type):
+            return self.poll_interval
+
+        delay = self.bucket.delay_for(ticket.cost, now)
+        if delay > 0:
+            return delay
+
+        self.bucket.consume(ticket.cost)
+        self._waiters.remove(ticket)
+        self._in_flight += 1
+        self._in_flight_by_type[ticket.call_type] = self._in_flight_by_type.get(ticket.call_type, 0) + 1
+        self._record_wait(ticket.call_type, now - ticket.enqueued_at)
+        QUEUE_WAIT_SECONDS.observe(now - ticket.enqueued_at, call_type=ticket.call_type)
+        return 0.0
+
+    def _abandon(self, ticket: _Ticket) -> None:
+        with self._condition:
+            if ticket in self._waiters:
+                self._waiters.remove(ticket)
+            self._condition.notify_all()
+
+    def _check_timeout(self, ticket: _Ticket) -> None:
+        if self.max_queue_wait is not None and time.monotonic() - ticket.enqueued_at > self.max_queue_wait:
+            BACKEND_ERRORS.inc(backend="together", call_type=ticket.call_type, kind="queue_timeout")
+            raise RateLimitTimeout(
+                f"Waited more than {self.max_queue_wait}s for a '{ticket.call_type}' API slot"
+            )
+
+    def _release(self, call_type: str) -> None:
+        with self._condition:
+            self._in_flight -= 1
+            self._in_flight_by_type[call_type] -= 1
+            self._condition.notify_all()
+
+    def acquire(self, call_type: str, cost: float = 1.0) -> None:
+        """Block until a slot for `call_type` is granted."""
+        ticket = self._enqueue(call_type, cost)
+        try:
+            with self._condition:
+                while True:
+                    delay = self._try_acquire(ticket)
+                    if delay == 0.0:
+                        return
+                    self._check_timeout(ticket)
+                    self._condition.wait(timeout=min(delay, self.poll_interval))
+        except BaseException:
+            self._abandon(ticket)
+            raise
+
+    async def aacquire(self, call_type: str, cost: float = 1.0) -> None:
+        """Wait on the event loop until a slot for `call_type` is granted."""
+        ticket = self._enqueue(call_type, cost)
+        try:
+            while True:
+                with self._lock:
+                    delay = self._try_acquire(ticket)
+                if delay == 0.0:
+                    return
+                self._check_timeout(ticket)
+                await asyncio.sleep(min(delay, self.poll_interval))
+        except BaseException:
+            self._abandon(ticket)
+            raise
+
+    @contextmanager
+    def slot(self, call_type: str, cost: float = 1.0):
+        """Hold an API slot for the duration of the block."""
+        self.acquire(call_type, cost)
+        try:
+            yield
+        finally:
+            self._release(call_type)
+
+    @asynccontextmanager
+    async def aslot(self, call_type: str, cost: float = 1.0):
+        """Async counterpart of `slot`."""
+        await self.aacquire(call_type, cost)
+        try:
+            yield
+        finally:
+            self._release(call_type)
+
+    # ------------------------------------------------------------------
+    # Governed calls with 429 handling
+    # ------------------------------------------------------------------
+
+    def _on_rate_limited(self, call_type: str, error: BaseException, attempt: int) -> None:
+        delay = _retry_after(error) or min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        with self._lock:
+            self._cooldown_until = max(self._cooldown_until, time.monotonic() + delay)
+            self.bucket.drain()
+            self._stat(call_type)["rate_limited"] += 1
+        BACKEND_ERRORS.inc(backend="together", call_type=call_type, kind="rate_limited")
+        logger.warning(f"Together API rate limit hit on '{call_type}' call; backing off {delay:.2f}s")
+
+    def _retry_delay(self, call_type: str, error: BaseException, attempt: int) -> Optional[float]:
+        """Seconds to wait before retrying a failed call, or None to give up and raise."""
+        if attempt >= self.max_retries:
+            return None
+        if is_rate_limit_error(error):
+            # The process-wide cool-down delays the next slot; no extra wait here
+            self._on_rate_limited(call_type, error, attempt)
+            return 0.0
+        if is_transient_error(error) and attempt < self.max_transient_retries:
+            delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+            logger.warning(f"Together API '{call_type}' call failed ({type(error).__name__}); retrying in {delay:.2f}s")
+            return delay
+        return None
+
+    def call(self, call_type: str, fn: Callable[..., Any], *args, cost: float = 1.0, **kwargs) -> Any:
+        """Run `fn` inside a slot, queueing and retrying on 429 instead of failing."""
+        for attempt in range(self.max_retries + 1):
+            with self.slot(call_type, cost):
+                start = time.perf_counter()
+                try:
+                    return fn(*args, **kwargs)
+                except Exception as e:
+                    delay = self._retry_delay(call_type, e, attempt)
+                    if delay is None:
+                        self._count_error(call_type, e)
+                        raise
+                finally:
+                    BACKEND_CALL_SECONDS.observe(time.perf_counter() - start, backend="together", call_type=call_type)
+            time.sleep(delay)
+
+    def stream(self, call_type: str, fn: Callable[..., Iterable[Any]], *args, cost: float = 1.0,
+               **kwargs) -> Iterator[Any]:
+        """Open a streaming call with `fn` and yield its items, holding one slot throughout.
+
+        Opening is retried like `call`. The slot is released once the stream
+        is exhausted, fails, or the consumer closes this generator, so long
+        streamed generations count against the concurrency caps.
+        """
+        for attempt in range(self.max_retries + 1):
+            with self.slot(call_type, cost):
+                start = time.perf_counter()
+                try:
+                    stream = fn(*args, **kwargs)
+                except Exception as e:
+                    delay = self._retry_delay(call_type, e, attempt)
+                    if delay is None:
+                        self._count_error(call_type, e)
+                        raise
+                else:
+                    try:
+                        yield from stream
+                    finally:
+                        # Closing releases the pooled connection if the consumer stops early
+                        close = getattr(stream, "close", None)
+                        if close:
+                            close()
+                    return
+                finally:
+                    BACKEND_CALL_SECONDS.observe(time.perf_counter() - start, backend="together", call_type=call_type)
+            time.sleep(delay)
+
+    async def acall(self, call_type: str, fn: Callable[..., Any], *args, cost: float = 1.0, **kwargs) -> Any:
+        """Async counterpart of `call`; `fn` must return an awaitable."""
+        for attempt in range(self.max_retries + 1):
+            async with self.aslot(call_type, cost):
+                start = time.perf_counter()
+                try:
+                    return await fn(*args, **kwargs)
+                except Exception as e:
+                    delay = self._retry_delay(call_type, e, attempt)
+                    if delay is None:
+                        self._count_error(call_type, e)
+                        raise
+                finally:
+                    BACKEND_CALL_SECONDS.observe(time.perf_counter() - start, backend="together", call_type=call_type)
+            await asyncio.sleep(delay)
+
+    async def astream(self, call_type: str, fn: Callable[..., Any], *args, cost: float = 1.0,
+                      **kwargs) -> AsyncIterator[Any]:
+        """Async counterpart of `stream`; `fn` must return an awaitable async iterable."""
+        for attempt in range(self.max_retries + 1):
+            async with self.aslot(call_type, cost):
+                start = time.perf_counter()
+                try:
+                    stream = await fn(*args, **kwargs)
+                except Exception as e:
+                    delay = self._retry_delay(call_type, e, attempt)
+                    if delay is None:
+                        self._count_error(call_type, e)
+                        raise
+                else:
+                    try:
+                        async for item in stream:
+                            yield item
+                    finally:
+                        close = getattr(stream, "close", None)
+                        if close:
+                            await close()
+                    return
+                finally:
+                    BACKEND_CALL_SECONDS.observe(time.perf_counter() - start, backend="together", call_type=call_type)
+            await asyncio.sleep(delay)
+
+    # ------------------------------------------------------------------
+    # Statistics
+    # ------------------------------------------------------------------
+
+    def _stat(self, call_type: str) -> Dict[str, Any]:
+        stat = self._stats.get(call_type)
+        if stat is None:
+            stat = {"calls": 0, "rate_limited": 0, "errors": 0, "wait_total": 0.0,
+                    "waits": deque(maxlen=1000)}
+            self._stats[call_type] = stat
+        return stat
+
+    def _record_wait(self, call_type: str, wait: float) -> None:
+        stat = self._stat(call_type)
+        stat["calls"] += 1
+        stat["wait_total"] += wait
+        stat["waits"].append(wait)
+
+    def _count_error(self, call_type: str, error: Optional[BaseException] = None) -> None:
+        with self._lock:
+            self._stat(call_type)["errors"] += 1
+        if is_rate_limit_error(error):
+            kind = "rate_limited"
+        elif is_timeout_error(error):
+            kind = "timeout"
+        else:
+            kind = "error"
+        BACKEND_ERRORS.inc(backend="together", call_type=call_type, kind=kind)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return queue-wait and throttling statistics per call type."""
+        with self._lock:
+            per_type = {}
+            for call_type, stat in self._stats.items():
+                waits: Deque[float] = stat["waits"]
+                ordered = sorted(waits)
+                per_type[call_type] = {
+                    "calls": stat["calls"],
+                    "rate_limited": stat["rate_limited"],
+                    "errors": stat["errors"],
+                    "in_flight": self._in_flight_by_type.get(call_type, 0),
+                    "avg_wait_seconds": stat["wait_total"] / stat["calls"] if stat["calls"] else 0.0,
+                    "p95_wait_seconds": ordered[int(0.95 * (len(ordered) - 1))] if ordered else 0.0,
+                    "max_wait_seconds": ordered[-1] if ordered else 0.0,
+                }
+            return {
+                "in_flight": self._in_flight,
+                "queued": len(self._waiters),
+                "call_types": per_type,
+            }
+
+
+_governor: Optional[APIGovernor] = None
+_governor_lock = threading.Lock()
+
+
+def _in_flight_by_type() -> Dict[tuple, int]:
+    governor = _governor
+    if governor is None:
+        return {}
+    with governor._lock:
+        return {(call_type,): count for call_type, count in governor._in_flight_by_type.items()}
+
+
+metrics.gauge("rag_api_in_flight", "Together API calls in flight", ["call_type"]).set_function(_in_flight_by_type)
+
+
+def get_governor() -> APIGovernor:
+    """Return the process-wide Together API governor."""
+    global _governor
+    if _governor is None:
+        with _governor_lock:
+            if _governor is None:
+                _governor = APIGovernor.from_env()
+    return _governor
+
+
+def configure_governor(**kwargs) -> APIGovernor:
+    """Replace the process-wide governor, e.g. to match a different API tier."""
+    global _governor
+    with _governor_lock:
+        _governor = APIGovernor(**kwargs)
+    return _governor
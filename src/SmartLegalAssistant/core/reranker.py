@@ -2,11 +2,17 @@
 
 # Reranker
 import os
+import asyncio
+import logging
 from together import Together
 from typing import List, Dict, Any, Optional
 from dotenv import load_dotenv
+from SmartLegalAssistant.core.clients import get_client_registry, get_together_client
+from SmartLegalAssistant.core.rate_limiter import APIGovernor, get_governor
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 class Reranker:
     """Base class for reranking implementations."""
 
@@ -14,26 +20,46 @@ class Reranker:
         """Rerank the top_n documents based on the query."""
         raise NotImplementedError("Subclasses must implement the rerank method.")
 
+    async def arerank(self, query: str, documents: List[Dict[str, Any]], top_n: Optional[int]) -> List[Dict[str, Any]]:
+        """Async variant of `rerank` (defaults to a worker thread)."""
+        return await asyncio.to_thread(self.rerank, query, documents, top_n)
+
 
 class TogetherAIReranker(Reranker):
     """Reranker implementation using Together AI's Llama-Rank model."""
 
-    def __init__(self, api_key: Optional[str] = None, model: str = "Salesforce/Llama-Rank-V1"):
+    def __init__(self, api_key: Optional[str] = None, model: str = "Salesforce/Llama-Rank-V1",
+                 client: Optional[Together] = None, governor: Optional[APIGovernor] = None,
+                 async_client=None):
         """Initialize Together AI Reranker.
 
         Args:
             api_key: Together AI API key
             model: Together AI reranking model to use
+            client: Pre-built client (defaults to the shared pooled client)
+            governor: Rate limiter shared with other Together callers
+            async_client: Pre-built AsyncTogether client for `arerank`
         """
         self.api_key = api_key or os.getenv("TOGETHER_AI_API_KEY")  # <-- Fixed here
-        if not self.api_key:
-            raise ValueError("Please provide a Together AI API key or set the TOGETHER_AI_API_KEY environment variable.")
-
-        self.client = Together(api_key=self.api_key)
+        self.client = client
+        self.async_client = async_client
+        # An injected sync client means no shared async client should be used
+        self._shared_async = client is None
+        if self.client is None:
+            if not self.api_key:
+                raise ValueError("Please provide a Together AI API key or set the TOGETHER_AI_API_KEY environment variable.")
+
+            self.client = get_together_client(self.api_key)
         self.model = model
+        self.governor = governor or get_governor()
 
     def rerank(self, query: str, documents: List[Dict[str, Any]], top_n: Optional[int]) -> List[Dict[str, Any]]:
-        """Rerank documents using Together AI's reranker model."""
+        """Rerank documents using Together AI's reranker model.
+
+        Raises:
+            RuntimeError: If the rerank call fails, rather than silently
+                returning no documents
+        """
         if not documents:
             return []
 
@@ -41,17 +67,49 @@ class TogetherAIReranker(Reranker):
         doc_texts = [doc.get("text", "") for doc in documents]
 
         try:
-            response = self.client.rerank.create(
+            response = self.governor.call(
+                "rerank",
+                self.client.rerank.create,
                 model=self.model,
                 query=query,
                 documents=doc_texts,
                 top_n=top_n or len(doc_texts)
             )
         except Exception as e:
-            print(f"Error while calling Together AI API: {e}")
+            logger.error(f"Error while calling Together AI rerank API: {e}")
+            raise RuntimeError(f"Error during Together AI reranking: {e}") from e
+
+        return self._apply_results(documents, response)
+
+    async def arerank(self, query: str, documents: List[Dict[str, Any]], top_n: Optional[int]) -> List[Dict[str, Any]]:
+        """Rerank documents without blocking the event loop."""
+        if not documents:
             return []
 
-        # Reorder documents based on reranking results
+        client = get_client_registry().async_client_for(self.api_key, self.async_client, self._shared_async)
+        if client is None:
+            return await super().arerank(query, documents, top_n)
+
+        doc_texts = [doc.get("text", "") for doc in documents]
+
+        try:
+            response = await self.governor.acall(
+                "rerank",
+                client.rerank.create,
+                model=self.model,
+                query=query,
+                documents=doc_texts,
+                top_n=top_n or len(doc_texts)
+            )
+        except Exception as e:
+            logger.error(f"Error while calling Together AI rerank API: {e}")
+            raise RuntimeError(f"Error during Together AI reranking: {e}") from e
+
+        return self._apply_results(documents, response)
+
+    @staticmethod
+    def _apply_results(documents: List[Dict[str, Any]], response) -> List[Dict[str, Any]]:
+        """Reorder documents based on reranking results."""
         reranked_docs = []
         for result in response.results:
             original_doc = documents[result.index]
@@ -62,9 +120,10 @@ class TogetherAIReranker(Reranker):
 
 
 def get_reranker(reranker_type: str = "together_ai", **kwargs) -> Reranker:
-    """Factory to get a reranker instance."""
+    """Factory to get a reranker instance (cassette-aware, see core/cassette.py)."""
     if reranker_type == "together_ai":
-        return TogetherAIReranker(**kwargs)
+        from SmartLegalAssistant.core.cassette import together_client_kwargs
+        return TogetherAIReranker(**together_client_kwargs(kwargs))
     else:
         raise ValueError(f"Unknown reranker type: {reranker_type}")
 
@@ -3,11 +3,16 @@
 
 from typing import List, Dict, Any, Optional, Tuple
 import re
+import asyncio
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
 
 from SmartLegalAssistant.core.embeddings import EmbeddingModel
 from SmartLegalAssistant.core.vector_store import VectorStore
 from SmartLegalAssistant.core.llm import LanguageModel
 from SmartLegalAssistant.core.reranker import Reranker
+from SmartLegalAssistant.core.async_runner import gather_cancelling
+from SmartLegalAssistant.utils import tracing
 
 
 class Retriever:
@@ -33,18 +38,72 @@ class Retriever:
         top_k: int = 30,
         use_query_expansion: bool = False,
         rerank_results: bool = True,  # 👈 rerank always defaulted to True
+        query_embedding: Optional[List[float]] = None,
     ) -> Tuple[List[str], List[Dict[str, Any]]]:
-        """Retrieve relevant documents for a given query."""
+        """Retrieve relevant documents for a given query.
 
-        processed_query = self._prepare_query(query, use_query_expansion)
-        query_embedding = self.embedding_model.embed_query(processed_query)
+        A precomputed `query_embedding` of the raw query is reused for the raw
+        query's search, saving an embedding call.
+        """
+        retrieved_chunks, sources = self.search(query, top_k, use_query_expansion, query_embedding)
 
-        search_results = self.vector_store.query(
-            vector=query_embedding,
-            top_k=top_k,
-            include_metadata=True
-        )
+        if rerank_results and self.reranker:
+            return self.rerank(query, sources, top_k)
+
+        return retrieved_chunks, sources
+
+    def search(
+        self,
+        query: str,
+        top_k: int = 30,
+        use_query_expansion: bool = False,
+        query_embedding: Optional[List[float]] = None,
+    ) -> Tuple[List[str], List[Dict[str, Any]]]:
+        """Run the vector search half of `retrieve`, without reranking.
+
+        With query expansion, the raw query is searched on a worker thread
+        while the LLM expands it, and the two result sets are merged, as in
+        `aretrieve`.
+
+        Returns:
+            Tuple of (chunks, sources) in vector-similarity order
+        """
+        if not use_query_expansion or not self.llm:
+            return self._search_query(query, top_k, query_embedding)
+
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            raw = pool.submit(tracing.bind(self._search_query), query, top_k, query_embedding)
+            expanded = self._search_query(self._expand_query(query), top_k)
+            return self._merge_results(top_k, raw.result(), expanded)
+
+    def _search_query(
+        self,
+        query: str,
+        top_k: int,
+        query_embedding: Optional[List[float]] = None,
+    ) -> Tuple[List[str], List[Dict[str, Any]]]:
+        """Embed `query` (unless an embedding is given) and run the vector search."""
+        if query_embedding is None:
+            with tracing.span("embedding", texts=1):
+                query_embedding = self.embedding_model.embed_query(query)
+
+        with tracing.span("vector_query", top_k=top_k) as span:
+            search_results = self.vector_store.query(
+                vector=query_embedding,
+                top_k=top_k,
+                include_metadata=True
+            )
+            span.set(matches=len(search_results.get("matches", [])))
+        return self._parse_matches(search_results)
 
+    def _parse_matches(self, search_results: Dict[str, Any]) -> Tuple[List[str], List[Dict[str, Any]]]:
+        """Turn vector store matches into (chunks, sources), dropping empty and low-score hits."""
+        with tracing.span("filtering", min_score=self.min_score_threshold) as span:
+            retrieved_chunks, sources = self._filter_matches(search_results)
+            span.set(chunks_in=len(search_results.get("matches", [])), chunks_out=len(sources))
+        return retrieved_chunks, sources
+
+    def _filter_matches(self, search_results: Dict[str, Any]) -> Tuple[List[str], List[Dict[str, Any]]]:
         retrieved_chunks = []
         sources = []
 
@@ -73,23 +132,111 @@ class Retriever:
                 "preview": text[:200] + "..."
             })
 
-        if rerank_results and self.reranker:
+        return retrieved_chunks, sources
+
+    def rerank(
+        self,
+        query: str,
+        sources: List[Dict[str, Any]],
+        top_k: int = 30,
+    ) -> Tuple[List[str], List[Dict[str, Any]]]:
+        """Rerank search results (unchanged if no reranker is configured).
+
+        Returns:
+            Tuple of (chunks, sources) in reranked order
+        """
+        if not self.reranker:
+            return [source["text"] for source in sources], sources
+        with tracing.span("rerank", chunks_in=len(sources), top_k=top_k) as span:
             reranked_sources = self.reranker.rerank(query=query, documents=sources, top_n=top_k)
-            reranked_chunks = [source["text"] for source in reranked_sources]
-            return reranked_chunks, reranked_sources
+            span.set(chunks_out=len(reranked_sources))
+        reranked_chunks = [source["text"] for source in reranked_sources]
+        return reranked_chunks, reranked_sources
+
+    async def aretrieve(
+        self,
+        query: str,
+        top_k: int = 30,
+        use_query_expansion: bool = False,
+        rerank_results: bool = True,
+        query_embedding: Optional[List[float]] = None,
+        rerank_limit: Optional[asyncio.Semaphore] = None,
+    ) -> Tuple[List[str], List[Dict[str, Any]]]:
+        """Async variant of `retrieve` that overlaps independent stages.
+
+        With query expansion, the raw query is searched while the LLM expands
+        it; the expanded query is searched as soon as the expansion resolves,
+        and the best `top_k` of both result sets are kept before reranking. A
+        `rerank_limit` semaphore caps concurrent rerank calls across many queries.
+        """
+        raw_search = self.asearch(query, top_k, query_embedding)
+        if use_query_expansion and self.llm:
+            raw, expanded = await gather_cancelling(raw_search, self._aexpanded_search(query, top_k))
+            retrieved_chunks, sources = self._merge_results(top_k, raw, expanded)
+        else:
+            retrieved_chunks, sources = await raw_search
+
+        if rerank_results and self.reranker:
+            async with rerank_limit or nullcontext():
+                return await self.arerank(query, sources, top_k)
 
         return retrieved_chunks, sources
 
-    def _prepare_query(self, query: str, use_query_expansion: bool) -> str:
-        """Expand the query if needed."""
-        if not use_query_expansion or not self.llm:
-            return query
-        expanded_query = self._expand_query(query)
-        return expanded_query
+    async def asearch(
+        self,
+        query: str,
+        top_k: int = 30,
+        query_embedding: Optional[List[float]] = None,
+    ) -> Tuple[List[str], List[Dict[str, Any]]]:
+        """Embed `query` (unless an embedding is given) and run the vector search."""
+        if query_embedding is None:
+            with tracing.span("embedding", texts=1):
+                query_embedding = await self.embedding_model.aembed_query(query)
+        with tracing.span("vector_query", top_k=top_k) as span:
+            search_results = await self.vector_store.aquery(
+                vector=query_embedding,
+                top_k=top_k,
+                include_metadata=True
+            )
+            span.set(matches=len(search_results.get("matches", [])))
+        return self._parse_matches(search_results)
 
-    def _expand_query(self, query: str) -> str:
-        """Expand the query using the LLM."""
-        prompt = f"""
+    async def arerank(
+        self,
+        query: str,
+        sources: List[Dict[str, Any]],
+        top_k: int = 30,
+    ) -> Tuple[List[str], List[Dict[str, Any]]]:
+        """Async variant of `rerank`."""
+        if not self.reranker:
+            return [source["text"] for source in sources], sources
+        with tracing.span("rerank", chunks_in=len(sources), top_k=top_k) as span:
+            reranked_sources = await self.reranker.arerank(query=query, documents=sources, top_n=top_k)
+            span.set(chunks_out=len(reranked_sources))
+        return [source["text"] for source in reranked_sources], reranked_sources
+
+    async def _aexpanded_search(self, query: str, top_k: int) -> Tuple[List[str], List[Dict[str, Any]]]:
+        expanded_query = await self._aexpand_query(query)
+        return await self.asearch(expanded_query, top_k)
+
+    @staticmethod
+    def _merge_results(
+        top_k: int,
+        *results: Tuple[List[str], List[Dict[str, Any]]]
+    ) -> Tuple[List[str], List[Dict[str, Any]]]:
+        """Union several result sets by chunk text, keeping each chunk's best score and the `top_k` best chunks."""
+        best: Dict[str, Dict[str, Any]] = {}
+        for _, sources in results:
+            for source in sources:
+                current = best.get(source["text"])
+                if current is None or source["score"] > current["score"]:
+                    best[source["text"]] = source
+        sources = sorted(best.values(), key=lambda source: source["score"], reverse=True)[:top_k]
+        return [source["text"] for source in sources], sources
+
+    @staticmethod
+    def _expansion_prompt(query: str) -> str:
+        return f"""
 Given the search query below, expand it with additional relevant terms to improve the search results.
 Add related concepts and alternative phrasings to the search query.
 
@@ -97,7 +244,20 @@ Original Query: "{query}"
 
 Expanded query:
 """
-        expanded = self.llm.generate(prompt, temperature=0.3)
+
+    def _expand_query(self, query: str) -> str:
+        """Expand the query using the LLM."""
+        prompt = self._expansion_prompt(query)
+        with tracing.span("query_expansion"):
+            expanded = self.llm.generate(prompt, temperature=0.3, call_type="expansion")
+        expanded = re.sub(r'^[^a-zA-Z0-9]*', '', expanded)
+        return expanded
+
+    async def _aexpand_query(self, query: str) -> str:
+        """Async variant of `_expand_query`."""
+        prompt = self._expansion_prompt(query)
+        with tracing.span("query_expansion"):
+            expanded = await self.llm.agenerate(prompt, temperature=0.3, call_type="expansion")
         expanded = re.sub(r'^[^a-zA-Z0-9]*', '', expanded)
         return expanded
 
@@ -0,0 +1,277 @@
+"""
+Routing of generation calls to the cheapest model that can handle them.
+
+Routes are checked in order; the first one whose conditions all hold (template
+type, query size, context size, classifier label) serves the call, and the
+last route acts as the default. Every routed call is timed and costed per route.
+"""
+import os
+import re
+import time
+import threading
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from SmartLegalAssistant.core.llm import LanguageModel
+from SmartLegalAssistant.core.context_packer import TokenCounter, get_token_counter
+
+load_dotenv()
+
+# Words that signal a query needs reasoning rather than a lookup
+ANALYSIS_TERMS = re.compile(
+    r"\b(compare|contrast|analy[sz]e|implications?|consequences?|why|evaluate|assess|"
+    r"difference|differ|versus|vs\.?|liabilit(y|ies)|risks?|interplay|conflict|exceptions?)\b",
+    re.IGNORECASE,
+)
+
+
+def keyword_complexity(query: str) -> str:
+    """Tiny local classifier: label a query "complex" or "simple".
+
+    A query is complex when it uses analysis vocabulary, asks several
+    questions, or is long enough to carry several conditions.
+    """
+    if ANALYSIS_TERMS.search(query):
+        return "complex"
+    if query.count("?") > 1 or len(query.split()) > 30:
+        return "complex"
+    return "simple"
+
+
+@dataclass
+class ModelRoute:
+    """A model and the conditions under which it serves a call.
+
+    Attributes:
+        name: Route label reported in results and metrics
+        llm: Language model serving this route
+        templates: Template types the route accepts (None accepts any)
+        max_query_tokens: Largest query the route accepts
+        max_context_tokens: Largest packed context the route accepts
+        complexity: Classifier label the query must have (None accepts any)
+        cost_per_1k_input: Price per 1000 prompt tokens
+        cost_per_1k_output: Price per 1000 completion tokens
+    """
+    name: str
+    llm: LanguageModel
+    templates: Optional[Tuple[str, ...]] = None
+    max_query_tokens: Optional[int] = None
+    max_context_tokens: Optional[int] = None
+    complexity: Optional[str] = None
+    cost_per_1k_input: float = 0.0
+    cost_per_1k_output: float = 0.0
+
+    @property
+    def model_name(self) -> str:
+        return getattr(self.llm, "model_name", type(self.llm).__name__)
+
+    def accepts(self, template_type: str, query_tokens: int, context_tokens: int,
+                complexity: Optional[str]) -> bool:
+        """Return True if every configured condition holds for the call."""
+        if self.templates is not None and template_type not in self.templates:
+            return False
+        if self.max_query_tokens is not None and query_tokens > self.max_query_tokens:
+            return False
+        if self.max_context_tokens is not None and context_tokens > self.max_context_tokens:
+            return False
+        if self.complexity is not None and complexity != self.complexity:
+            return False
+        return True
+
+
+class RouteStats:
+    """Thread-safe latency, token and cost counters for one route."""
+
+    def __init__(self, window: int = 500):
+        self._lock = threading.Lock()
+        self._latencies: List[float] = []
+        self._window = window
+        self.calls = 0
+        self.errors = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.cost = 0.0
+
+    def record(self, seconds: float, input_tokens: int, output_tokens: int, cost: float,
+               error: bool = False) -> None:
+        with self._lock:
+            self.calls += 1
+            self.errors += int(error)
+            self.input_tokens += input_tokens
+            self.output_tokens += output_tokens
+            self.cost += cost
+            self._latencies.append(seconds)
+            if len(self._latencies) > self._window:
+                del self._latencies[:len(self._latencies) - self._window]
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            latencies = sorted(self._latencies)
+            data = {
+                "calls": self.calls,
+                "errors": self.errors,
+                "input_tokens": self.input_tokens,
+                "output_tokens": self.output_tokens,
+                "cost": round(self.cost, 6),
+            }
+        data["avg_latency"] = sum(latencies) / len(latencies) if latencies else 0.0
+        data["p95_latency"] = latencies[int(0.95 * (len(latencies) - 1))] if latencies else 0.0
+        return data
+
+
+class MeteredModel(LanguageModel):
+    """Wraps a route's model so every call is recorded in the route's stats."""
+
+    def __init__(self, route: ModelRoute, stats: RouteStats, token_counter: TokenCounter):
+        self.route = route
+        self.stats = stats
+        self.token_counter = token_counter
+        self.model_name = route.model_name
+
+    def _record(self, start: float, prompt: str, output: str, error: bool = False) -> None:
+        # Prompts and answers rarely repeat; caching them would only evict chunk counts
+        input_tokens = self.token_counter.count_uncached(prompt)
+        output_tokens = self.token_counter.count_uncached(output) if output else 0
+        cost = (input_tokens * self.route.cost_per_1k_input
+                + output_tokens * self.route.cost_per_1k_output) / 1000
+        self.stats.record(time.perf_counter() - start, input_tokens, output_tokens, cost, error)
+
+    def generate(self, prompt: str, **kwargs) -> str:
+        start = time.perf_counter()
+        try:
+            output = self.route.llm.generate(prompt, **kwargs)
+        except Exception:
+            self._record(start, prompt, "", error=True)
+            raise
+        self._record(start, prompt, output)
+        return output
+
+    def generate_stream(self, prompt: str, **kwargs) -> Iterator[str]:
+        start, parts, error = time.perf_counter(), [], True
+        try:
+            for delta in self.route.llm.generate_stream(prompt, **kwargs):
+                parts.append(delta)
+                yield delta
+            error = False
+        finally:
+            self._record(start, prompt, "".join(parts), error=error)
+
+    async def agenerate(self, prompt: str, **kwargs) -> str:
+        start = time.perf_counter()
+        try:
+            output = await self.route.llm.agenerate(prompt, **kwargs)
+        except Exception:
+            self._record(start, prompt, "", error=True)
+            raise
+        self._record(start, prompt, output)
+        return output
+
+    async def agenerate_stream(self, prompt: str, **kwargs) -> AsyncIterator[str]:
+        start, parts, error = time.perf_counter(), [], True
+        try:
+            async for delta in self.route.llm.agenerate_stream(prompt, **kwargs):
+                parts.append(delta)
+                yield delta
+            error = False
+        finally:
+            self._record(start, prompt, "".join(parts), error=error)
+
+
+class LLMRouter:
+    """Picks a model per call from template type, query size, context size and complexity."""
+
+    def __init__(
+        self,
+        routes: List[ModelRoute],
+        classifier: Optional[Callable[[str], str]] = keyword_complexity,
+        token_counter: Optional[TokenCounter] = None,
+    ):
+        """Initialize the router.
+
+        Args:
+            routes: Routes in priority order; the last one is the default
+            classifier: Maps a query to a label matched against `ModelRoute.complexity`
+                (None disables classification)
+            token_counter: Counter used for query sizes and cost accounting (its cache,
+                shared with context packing, is left untouched)
+        """
+        if not routes:
+            raise ValueError("LLMRouter needs at least one route")
+        self.routes = routes
+        self.classifier = classifier
+        self.token_counter = token_counter or get_token_counter()
+        self._stats = {route.name: RouteStats() for route in routes}
+        self._models = {
+            route.name: MeteredModel(route, self._stats[route.name], self.token_counter)
+            for route in routes
+        }
+
+    def select(self, template_type: str, query: str, context_tokens: int = 0) -> ModelRoute:
+        """Return the first route accepting the call, falling back to the last route."""
+        query_tokens = self.token_counter.count_uncached(query)
+        complexity = self.classifier(query) if self.classifier else None
+        for route in self.routes:
+            if route.accepts(template_type, query_tokens, context_tokens, complexity):
+                return route
+        return self.routes[-1]
+
+    def route(self, template_type: str, query: str, context_tokens: int = 0) -> MeteredModel:
+        """Return the metered model for the selected route."""
+        return self._models[self.select(template_type, query, context_tokens).name]
+
+    def signature(self) -> str:
+        """Stable description of the routing table, used in answer cache keys."""
+        return ";".join(
+            f"{route.name}={route.model_name}|{route.templates}|{route.max_query_tokens}|"
+            f"{route.max_context_tokens}|{route.complexity}"
+            for route in self.routes
+        )
+
+    def metrics(self) -> Dict[str, Dict[str, Any]]:
+        """Return per-route call, latency, token and cost counters."""
+        return {
+            name: {"model": self._models[name].model_name, **stats.snapshot()}
+            for name, stats in self._stats.items()
+        }
+
+
+def get_llm_router(default_llm: Optional[LanguageModel] = None, **kwargs) -> LLMRouter:
+    """Build the standard fast/large router from the environment.
+
+    Short lookups on the "concise" and "factual_qa" templates with modest
+    context go to LLM_ROUTER_FAST_MODEL; everything else goes to the large
+    model (`default_llm`, or LLM_ROUTER_LARGE_MODEL).
+
+    Args:
+        default_llm: Model for the large route (built from the environment if None)
+        **kwargs: Extra LLMRouter arguments (e.g. classifier)
+    """
+    from SmartLegalAssistant.core.llm import get_language_model
+
+    large = default_llm or get_language_model(
+        model_name=os.getenv("LLM_ROUTER_LARGE_MODEL", "mistralai/Mistral-Small-24B-Instruct-2501")
+    )
+    fast = get_language_model(
+        model_name=os.getenv("LLM_ROUTER_FAST_MODEL", "meta-llama/Llama-3.2-3B-Instruct-Turbo")
+    )
+    routes = [
+        ModelRoute(
+            name="fast",
+            llm=fast,
+            templates=("concise", "factual_qa", "map"),
+            max_query_tokens=int(os.getenv("LLM_ROUTER_FAST_MAX_QUERY_TOKENS", "40")),
+            max_context_tokens=int(os.getenv("LLM_ROUTER_FAST_MAX_CONTEXT_TOKENS", "2500")),
+            complexity="simple",
+            cost_per_1k_input=float(os.getenv("LLM_ROUTER_FAST_COST_PER_1K", "0")),
+            cost_per_1k_output=float(os.getenv("LLM_ROUTER_FAST_COST_PER_1K", "0")),
+        ),
+        ModelRoute(
+            name="large",
+            llm=large,
+            cost_per_1k_input=float(os.getenv("LLM_ROUTER_LARGE_COST_PER_1K", "0")),
+            cost_per_1k_output=float(os.getenv("LLM_ROUTER_LARGE_COST_PER_1K", "0")),
+        ),
+    ]
+    return LLMRouter(routes, **kwargs)
@@ -0,0 +1,174 @@
+"""
+Helpers for speculative generation.
+
+Generation can start from the vector-search ranking while the reranker is
+still running. The speculative answer is buffered in the background and only
+released if the reranked context agrees with the one it was generated from.
+
+A speculative result is a generation result dictionary (as returned by
+`AnswerGenerator.generate_answer_stream`) with two extra keys:
+"speculative_stream" (its `BackgroundStream`) and "speculation" (the
+template and, once decided, hit, overlap and rerank time). The functions
+below start, confirm and hand over such results; `RAGPipeline` runs the
+retrieval around them.
+"""
+import queue
+import threading
+from typing import Any, Dict, Iterator, List, Optional
+
+
+def overlap_ratio(speculative: List[str], confirmed: List[str]) -> float:
+    """Fraction of the speculative chunks that are also in the confirmed top set."""
+    if not speculative:
+        return 1.0 if not confirmed else 0.0
+    return len(set(speculative) & set(confirmed)) / len(set(speculative))
+
+
+class BackgroundStream:
+    """Consumes a text stream on a worker thread, buffering deltas until they are read.
+
+    Reading drains the buffer and then follows the stream live. `cancel`
+    stops the worker at its next delta and closes the underlying stream.
+    """
+
+    _DONE = object()
+
+    def __init__(self, stream: Iterator[str], name: str = "speculative-generation"):
+        self._stream = stream
+        self._queue: "queue.Queue[object]" = queue.Queue()
+        self._cancelled = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True, name=name)
+        self._thread.start()
+
+    def _run(self) -> None:
+        try:
+            for delta in self._stream:
+                if self._cancelled.is_set():
+                    break
+                self._queue.put(delta)
+        except BaseException as e:
+            self._queue.put(e)
+        finally:
+            close = getattr(self._stream, "close", None)
+            if close:
+                close()
+            self._queue.put(self._DONE)
+
+    def cancel(self) -> None:
+        """Abandon the stream; buffered and future deltas are discarded."""
+        self._cancelled.set()
+
+    def __iter__(self) -> Iterator[str]:
+        try:
+            while True:
+                item = self._queue.get()
+                if item is self._DONE:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            # A consumer that stops early should not keep the model generating
+            self.cancel()
+
+
+class SpeculationStats:
+    """Thread-safe hit-rate counters for speculative generation."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.attempts = 0
+        self.hits = 0
+        self.overlap_total = 0.0
+        self.rerank_seconds_saved = 0.0
+
+    def record(self, hit: bool, overlap: float, rerank_seconds: float) -> None:
+        with self._lock:
+            self.attempts += 1
+            self.overlap_total += overlap
+            if hit:
+                self.hits += 1
+                self.rerank_seconds_saved += rerank_seconds
+
+    def snapshot(self) -> Dict[str, Optional[float]]:
+        with self._lock:
+            return {
+                "attempts": self.attempts,
+                "hits": self.hits,
+                "misses": self.attempts - self.hits,
+                "hit_rate": self.hits / self.attempts if self.attempts else 0.0,
+                "avg_overlap": self.overlap_total / self.attempts if self.attempts else 0.0,
+                "rerank_seconds_saved": round(self.rerank_seconds_saved, 3),
+            }
+
+
+def start_speculation(result: Dict[str, Any], template_type: str) -> Dict[str, Any]:
+    """Turn a streaming generation result into a speculative result, generating in the background."""
+    result["speculative_stream"] = BackgroundStream(result["answer_stream"])
+    result["speculation"] = {"template_type": template_type}
+    return result
+
+
+def confirm_speculation(
+        speculative: Dict[str, Any],
+        sources: List[Dict[str, Any]],
+        reranked_sources: List[Dict[str, Any]],
+        rerank_seconds: float,
+        threshold: float,
+        stats: SpeculationStats,
+) -> Dict[str, Any]:
+    """Keep a speculative answer if the reranked context agrees with its own, else cancel it.
+
+    Args:
+        speculative: Result from `start_speculation`
+        sources: Vector-search sources the answer was generated from
+        reranked_sources: Sources after reranking
+        rerank_seconds: Time the rerank took (saved on a hit)
+        threshold: Chunk overlap needed to keep the answer
+        stats: Counters to record the outcome in
+
+    Returns:
+        The speculative result; it keeps "speculative_stream" only on a hit
+    """
+    background = speculative.pop("speculative_stream")
+
+    # Compare the chunks the answer was built on with the reranked top set of the same size
+    selected = speculative.get("context_chunk_indices", [])
+    speculative_texts = [sources[i]["text"] for i in selected]
+    confirmed_texts = [source["text"] for source in reranked_sources[:len(selected)]]
+    overlap = overlap_ratio(speculative_texts, confirmed_texts)
+    hit = bool(reranked_sources) and overlap >= threshold
+    stats.record(hit, overlap, rerank_seconds)
+
+    speculative["speculation"].update({
+        "hit": hit,
+        "overlap": round(overlap, 4),
+        "rerank_seconds": round(rerank_seconds, 3),
+    })
+    if hit:
+        speculative["answer_stream"] = iter(background)
+        speculative["speculative_stream"] = background
+    else:
+        background.cancel()
+    return speculative
+
+
+def attach_speculation(prepared: Dict[str, Any], speculative: Dict[str, Any]) -> None:
+    """Keep a speculation's stats, and its answer if it was confirmed, on a prepared context."""
+    prepared["speculation"] = speculative.pop("speculation")
+    background = speculative.pop("speculative_stream", None)
+    if background is not None:
+        prepared["speculative_result"] = speculative
+        prepared["speculative_stream"] = background
+
+
+def take_speculation(prepared: Dict[str, Any], template_type: Optional[str]) -> Optional[Dict[str, Any]]:
+    """Claim a prepared context's confirmed speculative result if it was generated for `template_type`.
+
+    A speculation for another template is left in place for a later call.
+    """
+    if "speculative_result" not in prepared:
+        return None
+    if template_type != prepared["speculation"]["template_type"]:
+        return None
+    return prepared.pop("speculative_result", None)
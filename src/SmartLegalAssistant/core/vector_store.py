@@ -2,11 +2,15 @@
 
 # Vector store
 import os
+import time
+import asyncio
+import weakref
 from typing import List, Dict, Any, Optional
 from abc import ABC, abstractmethod
 from pinecone import Pinecone
 from dotenv import load_dotenv
 from SmartLegalAssistant.utils.exception import CustomException
+from SmartLegalAssistant.core.rate_limiter import BACKEND_CALL_SECONDS, BACKEND_ERRORS, is_timeout_error
 import logging
 
 # Configure logging
@@ -22,6 +26,13 @@ class VectorStore(ABC):
         """Query the vector store for similar documents."""
         pass
 
+    async def aquery(self, vector: List[float], top_k: int = 30, **kwargs) -> Dict[str, Any]:
+        """Async variant of `query` (defaults to a worker thread)."""
+        return await asyncio.to_thread(self.query, vector, top_k, **kwargs)
+
+    async def aclose(self) -> None:
+        """Close async resources opened on the running event loop (none by default)."""
+
 
 class PineconeStore(VectorStore):
     """Pinecone vector store for storing and retrieving documents."""
@@ -67,6 +78,10 @@ class PineconeStore(VectorStore):
 
             logger.debug(f"Connecting to Pinecone index '{self.index_name}'...")
             self.index = self.pc.Index(self.index_name)
+            # Resolved here, so opening an async handle never blocks an event loop
+            self._index_host = self.pc.describe_index(self.index_name).host
+            # Async index handles are bound to the event loop that created them
+            self._async_indexes = weakref.WeakKeyDictionary()
 
         except Exception as e:
             raise CustomException(
@@ -99,17 +114,70 @@ class PineconeStore(VectorStore):
         if filter:
             query_params["filter"] = filter
 
+        start = time.perf_counter()
         try:
             logger.debug(f"Querying Pinecone index '{self.index_name}' with vector: {vector[:5]}..., top_k: {top_k}, namespace: {self.namespace}, filter: {filter}")
             result = self.index.query(**query_params)
             return result
         except Exception as e:
+            BACKEND_ERRORS.inc(backend="pinecone", call_type="query", kind="timeout" if is_timeout_error(e) else "error")
             raise CustomException(
                 e,
                 error_type="PineconeQueryError",
                 context={"index_name": self.index_name, "vector": vector[:5], "top_k": top_k, "namespace": self.namespace, "filter": filter},
                 log_immediately=True,
             )
+        finally:
+            BACKEND_CALL_SECONDS.observe(time.perf_counter() - start, backend="pinecone", call_type="query")
+
+    def _get_async_index(self):
+        loop = asyncio.get_running_loop()
+        index = self._async_indexes.get(loop)
+        if index is None:
+            index = self.pc.IndexAsyncio(host=self._index_host)
+            self._async_indexes[loop] = index
+        return index
+
+    async def aquery(self, vector: List[float], top_k: int = 30, include_metadata: bool = True,
+                     filter: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Query the vector store without blocking the event loop.
+
+        Uses Pinecone's asyncio client when its optional dependencies are
+        installed, otherwise falls back to a worker thread.
+        """
+        try:
+            index = self._get_async_index()
+        except ImportError:
+            return await super().aquery(vector, top_k, include_metadata=include_metadata, filter=filter)
+
+        query_params = {
+            "vector": vector,
+            "top_k": top_k,
+            "include_metadata": include_metadata,
+            "namespace": self.namespace
+        }
+        if filter:
+            query_params["filter"] = filter
+
+        start = time.perf_counter()
+        try:
+            return await index.query(**query_params)
+        except Exception as e:
+            BACKEND_ERRORS.inc(backend="pinecone", call_type="query", kind="timeout" if is_timeout_error(e) else "error")
+            raise CustomException(
+                e,
+                error_type="PineconeQueryError",
+                context={"index_name": self.index_name, "vector": vector[:5], "top_k": top_k, "namespace": self.namespace, "filter": filter},
+                log_immediately=True,
+            )
+        finally:
+            BACKEND_CALL_SECONDS.observe(time.perf_counter() - start, backend="pinecone", call_type="query")
+
+    async def aclose(self) -> None:
+        """Close the async index handle opened on the running event loop."""
+        index = self._async_indexes.pop(asyncio.get_running_loop(), None)
+        if index is not None:
+            await index.close()
 
 
 # Factory function to get the right vector store
@@ -123,12 +191,14 @@ def get_vector_store(index_name: Optional[str] = None, store_type: str = "pineco
         **kwargs: Additional config for the vector store
 
     Returns:
-        A vector store instance.
+        A vector store instance. With RAG_CASSETTE_MODE=record it is wrapped to
+        record queries; with RAG_CASSETTE_MODE=replay, Pinecone is not contacted.
     """
     if store_type == "pinecone":
+        from SmartLegalAssistant.core.cassette import cassette_vector_store
         if index_name is not None:
             kwargs["index_name"] = index_name
-        return PineconeStore(**kwargs)
+        return cassette_vector_store(lambda: PineconeStore(**kwargs))
     else:
         raise ValueError(f"Unsupported vector store type: {store_type}")
 
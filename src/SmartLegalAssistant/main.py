@@ -0,0 +1,299 @@
+"""
+HTTP API for the RAG pipeline.
+
+An ASGI app (FastAPI, served by uvicorn) for other services and load
+balancers, next to the Streamlit UI:
+
+    POST /query      answer a question; the JSON body mirrors `process_query`'s
+                     result, or with {"stream": true} the answer arrives as
+                     Server-Sent Events
+    POST /retrieve   retrieval only (sources and formatted chunks)
+    GET  /health     liveness and pipeline readiness
+    GET  /metrics    Prometheus metrics of this worker
+
+Each worker process builds one pipeline at startup (`build_rag_pipeline`)
+and serves JSON requests through the pipeline's async interfaces, so one
+worker handles many concurrent requests on its event loop. Blocking stages
+(compression, fan-out generation) run on threads, as do streamed requests,
+which step through `RAGPipeline.stream_events` on a bounded thread pool.
+
+SSE events are the pipeline's progress events (`core/events.py`), each
+with a JSON `data` payload:
+    retrieval_started   {"query", "top_k"}
+    sources             {"sources", "reranked", "elapsed_ms"}, right after the vector search
+    rerank_done         {"sources", "rerank_ms", "elapsed_ms"}
+    token               {"delta", "section"}; section names the perspective in perspectives mode
+    final               the result without chunks and sources, with "timings" when traced
+    error               {"detail", "status"}
+
+Run with:
+
+    legal_assistant --host 0.0.0.0 --port 8000 --workers 4
+
+Configuration (environment):
+    SERVER_HOST=0.0.0.0
+    SERVER_PORT=8000
+    SERVER_WORKERS=1                # each worker has its own rate limiter and caches
+    SERVER_REQUEST_TIMEOUT=120      # seconds per request; for SSE, until the last token
+    SERVER_STREAM_THREADS=64        # answers streamed concurrently per worker
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+import argparse
+import contextlib
+from typing import Any, AsyncIterator, Dict, Literal, Optional, Set
+
+import anyio
+import uvicorn
+from dotenv import load_dotenv
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field
+
+from SmartLegalAssistant.core.clients import get_client_registry
+from SmartLegalAssistant.core.pipeline_builder import build_rag_pipeline
+from SmartLegalAssistant.core.rate_limiter import RateLimitTimeout, is_rate_limit_error
+from SmartLegalAssistant.utils import memory, metrics, tracing
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Result keys that hold live streams, never serialized
+_STREAM_KEYS = ("answer_stream", "section_stream")
+_STREAM_END = object()
+
+
+class RetrieveRequest(BaseModel):
+    """Body of POST /retrieve."""
+    query: str = Field(min_length=1)
+    top_k: Optional[int] = Field(None, ge=1, le=100)
+    use_query_expansion: bool = False
+    rerank_results: bool = True
+
+
+class QueryRequest(RetrieveRequest):
+    """Body of POST /query."""
+    template_type: Optional[str] = None
+    use_compression: bool = True
+    generation_mode: Literal["single", "perspectives", "map_reduce"] = "single"
+    stream: bool = False
+
+
+def _serializable(result: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: value for key, value in result.items() if key not in _STREAM_KEYS}
+
+
+def _error_status(error: BaseException) -> int:
+    """HTTP status for a pipeline failure."""
+    if isinstance(error, RateLimitTimeout) or is_rate_limit_error(error):
+        return 503
+    if isinstance(error, (asyncio.TimeoutError, TimeoutError)):
+        return 504
+    if isinstance(error, ValueError):
+        return 400
+    return 500
+
+
+def _sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def create_app(pipeline=None, request_timeout: Optional[float] = None,
+               stream_threads: Optional[int] = None) -> FastAPI:
+    """Build the API app.
+
+    Args:
+        pipeline: Pipeline to serve (built from the environment at startup if None)
+        request_timeout: Seconds per request (defaults to SERVER_REQUEST_TIMEOUT)
+        stream_threads: Answers streamed concurrently (defaults to SERVER_STREAM_THREADS)
+
+    Returns:
+        FastAPI application
+    """
+    request_timeout = request_timeout or float(os.getenv("SERVER_REQUEST_TIMEOUT", "120"))
+    stream_threads = stream_threads or int(os.getenv("SERVER_STREAM_THREADS", "64"))
+
+    @contextlib.asynccontextmanager
+    async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+        app.state.pipeline = pipeline
+        app.state.startup_error = None
+        # Streamed answers wait on the network from a thread each; keep them
+        # off the default pool used by the rest of the app
+        app.state.stream_limiter = anyio.CapacityLimiter(stream_threads)
+        if pipeline is None:
+            try:
+                app.state.pipeline = await asyncio.to_thread(build_rag_pipeline)
+            except Exception as e:
+                logger.error(f"Error initializing RAG pipeline: {e}")
+                app.state.startup_error = str(e)
+        if app.state.pipeline is not None:
+            metrics.register_cache_stats(app.state.pipeline.cache_stats)
+            memory.register_cache_sizes(app.state.pipeline.cache_sizes)
+            memory.get_memory_monitor().start()
+        yield
+        # The worker's async API connections belong to this event loop
+        if app.state.pipeline is not None:
+            await app.state.pipeline.aclose()
+        await get_client_registry().aclose()
+
+    app = FastAPI(title="Smart Legal Assistant API", lifespan=lifespan)
+
+    def get_pipeline(request: Request):
+        rag_pipeline = request.app.state.pipeline
+        if rag_pipeline is None:
+            raise HTTPException(503, f"Pipeline unavailable: {request.app.state.startup_error}")
+        return rag_pipeline
+
+    @app.get("/health")
+    async def health(request: Request) -> JSONResponse:
+        if request.app.state.pipeline is None:
+            return JSONResponse({"status": "unavailable", "detail": request.app.state.startup_error}, 503)
+        return JSONResponse({"status": "ok", "pid": os.getpid()})
+
+    @app.get("/metrics")
+    async def metrics_endpoint() -> PlainTextResponse:
+        return PlainTextResponse(metrics.REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+    @app.post("/retrieve")
+    async def retrieve(body: RetrieveRequest, request: Request) -> Dict[str, Any]:
+        rag_pipeline = get_pipeline(request)
+        trace = rag_pipeline.tracer.start_trace("retrieve", top_k=body.top_k or rag_pipeline.default_top_k)
+        try:
+            with tracing.activate(trace):
+                retrieval = await asyncio.wait_for(
+                    rag_pipeline.aretrieve_context(
+                        body.query, body.top_k, body.use_query_expansion, body.rerank_results
+                    ),
+                    request_timeout,
+                )
+        except Exception as e:
+            _raise_http(e)
+        finally:
+            # Also on cancellation, so the request leaves the in-flight gauge
+            if trace is not None:
+                trace.finish()
+        if trace is not None and trace.sampled:
+            retrieval["timings"] = trace.timings
+        return retrieval
+
+    @app.post("/query")
+    async def query(body: QueryRequest, request: Request):
+        rag_pipeline = get_pipeline(request)
+        if body.stream:
+            return StreamingResponse(
+                _stream_query(rag_pipeline, body, request_timeout, request.app.state.stream_limiter),
+                media_type="text/event-stream",
+                headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+            )
+        try:
+            result = await asyncio.wait_for(
+                rag_pipeline.process_query_async(
+                    body.query, body.top_k, body.use_query_expansion, body.rerank_results,
+                    body.template_type, body.use_compression, body.generation_mode
+                ),
+                request_timeout,
+            )
+        except Exception as e:
+            _raise_http(e)
+        return _serializable(result)
+
+    return app
+
+
+def _raise_http(error: Exception) -> None:
+    status = _error_status(error)
+    if status == 504:
+        raise HTTPException(504, "Request timed out") from error
+    if status == 500:
+        logger.exception(f"Error processing request: {error}")
+    raise HTTPException(status, str(error)) from error
+
+
+async def _stream_query(rag_pipeline, body: QueryRequest, timeout: float,
+                        limiter: anyio.CapacityLimiter) -> AsyncIterator[str]:
+    """Relay `RAGPipeline.stream_events` as Server-Sent Events.
+
+    The pipeline's event generator blocks on the network between events, so
+    each step runs on a thread from `limiter`. A step that outlives the
+    deadline, or the client, keeps its thread until it returns; the generator
+    is closed after that, which stops generation and finishes the trace.
+    """
+    deadline = time.monotonic() + timeout
+    events = rag_pipeline.stream_events(
+        body.query, body.top_k, body.use_query_expansion, body.rerank_results,
+        body.template_type, body.use_compression, body.generation_mode
+    )
+    step = None
+    try:
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise asyncio.TimeoutError()
+            step = asyncio.ensure_future(anyio.to_thread.run_sync(next, events, _STREAM_END, limiter=limiter))
+            # Shielded, so a timeout or disconnect stops waiting without orphaning the step
+            event = await asyncio.wait_for(asyncio.shield(step), remaining)
+            step = None
+            if event is _STREAM_END:
+                break
+            yield _sse(event.event, event.to_dict())
+    except Exception as e:
+        status = _error_status(e)
+        if status == 500:
+            logger.exception(f"Error streaming answer: {e}")
+        detail = "Request timed out" if status == 504 else str(e)
+        yield _sse("error", {"detail": detail, "status": status})
+    finally:
+        # Not awaited here: a disconnected client's scope cancels every await
+        task = asyncio.get_running_loop().create_task(_close_events(events, step, limiter))
+        _closing.add(task)
+        task.add_done_callback(_closing.discard)
+
+
+# Pending `_close_events` tasks, referenced until they finish
+_closing: Set[asyncio.Task] = set()
+
+
+async def _close_events(events, step: Optional[asyncio.Future], limiter: anyio.CapacityLimiter) -> None:
+    """Close an event generator once its in-flight step, if any, has returned."""
+    if step is not None:
+        # Its outcome was already reported, or nobody is listening
+        with contextlib.suppress(Exception):
+            await step
+    try:
+        await anyio.to_thread.run_sync(events.close, limiter=limiter)
+    except Exception as e:
+        logger.warning(f"Error closing answer stream: {e}")
+
+
+app = create_app()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Serve the Smart Legal Assistant HTTP API")
+    parser.add_argument("--host", default=os.getenv("SERVER_HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("SERVER_PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("SERVER_WORKERS", "1")),
+                        help="Worker processes, each with its own pipeline and rate limits")
+    parser.add_argument("--timeout-keep-alive", type=int, default=5,
+                        help="Seconds an idle keep-alive connection stays open")
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args(argv)
+
+    uvicorn.run(
+        "SmartLegalAssistant.main:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        timeout_keep_alive=args.timeout_keep_alive,
+        log_level=args.log_level,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
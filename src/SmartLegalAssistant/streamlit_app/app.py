@@ -4,6 +4,7 @@ import streamlit as st
 import os
 import sys
 from dotenv import load_dotenv
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 
 # Add src/ to sys.path (parent of SmartLegalAssistant/)
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
@@ -13,13 +14,11 @@ print("Current directory:", os.getcwd())
 print("Files in current dir:", os.listdir('.'))
 
 # Import components from your project
-from SmartLegalAssistant.core.embeddings import get_embedding_model
-from SmartLegalAssistant.core.vector_store import get_vector_store
-from SmartLegalAssistant.core.llm import get_language_model
-from SmartLegalAssistant.core.reranker import get_reranker
-from SmartLegalAssistant.core.answer_generator import AnswerGenerator, RAGPipeline
-from SmartLegalAssistant.utils.prompt_templates import get_template
-from SmartLegalAssistant.core.retriever import Retriever
+from SmartLegalAssistant.core.pipeline_builder import build_rag_pipeline
+from SmartLegalAssistant.core.events import AnswerDelta, Final, RerankDone, RetrievalStarted, SourcesReady
+from SmartLegalAssistant.utils.prompt_templates import LEGAL_PERSPECTIVES
+from SmartLegalAssistant.utils import metrics
+from SmartLegalAssistant.utils import memory
 
 # Load environment variables
 load_dotenv()
@@ -43,50 +42,33 @@ with st.sidebar.expander("Advanced Options"):
     top_k = st.slider("Number of chunks to retrieve", 5, 50, 25)
     use_reranking = st.checkbox("Use reranking", value=True)
     use_query_expansion = st.checkbox("Use query expansion", value=False)
-    temperature = st.slider("Temperature", 0.0, 1.0, 0.2, 0.1)
+    use_compression = st.checkbox("Use contextual compression", value=False)
+    generation_mode = st.selectbox(
+        "Generation mode", ["perspectives", "single", "map_reduce"], index=0,
+        help=("perspectives: Legal Assistant sections are written by concurrent calls. "
+              "map_reduce: all retrieved chunks are summarized in parallel batches first, "
+              "useful with a large number of chunks.")
+    )
+    compare_templates = st.multiselect(
+        "Compare with other templates", [t for t in template_options if t != selected_template],
+        help="Generated concurrently from the same retrieved sources"
+    )
 
 
 # Initialize the RAG components
 @st.cache_resource
 def initialize_rag_pipeline():
     try:
-        # Initialize embedding model
-        embedding_model = get_embedding_model(model_type="together")
-
-        # Initialize vector store
-        vector_store = get_vector_store(
-            store_type="pinecone",
-            index_name=os.getenv("PINECONE_INDEX_NAME"),
-            namespace=os.getenv("PINECONE_NAMESPACE", "")
-        )
-
-        # Initialize LLM
-        llm = get_language_model(model_type="together")
-
-        # Initialize reranker
-        reranker = get_reranker(reranker_type="together_ai")
-
-        # Initialize retriever
-        retriever = Retriever(
-            embedding_model=embedding_model,
-            vector_store=vector_store,
-            reranker=reranker,
-            llm=llm
-        )
+        # Same environment-configured stack as the HTTP API (core/pipeline_builder.py)
+        rag_pipeline = build_rag_pipeline()
 
-        # Initialize answer generator
-        answer_generator = AnswerGenerator(
-            llm=llm,
-            default_template_type="legal_assistant",
-            temperature=0.2
-        )
+        # Prometheus metrics on a side port (METRICS_PORT), next to the Streamlit server
+        metrics.register_cache_stats(rag_pipeline.cache_stats)
+        metrics.start_metrics_server()
 
-        # Initialize RAG pipeline
-        rag_pipeline = RAGPipeline(
-            retriever=retriever,
-            answer_generator=answer_generator,
-            default_top_k=25
-        )
+        # Cache byte usage and periodic RSS / tracemalloc sampling (see utils/memory.py)
+        memory.register_cache_sizes(rag_pipeline.cache_sizes)
+        memory.get_memory_monitor().start()
 
         return rag_pipeline, True
 
@@ -101,50 +83,160 @@ rag_pipeline, initialization_success = initialize_rag_pipeline()
 # Main query input
 query = st.text_area("Enter your legal question:", height=100)
 
+# Retrieval is kept in the session, so changing the template or generation
+# mode afterwards only re-runs generation for the same question
+retrieval_key = (query, top_k, use_query_expansion, use_reranking, use_compression)
+
+
+def render_sources(sources, reranked=True):
+    """Render the retrieved sources into the sources slot (replacing earlier ones)."""
+    with sources_slot.container():
+        # Same element layout either way, so the reranked list replaces the preliminary one in place
+        st.caption("In vector-search order; reranking..." if not reranked else f"{len(sources)} sources")
+
+        # Create tabs for different views
+        tabs = st.tabs(["Ranked Sources", "Source Details"])
+
+        with tabs[0]:
+            for i, source in enumerate(sources):
+                with st.expander(f"Source {i + 1}: {source['reference']} (Score: {source['score']:.4f})"):
+                    st.write(source["text"])
+
+        with tabs[1]:
+            # Display table of sources with scores
+            source_data = [
+                {
+                    "Index": i + 1,
+                    "Reference": source["reference"],
+                    "Score": f"{source['score']:.4f}",
+                    "Preview": source["text"][:100] + "..."
+                }
+                for i, source in enumerate(sources)
+            ]
+            st.dataframe(source_data)
+
+
+def render_result_details(result):
+    """Caption the answer with its model, cache and timing details."""
+    if result.get("model_used"):
+        st.caption(f"Model: {result['model_used']}")
+    if result.get("cached"):
+        st.caption("Answered from cache")
+    elif "map_reduce" in result:
+        stats = result["map_reduce"]
+        st.caption(
+            f"Map-reduce over {stats['batches']} batches: "
+            f"map {stats['map_seconds']}s, reduce {stats.get('reduce_seconds', 0)}s"
+        )
+    timings = result.get("timings") or {}
+    if timings.get("stages"):
+        st.caption(
+            f"Total {timings['total_ms']:.0f} ms: "
+            + ", ".join(f"{stage} {ms:.0f} ms" for stage, ms in timings["stages"].items())
+        )
+
+
 # Process query button
-if st.button("Submit Question") and query and initialization_success:
+submitted = st.button("Submit Question") and bool(query) and initialization_success
+prepared = st.session_state.get("prepared")
+# The finished answer is kept too, so reruns from unrelated widgets redraw it
+# instead of generating it again
+answer_key = retrieval_key + (selected_template, generation_mode)
+answered = st.session_state.get("answered")
+if not submitted and initialization_success and answered and answered["key"] == answer_key:
+    result = answered["result"]
+    st.header("Answer")
+    answer_slot = st.container()
+    with answer_slot:
+        st.markdown(result["answer"])
+        render_result_details(result)
+    st.header("Retrieved Sources")
+    sources_slot = st.empty()
+    render_sources(result.get("sources", []))
+elif submitted or (initialization_success and prepared and prepared["key"] == retrieval_key):
     try:
-        with st.spinner("Processing your query..."):
-            # Process the query
-            result = rag_pipeline.process_query(
-                query=query,
-                top_k=top_k,
-                use_query_expansion=use_query_expansion,
-                rerank_results=use_reranking,
-                template_type=selected_template
-            )
-
-            # Display the answer
-            st.header("Answer")
-            st.write(result["answer"])
-
-            # Display the retrieved chunks
-            st.header("Retrieved Sources")
-
-            # Create tabs for different views
-            tabs = st.tabs(["Ranked Sources", "Source Details"])
-
-            with tabs[0]:
-                for i, chunk in enumerate(result["formatted_chunks"]):
-                    with st.expander(f"Source {i + 1}: {chunk['reference']} (Score: {chunk['score']:.4f})"):
-                        st.write(chunk["text"])
-
-            with tabs[1]:
-                # Display table of sources with scores
-                source_data = [
-                    {
-                        "Index": i + 1,
-                        "Reference": chunk["reference"],
-                        "Score": f"{chunk['score']:.4f}",
-                        "Preview": chunk["text"][:100] + "..."
-                    }
-                    for i, chunk in enumerate(result["formatted_chunks"])
-                ]
-                st.dataframe(source_data)
+        # Answer from the retrieval kept in the session, unless this is a new
+        # question or the last answer came from the answer cache (no context kept)
+        context = None if submitted else prepared["context"]
+        events = rag_pipeline.stream_events(
+            query=query,
+            top_k=top_k,
+            use_query_expansion=use_query_expansion,
+            rerank_results=use_reranking,
+            template_type=selected_template,
+            use_compression=use_compression,
+            generation_mode=generation_mode,
+            prepared=context
+        )
+
+        # Reserve the answer slot above the sources
+        st.header("Answer")
+        answer_slot = st.container()
+        with answer_slot:
+            answer_text = st.empty()
+        st.header("Retrieved Sources")
+        sources_slot = st.empty()
+
+        # Sources appear after the vector search (and again once reranked),
+        # then the answer streams into its slot as tokens arrive
+        answer = ""
+        section_slots = {}
+        section_text = {}
+        result = None
+        for event in events:
+            if isinstance(event, RetrievalStarted):
+                sources_slot.caption("Retrieving relevant sources...")
+            elif isinstance(event, SourcesReady):
+                render_sources(event.sources, event.reranked)
+            elif isinstance(event, RerankDone):
+                render_sources(event.sources)
+            elif isinstance(event, AnswerDelta) and event.section:
+                if not section_slots:
+                    # One placeholder per perspective, each filled as its own call streams in
+                    with answer_slot:
+                        section_slots = {
+                            key: (f"{i}. **{title}**: ", st.empty())
+                            for i, (key, title, _) in enumerate(LEGAL_PERSPECTIVES, start=1)
+                        }
+                section_text[event.section] = section_text.get(event.section, "") + event.delta
+                heading, slot = section_slots[event.section]
+                slot.markdown(heading + section_text[event.section])
+            elif isinstance(event, AnswerDelta):
+                answer += event.delta
+                answer_text.markdown(answer)
+            elif isinstance(event, Final):
+                result = event.result
+                if submitted:
+                    st.session_state["prepared"] = {"key": retrieval_key, "context": event.prepared}
+                st.session_state["answered"] = {"key": answer_key, "result": result}
+
+        with answer_slot:
+            render_result_details(result)
 
     except Exception as e:
         st.error(f"Error processing query: {str(e)}")
 
+# Template comparison, kept in the session like the answer
+if compare_templates and st.session_state.get("answered", {}).get("key") == answer_key:
+    comparison_key = answer_key + tuple(compare_templates)
+    comparison = st.session_state.get("comparison")
+    try:
+        st.header("Template Comparison")
+        if not comparison or comparison["key"] != comparison_key:
+            with st.spinner("Generating comparison answers..."):
+                answers = rag_pipeline.process_query_multi(
+                    query, compare_templates, top_k=top_k, use_query_expansion=use_query_expansion,
+                    rerank_results=use_reranking, use_compression=use_compression,
+                    prepared=st.session_state["prepared"]["context"]
+                )
+            comparison = {"key": comparison_key, "answers": answers}
+            st.session_state["comparison"] = comparison
+        for tab, template_type in zip(st.tabs(compare_templates), compare_templates):
+            with tab:
+                st.markdown(comparison["answers"][template_type]["answer"])
+    except Exception as e:
+        st.error(f"Error processing query: {str(e)}")
+
 # Display help information
 with st.sidebar.expander("Help"):
     st.markdown("""
@@ -161,6 +253,43 @@ with st.sidebar.expander("Help"):
     - **Concise**: Brief, to-the-point answers
     """)
 
+# Measure this session's state after the run (results and widgets included)
+run_ctx = get_script_run_ctx()
+session_bytes = memory.get_session_sizes().update(run_ctx.session_id, st.session_state.to_dict()) if run_ctx else None
+
+# Memory admin view (RAG_ADMIN=1)
+if os.getenv("RAG_ADMIN", "0") == "1":
+    with st.sidebar.expander("Memory"):
+        monitor = memory.get_memory_monitor()
+        if st.button("Sample memory now"):
+            monitor.sample()
+        rss = memory.rss_bytes() or 0
+        budget = monitor.budget_bytes
+        st.metric("Process RSS", f"{rss / 2 ** 20:.0f} MB",
+                  help=f"Budget {budget / 2 ** 20:.0f} MB" if budget else None)
+
+        sessions = memory.get_session_sizes().summary()
+        st.caption(
+            f"{sessions['sessions']} active sessions, {sessions['total_bytes'] / 2 ** 20:.2f} MB of state "
+            f"(largest {sessions['max_bytes'] / 2 ** 10:.0f} KB"
+            + (f", this one {session_bytes / 2 ** 10:.0f} KB)" if session_bytes is not None else ")")
+        )
+        st.dataframe([
+            {"Cache": name, "Entries": entries, "MB": round(size / 2 ** 20, 2)}
+            for name, (entries, size) in memory.cache_sizes().items()
+        ])
+
+        if len(monitor.history) > 1:
+            st.line_chart({"RSS MB": [sample["rss_bytes"] / 2 ** 20 for sample in monitor.history]})
+        latest = monitor.latest or {}
+        if "traced_bytes" in latest:
+            st.caption(f"Traced Python memory: {latest['traced_bytes'] / 2 ** 20:.1f} MB")
+        if latest.get("growth_since_start"):
+            st.markdown("**Allocation growth since start**")
+            st.code("\n".join(latest["growth_since_start"]), language=None)
+        elif not monitor.trace:
+            st.caption("Set RAG_TRACEMALLOC=1 to see allocation growth by source line")
+
 # Footer
 st.markdown("---")
 st.caption("Smart Legal Assistant - Powered by WordLoom Technology")
@@ -0,0 +1,319 @@
+"""
+Memory accounting for long-lived app processes.
+
+The Streamlit process keeps one pipeline (`@st.cache_resource`) with its
+caches for its whole life, plus a `st.session_state` per browser session.
+This module measures both and watches the process over time:
+
+- Caches keep a running byte count of their entries (measured with
+  `deep_sizeof` / `vector_sizeof` when an entry is added), exported through
+  `register_cache_sizes` as `rag_cache_bytes{cache}` and `rag_cache_entries{cache}`
+- `SessionSizes` records the state size of every session on each script run
+  (sessions idle longer than RAG_SESSION_IDLE_SECONDS are forgotten)
+- `MemoryMonitor` samples RSS on a background thread and, with
+  RAG_TRACEMALLOC=1, takes tracemalloc snapshots and diffs each against the
+  previous and the first one, logging the allocation sites that grew most.
+  RSS above RAG_MEMORY_BUDGET_MB is logged as a warning.
+
+Configuration (environment):
+    RAG_MEMORY_MONITOR_INTERVAL=300    # seconds between samples; 0 disables the monitor
+    RAG_TRACEMALLOC=0                  # 1 traces allocations (slows allocation-heavy code)
+    RAG_TRACEMALLOC_FRAMES=1           # stack depth kept per allocation
+    RAG_MEMORY_BUDGET_MB=              # e.g. 1500
+    RAG_SESSION_IDLE_SECONDS=3600
+"""
+import os
+import sys
+import time
+import types
+import logging
+import threading
+import tracemalloc
+import dataclasses
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from SmartLegalAssistant.utils import metrics
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+_LEAF_TYPES = (str, bytes, bytearray, int, float, complex, bool, type(None))
+_OPAQUE_TYPES = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType, types.MethodType,
+                 types.GeneratorType, types.CoroutineType, types.AsyncGeneratorType)
+_FLOAT_SIZE = sys.getsizeof(0.0)
+
+
+def deep_sizeof(obj: Any) -> int:
+    """Approximate bytes held by `obj` and everything it contains.
+
+    Follows dicts, lists, tuples, sets, deques and dataclass instances, and
+    counts objects shared between them once. Other objects (clients, locks,
+    generators, traces) are counted at their shallow size, so measuring a
+    result dict never walks into the pipeline it came from.
+    """
+    seen = set()
+    total = 0
+    pending = [obj]
+    while pending:
+        item = pending.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        try:
+            total += sys.getsizeof(item)
+        except TypeError:
+            continue
+        if isinstance(item, _LEAF_TYPES) or isinstance(item, _OPAQUE_TYPES):
+            continue
+        if isinstance(item, dict):
+            pending.extend(item.keys())
+            pending.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset, deque)):
+            pending.extend(item)
+        elif dataclasses.is_dataclass(item):
+            pending.extend(getattr(item, field.name) for field in dataclasses.fields(item))
+    return total
+
+
+def vector_sizeof(vector: Any) -> int:
+    """Bytes held by an embedding (a list of floats or an array), without walking every element."""
+    if isinstance(vector, list):
+        return sys.getsizeof(vector) + len(vector) * _FLOAT_SIZE
+    return sys.getsizeof(vector)
+
+
+def rss_bytes() -> Optional[int]:
+    """Current resident set size (Linux), falling back to the peak."""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        try:
+            import resource
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+        except ImportError:
+            return None
+
+
+# ----------------------------------------------------------------------
+# Cache sizes
+# ----------------------------------------------------------------------
+
+CacheSizesSource = Callable[[], Dict[str, Tuple[int, int]]]
+_size_sources: List[CacheSizesSource] = []
+_size_sources_lock = threading.Lock()
+
+
+def register_cache_sizes(source: CacheSizesSource) -> None:
+    """Export cache sizes read from `source` at scrape time.
+
+    Args:
+        source: Returns {cache name: (entries, bytes)}; sizes from several
+            sources reporting the same cache name are added up
+    """
+    with _size_sources_lock:
+        _size_sources.append(source)
+
+
+def cache_sizes() -> Dict[str, Tuple[int, int]]:
+    """Entries and bytes of every registered cache, by cache name."""
+    totals: Dict[str, Tuple[int, int]] = {}
+    with _size_sources_lock:
+        sources = list(_size_sources)
+    for source in sources:
+        for name, (entries, size) in source().items():
+            previous_entries, previous_size = totals.get(name, (0, 0))
+            totals[name] = (previous_entries + entries, previous_size + size)
+    return totals
+
+
+metrics.gauge("rag_cache_entries", "Entries held by each cache", ["cache"]).set_function(
+    lambda: {(name,): entries for name, (entries, _) in cache_sizes().items()}
+)
+metrics.gauge("rag_cache_bytes", "Approximate bytes held by each cache", ["cache"]).set_function(
+    lambda: {(name,): size for name, (_, size) in cache_sizes().items()}
+)
+
+
+# ----------------------------------------------------------------------
+# Session state sizes
+# ----------------------------------------------------------------------
+
+class SessionSizes:
+    """Latest state size of every active session."""
+
+    def __init__(self, idle_seconds: float = 3600):
+        """Initialize the tracker.
+
+        Args:
+            idle_seconds: Sessions not updated for this long are dropped
+        """
+        self.idle_seconds = idle_seconds
+        self._sizes: Dict[str, Tuple[int, float]] = {}
+        self._lock = threading.Lock()
+
+    def update(self, session_id: str, state: Dict[str, Any]) -> int:
+        """Measure a session's state and return its size in bytes."""
+        size = deep_sizeof(state)
+        now = time.time()
+        with self._lock:
+            self._sizes[session_id] = (size, now)
+            for stale in [key for key, (_, seen) in self._sizes.items() if now - seen > self.idle_seconds]:
+                del self._sizes[stale]
+        return size
+
+    def get(self, session_id: str) -> Optional[int]:
+        with self._lock:
+            entry = self._sizes.get(session_id)
+        return entry[0] if entry is not None else None
+
+    def summary(self) -> Dict[str, int]:
+        """Session count, total and largest state size in bytes."""
+        with self._lock:
+            sizes = [size for size, _ in self._sizes.values()]
+        return {"sessions": len(sizes), "total_bytes": sum(sizes), "max_bytes": max(sizes, default=0)}
+
+
+# ----------------------------------------------------------------------
+# Process monitor
+# ----------------------------------------------------------------------
+
+class MemoryMonitor:
+    """Samples process memory periodically and diffs tracemalloc snapshots.
+
+    Keeping the first snapshot for "growth since start" costs memory in
+    proportion to the number of live allocation sites, not allocations.
+    """
+
+    def __init__(self, interval: float = 300, trace: bool = False, frames: int = 1, top: int = 10,
+                 budget_bytes: Optional[int] = None, history: int = 288):
+        """Initialize the monitor.
+
+        Args:
+            interval: Seconds between samples (0 disables the background thread)
+            trace: Start tracemalloc and diff snapshots on every sample
+            frames: Stack depth tracemalloc keeps per allocation
+            top: Allocation sites reported per diff
+            budget_bytes: RSS above this is logged as a warning
+            history: Samples kept for the admin view
+        """
+        self.interval = interval
+        self.trace = trace
+        self.frames = frames
+        self.top = top
+        self.budget_bytes = budget_bytes
+        self.history: Deque[Dict[str, Any]] = deque(maxlen=history)
+        self.latest: Optional[Dict[str, Any]] = None
+        self._first_snapshot = None
+        self._previous_snapshot = None
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Start tracing (if enabled) and the sampling thread (once)."""
+        with self._lock:
+            if self._thread is not None or self.interval <= 0:
+                return
+            if self.trace and not tracemalloc.is_tracing():
+                tracemalloc.start(self.frames)
+            self._thread = threading.Thread(target=self._run, daemon=True, name="memory-monitor")
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            try:
+                self.sample()
+            except Exception as e:
+                logger.warning(f"Memory sample failed: {e}")
+            time.sleep(self.interval)
+
+    @staticmethod
+    def _snapshot() -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+        ])
+
+    def sample(self) -> Dict[str, Any]:
+        """Take one sample now and return it."""
+        rss = rss_bytes()
+        sample: Dict[str, Any] = {"time": time.time(), "rss_bytes": rss}
+        if tracemalloc.is_tracing():
+            sample["traced_bytes"] = tracemalloc.get_traced_memory()[0]
+            snapshot = self._snapshot()
+            with self._lock:
+                first, previous = self._first_snapshot, self._previous_snapshot
+                if first is None:
+                    self._first_snapshot = snapshot
+                self._previous_snapshot = snapshot
+            if previous is not None:
+                sample["growth_since_previous"] = self._growth(snapshot, previous)
+                sample["growth_since_start"] = self._growth(snapshot, first)
+                if sample["growth_since_previous"]:
+                    logger.info("Top allocation growth since last sample: "
+                                + "; ".join(sample["growth_since_previous"][:3]))
+        if self.budget_bytes and rss and rss > self.budget_bytes:
+            logger.warning(f"RSS {rss / 2 ** 20:.0f} MB exceeds the memory budget "
+                           f"of {self.budget_bytes / 2 ** 20:.0f} MB")
+        with self._lock:
+            self.latest = sample
+            self.history.append({key: sample[key] for key in ("time", "rss_bytes", "traced_bytes") if key in sample})
+        return sample
+
+    def _growth(self, snapshot: tracemalloc.Snapshot, baseline: tracemalloc.Snapshot) -> List[str]:
+        stats = snapshot.compare_to(baseline, "lineno")
+        return [str(stat) for stat in stats[:self.top] if stat.size_diff > 0]
+
+
+metrics.gauge("process_resident_memory_bytes", "Resident set size of the process").set_function(
+    lambda: rss_bytes() or 0
+)
+metrics.gauge("rag_tracemalloc_traced_bytes", "Python memory traced by tracemalloc (0 when off)").set_function(
+    lambda: tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else 0
+)
+
+
+_monitor: Optional[MemoryMonitor] = None
+_sessions: Optional[SessionSizes] = None
+_singleton_lock = threading.Lock()
+
+
+def get_memory_monitor() -> MemoryMonitor:
+    """Return the process-wide memory monitor configured from the environment (not yet started)."""
+    global _monitor
+    if _monitor is None:
+        with _singleton_lock:
+            if _monitor is None:
+                budget_mb = os.getenv("RAG_MEMORY_BUDGET_MB")
+                _monitor = MemoryMonitor(
+                    interval=float(os.getenv("RAG_MEMORY_MONITOR_INTERVAL", "300")),
+                    trace=os.getenv("RAG_TRACEMALLOC", "0") == "1",
+                    frames=int(os.getenv("RAG_TRACEMALLOC_FRAMES", "1")),
+                    budget_bytes=int(float(budget_mb) * 2 ** 20) if budget_mb else None,
+                )
+    return _monitor
+
+
+def get_session_sizes() -> SessionSizes:
+    """Return the process-wide session size tracker."""
+    global _sessions
+    if _sessions is None:
+        with _singleton_lock:
+            if _sessions is None:
+                sessions = SessionSizes(idle_seconds=float(os.getenv("RAG_SESSION_IDLE_SECONDS", "3600")))
+                metrics.gauge("rag_sessions", "Sessions with recent activity").set_function(
+                    lambda: sessions.summary()["sessions"]
+                )
+                metrics.gauge("rag_session_state_bytes", "Total session state size").set_function(
+                    lambda: sessions.summary()["total_bytes"]
+                )
+                metrics.gauge("rag_session_state_max_bytes", "Largest session state").set_function(
+                    lambda: sessions.summary()["max_bytes"]
+                )
+                _sessions = sessions
+    return _sessions
@@ -0,0 +1,350 @@
+"""
+In-process metrics registry with Prometheus text exposition.
+
+Modules declare their metrics once at import time through the module-level
+helpers (`counter`, `gauge`, `histogram`), which return the existing metric if
+the name is already registered. Values can also be read lazily at scrape
+time with `set_function`, which is how cache hit ratios and in-flight API
+calls are exported without touching the hot path.
+
+`start_metrics_server(port)` serves `/metrics` from a daemon thread, next to
+the Streamlit server.
+
+Configuration (environment):
+    METRICS_PORT=9100     # unset disables the metrics server
+"""
+import os
+import math
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Seconds; covers sub-millisecond local stages up to slow generations
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0
+)
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if math.isnan(value):
+        return "NaN"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra is not None:
+        pairs.append(f'{extra[0]}="{_escape(extra[1])}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Metric:
+    """Base class: a named family of samples keyed by label values."""
+
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[LabelValues, Any] = {}
+        self._function: Optional[Callable[[], Any]] = None
+
+    def _key(self, labels: Dict[str, Any]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"Metric {self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def set_function(self, function: Callable[[], Any]) -> None:
+        """Read the value(s) from `function` at scrape time instead of storing them.
+
+        The function returns a number (unlabelled metrics) or a dict mapping
+        label-value tuples to numbers.
+        """
+        self._function = function
+
+    def _samples(self) -> Dict[LabelValues, Any]:
+        if self._function is None:
+            with self._lock:
+                return dict(self._values)
+        value = self._function()
+        return value if isinstance(value, dict) else {(): value}
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        try:
+            samples = self._samples()
+        except Exception as e:
+            logger.warning(f"Collecting metric {self.name} failed: {e}")
+            return lines
+        for label_values, value in sorted(samples.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, label_values)} {_format_value(value)}")
+        return lines
+
+
+class Counter(Metric):
+    """Monotonically increasing count."""
+
+    type_name = "counter"
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: Any) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+
+class Gauge(Metric):
+    """Value that can go up and down."""
+
+    type_name = "gauge"
+
+    def set(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: Any) -> None:
+        self.inc(-amount, **labels)
+
+    def value(self, **labels: Any) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+
+class Histogram(Metric):
+    """Distribution of observations in cumulative buckets, for p50/p95/p99 queries."""
+
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state["counts"][i] += 1
+                    break
+            state["sum"] += value
+            state["count"] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        with self._lock:
+            samples = {key: {"counts": list(state["counts"]), "sum": state["sum"], "count": state["count"]}
+                       for key, state in self._values.items()}
+        for label_values, state in sorted(samples.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, state["counts"]):
+                cumulative += count
+                labels = _format_labels(self.labelnames, label_values, ("le", _format_value(bound)))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, label_values, ("le", "+Inf"))
+            lines.append(f"{self.name}_bucket{labels} {state['count']}")
+            labels = _format_labels(self.labelnames, label_values)
+            lines.append(f"{self.name}_sum{labels} {_format_value(state['sum'])}")
+            lines.append(f"{self.name}_count{labels} {state['count']}")
+        return lines
+
+    def snapshot(self, **labels: Any) -> Dict[str, Any]:
+        """Count, sum and bucket counts for one label set (for tests and reports)."""
+        with self._lock:
+            state = self._values.get(self._key(labels))
+            if state is None:
+                return {"count": 0, "sum": 0.0, "buckets": {}}
+            return {
+                "count": state["count"],
+                "sum": state["sum"],
+                "buckets": dict(zip(self.buckets, state["counts"])),
+            }
+
+
+class MetricsRegistry:
+    """Named metrics rendered together in the Prometheus text format."""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, documentation: str, labelnames: Sequence[str], **kwargs) -> Any:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, labelnames, **kwargs)
+            elif not isinstance(metric, cls) or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"Metric {name} is already registered with a different type or labels")
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def get(self, name: str) -> Optional[Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda metric: metric.name)
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+
+def counter(name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+    """Get or create a counter in the default registry."""
+    return REGISTRY.counter(name, documentation, labelnames)
+
+
+def gauge(name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+    """Get or create a gauge in the default registry."""
+    return REGISTRY.gauge(name, documentation, labelnames)
+
+
+def histogram(name: str, documentation: str, labelnames: Sequence[str] = (),
+              buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+    """Get or create a histogram in the default registry."""
+    return REGISTRY.histogram(name, documentation, labelnames, buckets)
+
+
+# ----------------------------------------------------------------------
+# Cache hit ratios
+# ----------------------------------------------------------------------
+
+CacheStatsSource = Callable[[], Dict[str, Tuple[float, float]]]
+_cache_sources: List[CacheStatsSource] = []
+_cache_sources_lock = threading.Lock()
+
+
+def _collect_cache_stats() -> Dict[str, Tuple[float, float]]:
+    totals: Dict[str, Tuple[float, float]] = {}
+    with _cache_sources_lock:
+        sources = list(_cache_sources)
+    for source in sources:
+        for name, (hits, misses) in source().items():
+            previous_hits, previous_misses = totals.get(name, (0, 0))
+            totals[name] = (previous_hits + hits, previous_misses + misses)
+    return totals
+
+
+def register_cache_stats(source: CacheStatsSource) -> None:
+    """Export hit/miss counters read from `source` at scrape time.
+
+    Args:
+        source: Returns {cache name: (hits, misses)}; counts from several
+            sources reporting the same cache name are added up
+    """
+    with _cache_sources_lock:
+        _cache_sources.append(source)
+
+
+counter("rag_cache_hits_total", "Cache hits by cache", ["cache"]).set_function(
+    lambda: {(name,): hits for name, (hits, _) in _collect_cache_stats().items()}
+)
+counter("rag_cache_misses_total", "Cache misses by cache", ["cache"]).set_function(
+    lambda: {(name,): misses for name, (_, misses) in _collect_cache_stats().items()}
+)
+gauge("rag_cache_hit_ratio", "Hits divided by lookups, by cache", ["cache"]).set_function(
+    lambda: {
+        (name,): hits / (hits + misses) if hits + misses else 0.0
+        for name, (hits, misses) in _collect_cache_stats().items()
+    }
+)
+
+
+# ----------------------------------------------------------------------
+# HTTP exposition
+# ----------------------------------------------------------------------
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry: MetricsRegistry = REGISTRY
+
+    def do_GET(self) -> None:
+        if self.path.split("?", 1)[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        body = self.registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        logger.debug("metrics: " + format % args)
+
+
+_servers: Dict[int, ThreadingHTTPServer] = {}
+_servers_lock = threading.Lock()
+
+
+def start_metrics_server(port: Optional[int] = None, host: str = "0.0.0.0",
+                         registry: MetricsRegistry = REGISTRY) -> Optional[ThreadingHTTPServer]:
+    """Serve `/metrics` on a daemon thread (once per port).
+
+    Args:
+        port: Port to listen on (defaults to METRICS_PORT; None if unset disables the server)
+        host: Interface to bind
+        registry: Registry to expose
+
+    Returns:
+        The running server, or None if no port is configured
+    """
+    if port is None:
+        port = int(os.environ["METRICS_PORT"]) if os.getenv("METRICS_PORT") else None
+    if port is None:
+        return None
+    with _servers_lock:
+        server = _servers.get(port)
+        if server is not None:
+            return server
+        handler = type("MetricsHandler", (_MetricsHandler,), {"registry": registry})
+        try:
+            server = ThreadingHTTPServer((host, port), handler)
+        except OSError as e:
+            # Another process (e.g. a second Streamlit worker) already serves this port
+            logger.warning(f"Metrics server not started on port {port}: {e}")
+            return None
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True, name=f"metrics-{port}").start()
+        _servers[port] = server
+        logger.info(f"Serving metrics on http://{host}:{port}/metrics")
+        return server
+
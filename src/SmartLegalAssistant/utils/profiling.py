@@ -0,0 +1,216 @@
+"""
+Opt-in per-request profiling.
+
+`ProfilingExporter` hooks into request traces (`utils/tracing.py`): when a
+sampled trace starts, a background thread begins sampling the Python stack of
+the thread that started it (the Streamlit script thread, or the event-loop
+thread in async mode) every few milliseconds. When the trace finishes, the
+samples are written as a speedscope profile (open it at
+https://www.speedscope.app) named after the trace ID, with the trace's stage
+timings in its "metadata". The profile path is added to the result's
+"timings" as "profile".
+
+Sampling is wall-clock, so time spent waiting on the network or on other
+threads shows up as the frame that is waiting (e.g. `Future.result`). Work
+fanned out to thread pools is not sampled; its own cost shows in the stage
+timings. Profiles ride on traces, so nothing is profiled with RAG_TRACING=0,
+and with RAG_TRACE_SAMPLE_RATE < 1 only traced requests can be profiled.
+
+Configuration (environment):
+    RAG_PROFILING=0                 # 1 profiles every traced request
+    RAG_PROFILE_SAMPLE_RATE=0       # or profile a fraction of them, e.g. 0.01
+    RAG_PROFILE_DIR=logs/profiles
+    RAG_PROFILE_INTERVAL_MS=5
+    RAG_PROFILE_MIN_MS=0            # keep only profiles of requests slower than this
+"""
+import os
+import sys
+import json
+import time
+import random
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from SmartLegalAssistant.utils.tracing import Trace, TraceExporter
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+SPEEDSCOPE_SCHEMA = "https://www.speedscope.app/file-format-schema.json"
+
+
+class StackProfile:
+    """Stack samples of one thread, kept in speedscope's "sampled" layout."""
+
+    def __init__(self, thread_id: int):
+        self.thread_id = thread_id
+        self.thread_name = threading.current_thread().name if thread_id == threading.get_ident() else str(thread_id)
+        self.frames: List[Dict[str, Any]] = []
+        self._frame_index: Dict[Tuple[str, str, int], int] = {}
+        self.samples: List[List[int]] = []
+        self.weights: List[float] = []
+        self._start = time.perf_counter()
+        self._last = self._start
+
+    def sample(self, frame, now: float) -> None:
+        """Record the stack ending at `frame`, weighted by the time since the last sample."""
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            key = (getattr(code, "co_qualname", code.co_name), code.co_filename, code.co_firstlineno)
+            index = self._frame_index.get(key)
+            if index is None:
+                index = self._frame_index[key] = len(self.frames)
+                self.frames.append({"name": key[0], "file": key[1], "line": key[2]})
+            stack.append(index)
+            frame = frame.f_back
+        stack.reverse()
+        self.samples.append(stack)
+        self.weights.append(round((now - self._last) * 1000, 3))
+        self._last = now
+
+    @property
+    def elapsed_ms(self) -> float:
+        return round((self._last - self._start) * 1000, 3)
+
+    def to_speedscope(self, name: str, metadata: Dict[str, Any]) -> Dict[str, Any]:
+        """The profile as a speedscope file (extra "metadata" is ignored by the viewer)."""
+        return {
+            "$schema": SPEEDSCOPE_SCHEMA,
+            "name": name,
+            "exporter": "SmartLegalAssistant",
+            "activeProfileIndex": 0,
+            "shared": {"frames": self.frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": f"{name} [{self.thread_name}]",
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": self.elapsed_ms,
+                "samples": self.samples,
+                "weights": self.weights,
+            }],
+            "metadata": metadata,
+        }
+
+
+class StackSampler:
+    """Background thread that samples the stacks of registered threads.
+
+    It sleeps while nothing is registered, so an idle profiler costs nothing.
+    """
+
+    def __init__(self, interval: float = 0.005):
+        """Initialize the sampler.
+
+        Args:
+            interval: Seconds between samples
+        """
+        self.interval = interval
+        self._profiles: List[StackProfile] = []
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+
+    def add(self, profile: StackProfile) -> None:
+        with self._condition:
+            self._profiles.append(profile)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True, name="stack-sampler")
+                self._thread.start()
+            self._condition.notify()
+
+    def remove(self, profile: StackProfile) -> None:
+        with self._condition:
+            if profile in self._profiles:
+                self._profiles.remove(profile)
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while not self._profiles:
+                    self._condition.wait()
+                profiles = list(self._profiles)
+            frames = sys._current_frames()
+            now = time.perf_counter()
+            for profile in profiles:
+                frame = frames.get(profile.thread_id)
+                if frame is not None:
+                    profile.sample(frame, now)
+            del frames, frame
+            time.sleep(self.interval)
+
+
+class ProfilingExporter(TraceExporter):
+    """Profiles a sample of traced requests and writes one speedscope file per request."""
+
+    def __init__(self, directory: str = "logs/profiles", sample_rate: float = 1.0,
+                 interval: float = 0.005, min_duration_ms: float = 0.0):
+        """Initialize the exporter.
+
+        Args:
+            directory: Where profiles are written
+            sample_rate: Fraction of traced requests profiled
+            interval: Seconds between stack samples
+            min_duration_ms: Discard profiles of requests faster than this
+        """
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.min_duration_ms = min_duration_ms
+        self.sampler = StackSampler(interval)
+        self._active: Dict[str, StackProfile] = {}
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def start(self, trace: Trace) -> None:
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return
+        profile = StackProfile(threading.get_ident())
+        with self._lock:
+            self._active[trace.trace_id] = profile
+        self.sampler.add(profile)
+
+    def export(self, trace: Trace) -> None:
+        with self._lock:
+            profile = self._active.pop(trace.trace_id, None)
+        if profile is None:
+            return
+        self.sampler.remove(profile)
+        if trace.root.duration_ms < self.min_duration_ms:
+            return
+        path = os.path.join(
+            self.directory,
+            f"{time.strftime('%Y%m%dT%H%M%S')}-{trace.root.name}-{trace.trace_id}.speedscope.json",
+        )
+        metadata = {
+            "trace_id": trace.trace_id,
+            "operation": trace.root.name,
+            "attributes": trace.root.attributes,
+            "total_ms": trace.timings.get("total_ms"),
+            "stages": trace.timings.get("stages", {}),
+            "spans": trace.timings.get("spans", []),
+            "thread": profile.thread_name,
+            "sample_interval_ms": self.sampler.interval * 1000,
+            "samples": len(profile.samples),
+        }
+        name = f"{trace.root.name} {trace.trace_id} ({trace.root.duration_ms:.0f} ms)"
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(profile.to_speedscope(name, metadata), f, default=str)
+        trace.timings["profile"] = path
+        logger.info(f"Wrote profile for trace {trace.trace_id} to {path}")
+
+
+def profiling_exporter_from_env() -> Optional[ProfilingExporter]:
+    """The exporter configured by the environment, or None when profiling is off."""
+    sample_rate = 1.0 if os.getenv("RAG_PROFILING", "0") == "1" else float(os.getenv("RAG_PROFILE_SAMPLE_RATE", "0"))
+    if sample_rate <= 0:
+        return None
+    return ProfilingExporter(
+        directory=os.getenv("RAG_PROFILE_DIR", "logs/profiles"),
+        sample_rate=sample_rate,
+        interval=float(os.getenv("RAG_PROFILE_INTERVAL_MS", "5")) / 1000,
+        min_duration_ms=float(os.getenv("RAG_PROFILE_MIN_MS", "0")),
+    )
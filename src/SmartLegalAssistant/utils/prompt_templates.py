@@ -1,4 +1,7 @@
-from typing import Dict, Any
+import string
+import threading
+from functools import lru_cache
+from typing import Dict, Any, List, Tuple
 
 # Refined prompt templates for various use cases
 REFINED_TEMPLATES = {
@@ -83,6 +86,174 @@ Provide a brief and precise answer to the query using only information from the
 }
 
 
+# The four sections of the "legal_assistant" template as (key, title, instruction).
+# In parallel-perspective mode each section is generated by its own LLM call.
+LEGAL_PERSPECTIVES: List[Tuple[str, str, str]] = [
+    ("lawyer", "As a Lawyer",
+     "Use formal legal terminology, cite sections, and provide legal explanations."),
+    ("citizen", "As an Ordinary Citizen",
+     "Use simple, relatable language for better understanding."),
+    ("entrepreneur", "As an Entrepreneur",
+     "Focus on the practical business impact and legal implications."),
+    ("researcher", "As a Law Researcher",
+     "Focus on research language, summarize findings, and cite sections accurately."),
+]
+
+PERSPECTIVE_TEMPLATE = """
+You are a legal assistant helping to interpret corporate legal text using Kenya's Companies Act.
+STRICTLY use the provided context to answer the query. If the context does not provide an answer, say: "I don't know the answer based on the provided context."
+DO NOT make up or assume any information that is not included in the context.
+
+**IMPORTANT: When answering, you must explicitly cite the section numbers, clauses, or legal references as they appear in the provided context. If no section number is given, do not fabricate one.**
+Always cite exact section numbers or references if they are provided in the context. Avoid using phrases like 'as per the passage.'
+Context: {context}
+
+Explain the following query strictly using the context above, writing ONLY the section below and no other perspectives or headings:
+**{perspective}**: {instruction}
+
+Query: {query}
+"""
+
+# Map step of map-reduce generation; the reduce step uses the selected template
+# with the collected notes as its context.
+MAP_TEMPLATE = """
+You are a legal assistant reading one part of the material retrieved for a question about Kenya's Companies Act.
+From the excerpts below, extract every fact, rule, requirement or exception relevant to the query.
+Keep the source tag (for example [Source 3: Section 12]) next to each point you extract, and quote section numbers exactly as they appear.
+DO NOT add information that is not in the excerpts.
+If nothing in the excerpts is relevant, reply exactly: NO RELEVANT INFORMATION
+
+Excerpts:
+{context}
+
+Query: {query}
+
+Relevant points:
+"""
+
+MAP_NO_INFORMATION = "NO RELEVANT INFORMATION"
+
+
+class CompiledTemplate:
+    """A prompt template parsed once into static text segments and named slots.
+
+    Rendering is a single join over the pre-split segments, and the token
+    count of the static text is cached per tokenizer, so the room left for
+    the slots can be computed exactly.
+    """
+
+    def __init__(self, template: str):
+        """Parse a template.
+
+        Args:
+            template: Template string with {name} placeholders
+
+        Raises:
+            ValueError: If the template is malformed or uses positional or
+                formatted placeholders
+        """
+        self.template = template
+        # Segments alternate literal text and slot names: parts[i] is a slot
+        # name where i is in slot_positions, literal text otherwise.
+        self.parts: List[str] = []
+        self.slot_positions: List[int] = []
+
+        try:
+            parsed = list(string.Formatter().parse(template))
+        except ValueError as e:
+            raise ValueError(f"Malformed template: {e}") from e
+
+        for literal, field_name, format_spec, conversion in parsed:
+            if literal:
+                self.parts.append(literal)
+            if field_name is None:
+                continue
+            if not field_name.isidentifier():
+                raise ValueError(f"Template placeholders must be plain names, got {{{field_name}}}")
+            if format_spec or conversion:
+                raise ValueError(f"Template placeholder {{{field_name}}} must not use a format spec or conversion")
+            self.slot_positions.append(len(self.parts))
+            self.parts.append(field_name)
+
+        self.fields = frozenset(self.parts[i] for i in self.slot_positions)
+        slots = set(self.slot_positions)
+        self.static_text = "".join(part for i, part in enumerate(self.parts) if i not in slots)
+        self._static_tokens: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def require(self, *names: str) -> "CompiledTemplate":
+        """Check that the template has the given placeholders.
+
+        Raises:
+            ValueError: If any placeholder is missing
+        """
+        if any(name not in self.fields for name in names):
+            raise ValueError(
+                f"Template must contain {' and '.join('{' + name + '}' for name in names)} placeholders"
+            )
+        return self
+
+    def render(self, **values: Any) -> str:
+        """Fill every slot and join the segments.
+
+        Raises:
+            KeyError: If a placeholder has no value
+        """
+        parts = list(self.parts)
+        for i in self.slot_positions:
+            parts[i] = str(values[parts[i]])
+        return "".join(parts)
+
+    def static_tokens(self, token_counter) -> int:
+        """Tokens used by the template's static text, cached per tokenizer.
+
+        Args:
+            token_counter: Counter exposing `name` and `count(text)`
+        """
+        name = token_counter.name
+        tokens = self._static_tokens.get(name)
+        if tokens is None:
+            tokens = token_counter.count(self.static_text)
+            with self._lock:
+                self._static_tokens[name] = tokens
+        return tokens
+
+    def slot_budget(self, token_counter, max_tokens: int, **values: Any) -> int:
+        """Tokens left for the unfilled slots once static text and `values` are placed.
+
+        Args:
+            token_counter: Counter exposing `name` and `count(text)`
+            max_tokens: Token budget for the whole rendered prompt
+            **values: Slot values already known (e.g. the query)
+        """
+        used = self.static_tokens(token_counter)
+        for i in self.slot_positions:
+            name = self.parts[i]
+            if name in values:
+                used += token_counter.count(str(values[name]))
+        return max(0, max_tokens - used)
+
+
+@lru_cache(maxsize=256)
+def compile_template(template: str) -> CompiledTemplate:
+    """Return the compiled form of a template string, compiling it only once."""
+    return CompiledTemplate(template)
+
+
+# Built-in templates are compiled and validated at import time
+COMPILED_TEMPLATES: Dict[str, CompiledTemplate] = {
+    name: compile_template(template).require("context", "query")
+    for name, template in REFINED_TEMPLATES.items()
+}
+compile_template(PERSPECTIVE_TEMPLATE).require("context", "query", "perspective", "instruction")
+compile_template(MAP_TEMPLATE).require("context", "query")
+
+
+def get_compiled_template(template_type: str) -> CompiledTemplate:
+    """Get a compiled prompt template by type (falls back to factual_qa)."""
+    return COMPILED_TEMPLATES.get(template_type, COMPILED_TEMPLATES["factual_qa"])
+
+
 def get_template(template_type: str) -> str:
     """Get a prompt template by type.
 
@@ -104,10 +275,8 @@ def create_custom_template(template: str) -> str:
     Returns:
         Validated template string
     """
-    # Ensure the template contains the required placeholders
-    if "{context}" not in template or "{query}" not in template:
-        raise ValueError("Template must contain {context} and {query} placeholders")
-
+    # Compiling checks the placeholders and caches the parsed form for rendering
+    compile_template(template).require("context", "query")
     return template
 
 
@@ -121,4 +290,4 @@ def format_template(template: str, **kwargs) -> str:
     Returns:
         Formatted prompt
     """
-    return template.format(**kwargs)
+    return compile_template(template).render(**kwargs)
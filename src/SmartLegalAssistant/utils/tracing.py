@@ -0,0 +1,488 @@
+"""
+Per-request latency tracing for the RAG pipeline.
+
+A trace is started per request (`Tracer.start_trace`) and made current with
+`activate`; code anywhere below it opens child spans with `span(name, **attrs)`.
+The current span lives in a context variable, so it follows asyncio tasks and
+`asyncio.to_thread` calls automatically; thread pools need `bind`. When no
+trace is active, `span` returns a shared no-op object, so instrumented code
+costs one context-variable lookup.
+
+Finished traces produce a timing breakdown for the result dict and are handed
+to exporters: `JsonlExporter` (local file), `OTLPExporter` (OTLP/HTTP JSON,
+accepted by OpenTelemetry collectors) and `MetricsExporter` (stage and request
+latency histograms in `utils/metrics.py`). Sampling and RAG_TRACING only
+apply to timings and the trace exporters: requests that are not traced still
+get an unsampled trace that feeds the metrics alone.
+
+Configuration (environment):
+    RAG_TRACING=1                      # 0 disables timings and trace export (metrics stay on)
+    RAG_TRACE_SAMPLE_RATE=1.0          # fraction of requests traced
+    RAG_TRACE_JSONL_PATH=              # e.g. logs/traces.jsonl
+    OTEL_EXPORTER_OTLP_ENDPOINT=       # e.g. http://localhost:4318
+    OTEL_SERVICE_NAME=smart-legal-assistant
+    RAG_METRICS=1                      # 0 stops feeding traces into the metrics registry
+    RAG_PROFILING=0                    # stack profiles of traced requests (see utils/profiling.py)
+"""
+import os
+import json
+import time
+import queue
+import random
+import logging
+import threading
+import contextvars
+import urllib.request
+import weakref
+from typing import Any, Callable, Dict, List, Optional
+
+from dotenv import load_dotenv
+
+from SmartLegalAssistant.utils import metrics
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+_active_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("rag_active_span", default=None)
+
+
+class Span:
+    """One timed stage of a trace."""
+
+    __slots__ = ("trace", "name", "span_id", "parent_id", "start_ns", "_start", "duration", "attributes")
+
+    def __init__(self, trace: "Trace", name: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.trace = trace
+        self.name = name
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.start_ns = time.time_ns()
+        self._start = time.perf_counter()
+        self.duration: Optional[float] = None
+        self.attributes = attributes
+
+    def set(self, **attributes: Any) -> None:
+        """Add or overwrite attributes."""
+        self.attributes.update(attributes)
+
+    def end(self) -> None:
+        """Stop the clock and record the span in its trace (only the first call counts)."""
+        if self.duration is None:
+            self.duration = time.perf_counter() - self._start
+            self.trace._record(self)
+
+    @property
+    def duration_ms(self) -> float:
+        seconds = self.duration if self.duration is not None else time.perf_counter() - self._start
+        return round(seconds * 1000, 3)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_ns": self.start_ns,
+            "duration_ms": self.duration_ms,
+            "attributes": dict(self.attributes),
+        }
+
+
+class _NoopSpan:
+    """Stands in for a span when tracing is off; every operation does nothing."""
+
+    __slots__ = ()
+
+    def set(self, **attributes: Any) -> None:
+        pass
+
+    def end(self) -> None:
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, *exc_info) -> bool:
+        return False
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class _SpanScope:
+    """Context manager that makes a span current for a block and ends it afterwards."""
+
+    __slots__ = ("span", "_token")
+
+    def __init__(self, span: Span):
+        self.span = span
+        self._token = None
+
+    def __enter__(self) -> Span:
+        self._token = _active_span.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        _active_span.reset(self._token)
+        if exc_type is not None:
+            self.span.set(error=exc_type.__name__)
+        self.span.end()
+        return False
+
+
+class Trace:
+    """All spans recorded for one request."""
+
+    def __init__(self, name: str, exporters: List["TraceExporter"], sampled: bool = True, **attributes: Any):
+        self.trace_id = os.urandom(16).hex()
+        self.exporters = exporters
+        # Unsampled traces only feed exporters that see every request, and have no timings
+        self.sampled = sampled
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+        self.root = Span(self, name, None, attributes)
+        # Filled in place by `finish`, so a result can carry it before a stream ends
+        self.timings: Dict[str, Any] = {}
+        self.finished = False
+
+    def start_span(self, name: str, parent: Optional[Span] = None, **attributes: Any) -> Span:
+        """Open a span (under `parent`, or the root) that the caller must `end`."""
+        return Span(self, name, (parent or self.root).span_id, attributes)
+
+    def _record(self, span: Span) -> None:
+        with self._lock:
+            self.spans.append(span)
+
+    def finish(self) -> Dict[str, Any]:
+        """End the root span, fill `timings` and export the trace (once)."""
+        with self._lock:
+            if self.finished:
+                return self.timings
+            self.finished = True
+        self.root.end()
+        if self.sampled:
+            self.timings.update(self.breakdown())
+        for exporter in self.exporters:
+            try:
+                exporter.export(self)
+            except Exception as e:
+                logger.warning(f"Trace exporter {type(exporter).__name__} failed: {e}")
+        return self.timings
+
+    def breakdown(self) -> Dict[str, Any]:
+        """Total time, summed milliseconds per stage name, and every span."""
+        with self._lock:
+            spans = [span for span in self.spans if span is not self.root]
+        stages: Dict[str, float] = {}
+        for span in spans:
+            stages[span.name] = round(stages.get(span.name, 0.0) + span.duration_ms, 3)
+        return {
+            "trace_id": self.trace_id,
+            "total_ms": self.root.duration_ms,
+            "stages": stages,
+            "spans": [span.to_dict() for span in sorted(spans, key=lambda span: span.start_ns)],
+        }
+
+
+class TraceExporter:
+    """Receives each finished trace.
+
+    Exporters with `sampled_only = False` also receive unsampled traces.
+    """
+
+    sampled_only = True
+
+    def start(self, trace: Trace) -> None:
+        """Called when a trace starts (optional)."""
+
+    def export(self, trace: Trace) -> None:
+        raise NotImplementedError
+
+
+class MetricsExporter(TraceExporter):
+    """Feeds traces into the metrics registry.
+
+    Every span is observed in a per-stage latency histogram and every root in
+    a per-operation request histogram, with request counts by status and a
+    gauge of requests in flight. Sees every request, sampled or not. A trace
+    that is dropped without being finished (an abandoned stream) leaves the
+    in-flight gauge when it is garbage collected.
+    """
+
+    sampled_only = False
+
+    def __init__(self):
+        self.stage_seconds = metrics.histogram(
+            "rag_stage_duration_seconds", "Latency of pipeline stages", ["stage"]
+        )
+        self.request_seconds = metrics.histogram(
+            "rag_request_duration_seconds", "End-to-end pipeline request latency", ["operation"]
+        )
+        self.requests = metrics.counter(
+            "rag_requests_total", "Pipeline requests by outcome", ["operation", "status"]
+        )
+        self.in_flight = metrics.gauge(
+            "rag_requests_in_flight", "Pipeline requests currently being served", ["operation"]
+        )
+
+    def start(self, trace: Trace) -> None:
+        self.in_flight.inc(operation=trace.root.name)
+        # Must not reference the trace, or it would never be collected
+        trace._in_flight = weakref.finalize(trace, self.in_flight.dec, operation=trace.root.name)
+
+    def export(self, trace: Trace) -> None:
+        operation = trace.root.name
+        trace._in_flight()
+        status = "error" if "error" in trace.root.attributes else "ok"
+        self.requests.inc(operation=operation, status=status)
+        self.request_seconds.observe(trace.root.duration or 0.0, operation=operation)
+        with trace._lock:
+            spans = [span for span in trace.spans if span is not trace.root]
+        for span in spans:
+            self.stage_seconds.observe(span.duration or 0.0, stage=span.name)
+
+
+class JsonlExporter(TraceExporter):
+    """Appends one JSON line per trace to a local file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def export(self, trace: Trace) -> None:
+        line = json.dumps({
+            "trace_id": trace.trace_id,
+            "name": trace.root.name,
+            "attributes": trace.root.attributes,
+            **trace.timings,
+        }, default=str)
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class OTLPExporter(TraceExporter):
+    """Sends traces to an OpenTelemetry collector over OTLP/HTTP (JSON encoding).
+
+    Requests are posted from a background thread so exporting never delays
+    an answer; if the collector falls behind, traces beyond `max_queue` are dropped.
+    """
+
+    def __init__(self, endpoint: str, service_name: str = "smart-legal-assistant",
+                 timeout: float = 5.0, max_queue: int = 1000):
+        """Initialize the exporter.
+
+        Args:
+            endpoint: Collector base URL (".../v1/traces" is appended if missing)
+            service_name: Reported as the `service.name` resource attribute
+            timeout: Seconds per HTTP request
+            max_queue: Traces buffered before new ones are dropped
+        """
+        self.url = endpoint if endpoint.rstrip("/").endswith("/v1/traces") else endpoint.rstrip("/") + "/v1/traces"
+        self.service_name = service_name
+        self.timeout = timeout
+        self._queue: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=max_queue)
+        self._thread = threading.Thread(target=self._run, daemon=True, name="otlp-exporter")
+        self._thread.start()
+
+    def _payload(self, trace: Trace) -> Dict[str, Any]:
+        spans = []
+        for span in list(trace.spans):  # includes the root once the trace is finished
+            end_ns = span.start_ns + int((span.duration or 0.0) * 1e9)
+            otlp_span = {
+                "traceId": trace.trace_id,
+                "spanId": span.span_id,
+                "name": span.name,
+                "kind": 1,
+                "startTimeUnixNano": str(span.start_ns),
+                "endTimeUnixNano": str(end_ns),
+                "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in span.attributes.items()],
+            }
+            if span.parent_id:
+                otlp_span["parentSpanId"] = span.parent_id
+            if "error" in span.attributes:
+                otlp_span["status"] = {"code": 2, "message": str(span.attributes["error"])}
+            spans.append(otlp_span)
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": self.service_name}}]},
+                "scopeSpans": [{"scope": {"name": "SmartLegalAssistant"}, "spans": spans}],
+            }]
+        }
+
+    def export(self, trace: Trace) -> None:
+        try:
+            self._queue.put_nowait(self._payload(trace))
+        except queue.Full:
+            logger.warning("OTLP export queue full; dropping trace")
+
+    def _run(self) -> None:
+        while True:
+            payload = self._queue.get()
+            request = urllib.request.Request(
+                self.url,
+                data=json.dumps(payload).encode("utf-8"),
+                headers={"Content-Type": "application/json"},
+                method="POST",
+            )
+            try:
+                with urllib.request.urlopen(request, timeout=self.timeout):
+                    pass
+            except Exception as e:
+                logger.warning(f"OTLP export to {self.url} failed: {e}")
+
+
+class Tracer:
+    """Starts a trace per request and hands finished ones to exporters."""
+
+    def __init__(self, exporters: Optional[List[TraceExporter]] = None, enabled: bool = True,
+                 sample_rate: float = 1.0):
+        """Initialize the tracer.
+
+        Args:
+            exporters: Destinations for finished traces (timings are still
+                attached to results without any)
+            enabled: False leaves only unsampled traces for exporters that see
+                every request (every trace and span is a no-op without any)
+            sample_rate: Fraction of requests traced
+        """
+        self.exporters = exporters or []
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+
+    def start_trace(self, name: str, **attributes: Any) -> Optional[Trace]:
+        """Start a trace, unsampled if tracing is off or the request is not sampled.
+
+        Returns None when the request is not sampled and no exporter needs
+        every request.
+        """
+        sampled = self.enabled and (self.sample_rate >= 1.0 or random.random() < self.sample_rate)
+        exporters = self.exporters if sampled else [e for e in self.exporters if not e.sampled_only]
+        if not sampled and not exporters:
+            return None
+        trace = Trace(name, exporters, sampled=sampled, **attributes)
+        for exporter in exporters:
+            exporter.start(trace)
+        return trace
+
+
+def current_span() -> Optional[Span]:
+    """The span code is currently running under, if any."""
+    return _active_span.get()
+
+
+def activate(trace: Optional[Trace]):
+    """Make a trace's root span current for a block (no-op for None)."""
+    return resume(trace.root if trace is not None else None)
+
+
+def resume(span: Optional[Span]):
+    """Make an open span current again for a block, without ending it (no-op for None).
+
+    Lets generator bodies, which run in their consumer's context, record
+    child spans under the span that was current when the generator was made.
+    The block must not contain a `yield`.
+    """
+    if span is None or span is NOOP_SPAN:
+        return NOOP_SPAN
+    return _ActivateScope(span)
+
+
+class _ActivateScope(_SpanScope):
+    """Like `_SpanScope` but leaves the span open; the trace is ended by `Trace.finish`.
+
+    If the block raises while a trace's root is active, the request has
+    failed, so the trace is finished (and exported) with the error.
+    """
+
+    __slots__ = ()
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        _active_span.reset(self._token)
+        if exc_type is not None:
+            self.span.set(error=exc_type.__name__)
+            if self.span is self.span.trace.root:
+                self.span.trace.finish()
+        return False
+
+
+def span(name: str, **attributes: Any):
+    """Open a child span of the current span for a `with` block.
+
+    Returns a no-op when no trace is active.
+    """
+    parent = _active_span.get()
+    if parent is None:
+        return NOOP_SPAN
+    return _SpanScope(parent.trace.start_span(name, parent, **attributes))
+
+
+def start_span(name: str, **attributes: Any):
+    """Open a child span of the current span that the caller ends explicitly.
+
+    Used for work that outlives the current block, such as a returned stream.
+    Returns a no-op when no trace is active.
+    """
+    return child_span(_active_span.get(), name, **attributes)
+
+
+def child_span(parent: Optional[Span], name: str, **attributes: Any):
+    """Open a span under an explicit parent that the caller ends (no-op for None)."""
+    if parent is None or parent is NOOP_SPAN:
+        return NOOP_SPAN
+    return parent.trace.start_span(name, parent, **attributes)
+
+
+def bind(fn: Callable[..., Any]) -> Callable[..., Any]:
+    """Wrap `fn` so it runs under the caller's current span on another thread."""
+    context = contextvars.copy_context()
+
+    def run(*args: Any, **kwargs: Any) -> Any:
+        return context.copy().run(fn, *args, **kwargs)
+    return run
+
+
+_tracer: Optional[Tracer] = None
+_tracer_lock = threading.Lock()
+
+
+def get_tracer() -> Tracer:
+    """Return the process-wide tracer configured from the environment."""
+    global _tracer
+    if _tracer is None:
+        with _tracer_lock:
+            if _tracer is None:
+                from SmartLegalAssistant.utils.profiling import profiling_exporter_from_env
+
+                exporters: List[TraceExporter] = []
+                profiler = profiling_exporter_from_env()
+                if profiler is not None:
+                    # First, so the profile path is in "timings" when the others export
+                    exporters.append(profiler)
+                if os.getenv("RAG_METRICS", "1") != "0":
+                    exporters.append(MetricsExporter())
+                if os.getenv("RAG_TRACE_JSONL_PATH"):
+                    exporters.append(JsonlExporter(os.environ["RAG_TRACE_JSONL_PATH"]))
+                if os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT"):
+                    exporters.append(OTLPExporter(
+                        os.environ["OTEL_EXPORTER_OTLP_ENDPOINT"],
+                        service_name=os.getenv("OTEL_SERVICE_NAME", "smart-legal-assistant"),
+                    ))
+                _tracer = Tracer(
+                    exporters=exporters,
+                    enabled=os.getenv("RAG_TRACING", "1") != "0",
+                    sample_rate=float(os.getenv("RAG_TRACE_SAMPLE_RATE", "1.0")),
+                )
+    return _tracer
@@ -0,0 +1,39 @@
+"""
+Shared fixtures: the production classes running on the offline stand-ins
+from `SmartLegalAssistant.benchmarks.fakes` (no network access or API keys).
+"""
+import pytest
+
+from SmartLegalAssistant.benchmarks.corpus import synthetic_corpus
+from SmartLegalAssistant.benchmarks.fakes import FakeBackendProfile
+from SmartLegalAssistant.benchmarks.run import build_stack
+from SmartLegalAssistant.core.answer_cache import AnswerCache
+
+
+@pytest.fixture(scope="session")
+def corpus():
+    return synthetic_corpus(sections=40)
+
+
+@pytest.fixture
+def profile():
+    """Fake backends answering instantly."""
+    return FakeBackendProfile().scaled(0)
+
+
+@pytest.fixture
+def make_stack(profile, corpus):
+    """Build a fake-backed stack; keyword arguments go to `build_stack`."""
+    def make(**kwargs):
+        return build_stack(kwargs.pop("profile", profile), corpus, **kwargs)
+    return make
+
+
+@pytest.fixture
+def stack(make_stack):
+    return make_stack()
+
+
+@pytest.fixture
+def answer_cache(tmp_path):
+    return AnswerCache(cache_dir=str(tmp_path / "answers"))
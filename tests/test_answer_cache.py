@@ -0,0 +1,80 @@
+import time
+
+from SmartLegalAssistant.core.answer_cache import AnswerCache
+
+PARAMS = {"template_type": "concise", "top_k": 5}
+RESULT = {"answer": "Thirty days.", "answer_stream": iter(())}
+
+
+def test_exact_hit_ignores_case_and_whitespace(answer_cache):
+    answer_cache.put("What notice is required?", PARAMS, RESULT)
+    result, match = answer_cache.get("  what NOTICE is required? ", PARAMS)
+    assert match == "exact"
+    assert result == {"answer": "Thirty days."}
+    assert answer_cache.get("What notice is required?", {**PARAMS, "top_k": 6}) is None
+
+
+def test_semantic_hit_needs_same_params_and_threshold(tmp_path):
+    cache = AnswerCache(cache_dir=str(tmp_path), semantic_threshold=0.9)
+    cache.put("What notice is required?", PARAMS, RESULT, [1.0, 0.0, 0.1])
+    assert cache.get("Which notice period applies?", PARAMS, [0.9, 0.0, 0.1])[1] == "semantic"
+    assert cache.get("Which notice period applies?", PARAMS, [0.0, 1.0, 0.0]) is None
+    assert cache.get("Which notice period applies?", {**PARAMS, "top_k": 6}, [0.9, 0.0, 0.1]) is None
+    assert cache.stats()["semantic_hits"] == 1
+
+
+def test_expired_entries_are_missing(tmp_path):
+    cache = AnswerCache(cache_dir=str(tmp_path), ttl_seconds=0.05, semantic_threshold=0.9)
+    cache.put("What notice is required?", PARAMS, RESULT, [1.0, 0.0])
+    time.sleep(0.1)
+    assert cache.get("What notice is required?", PARAMS) is None
+    assert cache.get("Which notice period applies?", PARAMS, [1.0, 0.0]) is None
+    assert AnswerCache(cache_dir=str(tmp_path), ttl_seconds=0.05).stats()["entries"] == 0
+
+
+def test_oldest_entries_are_evicted_from_lookups(tmp_path):
+    cache = AnswerCache(cache_dir=str(tmp_path), max_entries=2, semantic_threshold=0.99)
+    for i, vector in enumerate(([1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [0.0, 0.0, 1.0])):
+        cache.put(f"query {i}", PARAMS, {"answer": str(i)}, vector)
+        time.sleep(0.01)
+    assert cache.stats()["entries"] == 2
+    assert cache.get("query 0", PARAMS) is None
+    assert cache.get("rephrased 0", PARAMS, [1.0, 0.0, 0.0]) is None
+    assert cache.get("rephrased 2", PARAMS, [0.0, 0.0, 1.0])[0] == {"answer": "2"}
+
+
+def test_entries_survive_a_restart(tmp_path):
+    AnswerCache(cache_dir=str(tmp_path), semantic_threshold=0.9).put(
+        "What notice is required?", PARAMS, RESULT, [1.0, 0.0]
+    )
+    reloaded = AnswerCache(cache_dir=str(tmp_path), semantic_threshold=0.9)
+    assert reloaded.get("Which notice period applies?", PARAMS, [1.0, 0.01])[1] == "semantic"
+
+
+def test_streamed_result_is_stored_once_its_stream_is_read(answer_cache):
+    result = {"answer": "Four weeks.", "answer_stream": iter(["Four ", "weeks."])}
+    stream = answer_cache.put_result("q", PARAMS, result)["answer_stream"]
+    assert result["cached"] is False
+    assert answer_cache.get("q", PARAMS) is None
+
+    assert "".join(stream) == "Four weeks."
+    cached, match = answer_cache.get("q", PARAMS)
+    assert (cached, match) == ({"answer": "Four weeks."}, "exact")
+
+
+def test_lookup_embeds_only_for_near_duplicate_matching(tmp_path):
+    embedded = []
+
+    def embed_query(query):
+        embedded.append(query)
+        return [1.0, 0.0]
+
+    exact_only = AnswerCache(cache_dir=str(tmp_path / "exact"))
+    assert exact_only.lookup("q", PARAMS, embed_query) == (None, None)
+    assert embedded == []
+
+    semantic = AnswerCache(cache_dir=str(tmp_path / "semantic"), semantic_threshold=0.9)
+    semantic.put("q", PARAMS, {"answer": "a"}, [1.0, 0.0])
+    result, vector = semantic.lookup("rephrased q", PARAMS, embed_query)
+    assert embedded == ["rephrased q"] and vector == [1.0, 0.0]
+    assert result["cached"] and result["cache_match"] == "semantic" and result["query"] == "rephrased q"
@@ -0,0 +1,47 @@
+from unittest import mock
+
+import pytest
+
+from SmartLegalAssistant.benchmarks.load import APP_PATH, patched_factories
+from SmartLegalAssistant.core.answer_generator import RAGPipeline
+
+QUERY = "What notice must a landlord give before ending a lease?"
+
+
+@pytest.fixture
+def app(stack):
+    from streamlit.testing.v1 import AppTest
+
+    streams = []
+    stream_events = RAGPipeline.stream_events
+
+    def counting(self, *args, **kwargs):
+        streams.append(kwargs.get("template_type"))
+        return stream_events(self, *args, **kwargs)
+
+    with patched_factories(stack), mock.patch.object(RAGPipeline, "stream_events", counting):
+        app = AppTest.from_file(APP_PATH, default_timeout=30)
+        app.run()
+        app.text_area[0].input(QUERY)
+        app.button[0].click()
+        app.run()
+        yield app, streams
+
+
+def test_rerun_redraws_the_kept_answer(app):
+    app, streams = app
+    assert streams == ["legal_assistant"]
+
+    app.run()
+    assert not app.error and not app.exception
+    assert streams == ["legal_assistant"]
+    answer = app.session_state["answered"]["result"]["answer"]
+    assert answer in [element.value for element in app.markdown]
+
+
+def test_changing_the_template_generates_again(app):
+    app, streams = app
+    app.sidebar.selectbox[0].select("concise")
+    app.run()
+    assert not app.error and not app.exception
+    assert streams == ["legal_assistant", "concise"]
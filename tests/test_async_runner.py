@@ -0,0 +1,76 @@
+import asyncio
+import contextvars
+import concurrent.futures
+
+import pytest
+
+from SmartLegalAssistant.core.async_runner import EventLoopThread, gather_cancelling, run_sync
+
+REQUEST = contextvars.ContextVar("request", default=None)
+
+
+@pytest.fixture
+def loop_thread():
+    thread = EventLoopThread(name="test-event-loop")
+    yield thread
+    thread.stop()
+
+
+def test_gather_cancelling_returns_results_in_order():
+    async def value(result, delay):
+        await asyncio.sleep(delay)
+        return result
+
+    assert asyncio.run(gather_cancelling(value("a", 0.02), value("b", 0))) == ["a", "b"]
+
+
+def test_gather_cancelling_cancels_siblings_of_a_failure():
+    cancelled = []
+
+    async def slow():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    async def failing():
+        raise RuntimeError("search failed")
+
+    async def main():
+        with pytest.raises(RuntimeError, match="search failed"):
+            await gather_cancelling(slow(), failing())
+        await asyncio.sleep(0)
+
+    asyncio.run(main())
+    assert cancelled == [True]
+
+
+def test_run_carries_context_variables(loop_thread):
+    async def current():
+        return REQUEST.get()
+
+    REQUEST.set("request-1")
+    assert loop_thread.run(current()) == "request-1"
+
+
+def test_timeout_cancels_the_coroutine(loop_thread):
+    cancelled = asyncio.Event()
+
+    async def slow():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    with pytest.raises(concurrent.futures.TimeoutError):
+        loop_thread.run(slow(), timeout=0.05)
+    assert loop_thread.run(asyncio.wait_for(cancelled.wait(), 1)) is True
+
+
+def test_run_sync_reuses_one_loop():
+    async def loop():
+        return asyncio.get_running_loop()
+
+    assert run_sync(loop()) is run_sync(loop())
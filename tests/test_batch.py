@@ -0,0 +1,56 @@
+import pytest
+
+from SmartLegalAssistant.core.batch import BatchProgress
+
+QUERIES = [
+    "What notice must a landlord give before ending a lease?",
+    "Who is liable for repairs to rented premises?",
+    "How is a deposit returned at the end of a tenancy?",
+    "Can a tenant sublet without consent?",
+]
+
+
+def test_resume_yields_stored_results(stack, tmp_path):
+    path = str(tmp_path / "progress.jsonl")
+    first = list(stack["pipeline"].process_queries(QUERIES, top_k=5, progress_path=path))
+    assert not any(result.get("resumed") for result in first)
+
+    resumed = list(stack["pipeline"].process_queries(QUERIES, top_k=5, progress_path=path))
+    assert all(result["resumed"] for result in resumed)
+    assert sorted(result["index"] for result in resumed) == list(range(len(QUERIES)))
+
+
+def test_resume_refuses_other_parameters(stack, tmp_path):
+    path = str(tmp_path / "progress.jsonl")
+    list(stack["pipeline"].process_queries(QUERIES, top_k=5, progress_path=path))
+
+    with pytest.raises(ValueError, match="other parameters"):
+        list(stack["pipeline"].process_queries(QUERIES, top_k=8, progress_path=path))
+
+
+def test_progress_without_header_is_not_resumed(tmp_path):
+    path = tmp_path / "progress.jsonl"
+    path.write_text('{"index": 0, "query": "q", "result": {"answer": "a"}}\n', encoding="utf-8")
+
+    with pytest.raises(ValueError):
+        BatchProgress(str(path), {"top_k": 5})
+
+
+def test_failed_embedding_batch_only_fails_its_queries(stack, monkeypatch):
+    embeddings = stack["retriever"].embedding_model
+    aembed_documents = embeddings.aembed_documents
+
+    async def flaky(texts):
+        if QUERIES[0] in texts:
+            raise RuntimeError("embedding service unavailable")
+        return await aembed_documents(texts)
+
+    monkeypatch.setattr(embeddings, "aembed_documents", flaky)
+    results = {
+        result["index"]: result
+        for result in stack["pipeline"].process_queries(QUERIES, top_k=5, embed_batch_size=2)
+    }
+
+    assert sorted(results) == list(range(len(QUERIES)))
+    assert {index for index, result in results.items() if "error" in result} == {0, 1}
+    assert all(results[index].get("answer") for index in (2, 3))
@@ -0,0 +1,73 @@
+import pytest
+
+from SmartLegalAssistant.benchmarks.fakes import LocalVectorStore, fake_clients
+from SmartLegalAssistant.core.answer_generator import AnswerGenerator, RAGPipeline
+from SmartLegalAssistant.core.cassette import (
+    AsyncRecordingTogether, AsyncReplayTogether, Cassette, CassetteMiss, CassetteVectorStore, RecordingTogether,
+    ReplayTogether, ReplayedError,
+)
+from SmartLegalAssistant.core.embeddings import TogetherAIEmbeddings
+from SmartLegalAssistant.core.llm import TogetherAILanguageModel
+from SmartLegalAssistant.core.rate_limiter import APIGovernor
+from SmartLegalAssistant.core.reranker import TogetherAIReranker
+from SmartLegalAssistant.core.retriever import Retriever
+from SmartLegalAssistant.utils.tracing import Tracer
+
+QUERY = "What notice must a landlord give before ending a lease?"
+
+
+def pipeline(client, async_client, vector_store):
+    governor = APIGovernor(requests_per_second=10000, max_concurrency=256)
+    clients = {"client": client, "async_client": async_client, "governor": governor}
+    llm = TogetherAILanguageModel(**clients)
+    retriever = Retriever(TogetherAIEmbeddings(**clients), vector_store, reranker=TogetherAIReranker(**clients), llm=llm)
+    return RAGPipeline(retriever, AnswerGenerator(llm=llm), tracer=Tracer(enabled=False))
+
+
+@pytest.fixture
+def recorded(tmp_path, profile, corpus):
+    path = str(tmp_path / "session.jsonl.gz")
+    cassette = Cassette(path, mode="record")
+    client, async_client = fake_clients(profile)
+    store = LocalVectorStore(corpus, embedding_dim=profile.embedding_dim, seed=profile.seed)
+    result = pipeline(
+        RecordingTogether(client, cassette),
+        AsyncRecordingTogether(lambda: async_client, cassette),
+        CassetteVectorStore(store, cassette),
+    ).process_query(QUERY, 5)
+    cassette.close()
+    return path, result
+
+
+def test_replay_answers_without_backends(recorded):
+    path, result = recorded
+    cassette = Cassette(path, mode="replay")
+    replayed = pipeline(
+        ReplayTogether(cassette), AsyncReplayTogether(cassette), CassetteVectorStore(None, cassette)
+    ).process_query(QUERY, 5)
+
+    assert replayed["answer"] == result["answer"]
+    assert [source["text"] for source in replayed["sources"]] == [source["text"] for source in result["sources"]]
+    assert cassette.stats["misses"] == 0
+
+
+def test_unrecorded_request_is_a_miss(recorded):
+    path, _ = recorded
+    cassette = Cassette(path, mode="replay")
+    with pytest.raises(CassetteMiss):
+        ReplayTogether(cassette).embeddings.create(model="BAAI/bge-large-en-v1.5", input=["Who pays for repairs?"])
+    assert cassette.stats["misses"] == 1
+
+
+def test_recorded_failures_are_raised_again(tmp_path):
+    path = str(tmp_path / "errors.jsonl.gz")
+    cassette = Cassette(path, mode="record")
+    error = RuntimeError("Too many requests")
+    error.status_code = 429
+    cassette.record("rerank", "key", 0.01, error=error)
+    cassette.close()
+
+    replay = Cassette(path, mode="replay")
+    with pytest.raises(ReplayedError) as raised:
+        replay.raise_if_error(replay.lookup("rerank", "key"))
+    assert raised.value.status_code == 429
@@ -0,0 +1,82 @@
+import asyncio
+
+from SmartLegalAssistant.core.clients import PoolConfig, TogetherClientRegistry
+
+
+def test_one_client_per_key():
+    registry = TogetherClientRegistry(PoolConfig())
+    try:
+        first = registry.get_client("key-a")
+        assert registry.get_client("key-a") is first
+        assert registry.get_client("key-b") is not first
+        assert registry.stats.snapshot()["clients_created"] == 2
+    finally:
+        registry.close()
+
+
+def test_sdk_retries_are_off_by_default():
+    registry = TogetherClientRegistry(PoolConfig())
+    try:
+        assert registry.get_client("key").max_retries == 0
+    finally:
+        registry.close()
+
+
+def test_async_clients_are_per_loop():
+    registry = TogetherClientRegistry(PoolConfig())
+
+    async def lookup():
+        return registry.get_async_client("key"), registry.get_async_client("key")
+
+    first, again = asyncio.run(lookup())
+    second, _ = asyncio.run(lookup())
+    assert first is again
+    assert first is not second
+    registry.close()
+
+
+def test_close_closes_async_clients_on_idle_loop():
+    registry = TogetherClientRegistry(PoolConfig())
+    loop = asyncio.new_event_loop()
+    try:
+        client = loop.run_until_complete(_get_async(registry))
+        registry.close()
+        assert client.is_closed()
+    finally:
+        loop.close()
+
+
+def test_aclose_closes_clients_of_running_loop():
+    registry = TogetherClientRegistry(PoolConfig())
+
+    async def run():
+        client = registry.get_async_client("key")
+        await registry.aclose()
+        return client, registry.get_async_client("key")
+
+    closed, fresh = asyncio.run(run())
+    assert closed.is_closed()
+    assert fresh is not closed
+    registry.close()
+
+
+async def _get_async(registry):
+    return registry.get_async_client("key")
+
+
+def test_async_client_for_prefers_injected_then_shared():
+    registry = TogetherClientRegistry(PoolConfig())
+    injected = object()
+
+    async def resolve():
+        return (
+            registry.async_client_for("key", injected),
+            registry.async_client_for("key"),
+            registry.async_client_for("key", shared=False),
+        )
+
+    first, shared, none = asyncio.run(resolve())
+    assert first is injected
+    assert shared is not None
+    assert none is None
+    registry.close()
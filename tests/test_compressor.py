@@ -0,0 +1,57 @@
+import numpy as np
+
+from SmartLegalAssistant.benchmarks.fakes import hash_embedding
+from SmartLegalAssistant.core.compressor import ExtractiveCompressor
+from SmartLegalAssistant.core.embeddings import EmbeddingModel
+
+
+class HashEmbeddings(EmbeddingModel):
+    def __init__(self):
+        self.calls = []
+
+    def embed(self, text):
+        return hash_embedding(text)
+
+    def embed_query(self, text):
+        return hash_embedding(text)
+
+    def batch_embed(self, texts):
+        return self.embed_documents(texts)
+
+    def embed_documents(self, documents):
+        self.calls.append(list(documents))
+        return [hash_embedding(doc) for doc in documents]
+
+
+def test_embed_spans_survives_eviction_of_requested_spans():
+    model = HashEmbeddings()
+    compressor = ExtractiveCompressor(model, cache_size=2)
+    compressor._embed_spans(["a", "b"])
+    rows = compressor._embed_spans(["a", "c", "d"])
+    assert rows.shape == (3, 256)
+    assert np.allclose(rows[0], hash_embedding("a"))
+    assert compressor.cache_entries == 2
+    assert model.calls[-1] == ["c", "d"]
+
+
+def test_cached_spans_are_not_re_embedded():
+    model = HashEmbeddings()
+    compressor = ExtractiveCompressor(model)
+    compressor._embed_spans(["a", "b", "a"])
+    compressor._embed_spans(["b", "a"])
+    assert model.calls == [["a", "b"]]
+    assert compressor.cache_hits == 3
+
+
+def test_compress_keeps_chunk_count_and_headers():
+    compressor = ExtractiveCompressor(HashEmbeddings(), compression_ratio=0.3)
+    chunks = [
+        "Section 12 Leases\nThe lessee must pay rent monthly. The lessor must repair structural defects. "
+        "Either party may terminate with notice.",
+        "Rent increases require written notice. Deposits are capped at two months of rent.",
+    ]
+    result = compressor.compress("When must rent be paid?", chunks)
+    assert len(result.chunks) == 2
+    assert result.chunks[0].startswith("Section 12 Leases")
+    assert result.compressed_chars < result.original_chars
+    assert all(kept for kept in result.kept_spans)
@@ -0,0 +1,57 @@
+import pytest
+
+from SmartLegalAssistant.core.context_packer import ContextPacker
+
+CHUNKS = [
+    "Section 1. A lease ends on the date stated in it.",
+    "Section 2. The landlord must give the tenant four weeks' written notice before ending a periodic tenancy.",
+    "Section 3. Notice may be served by post.",
+]
+
+
+@pytest.fixture
+def packer():
+    return ContextPacker(max_tokens=1000)
+
+
+def cost(packer, *chunks):
+    """Tokens the packer charges for `chunks`: each chunk plus the separators between them."""
+    count = packer.token_counter.count
+    return sum(count(chunk) for chunk in chunks) + count(packer.separator) * (len(chunks) - 1)
+
+
+def test_everything_fits_in_score_order(packer):
+    packed = packer.pack(CHUNKS, scores=[0.2, 0.9, 0.5])
+    assert packed.selected_indices == [1, 2, 0]
+    assert packed.context == packer.separator.join([CHUNKS[1], CHUNKS[2], CHUNKS[0]])
+    assert packed.tokens_dropped == 0
+
+
+def test_budget_drops_the_lowest_ranked_chunks(packer):
+    budget = cost(packer, CHUNKS[1], CHUNKS[2])
+    packed = packer.pack(CHUNKS, scores=[0.2, 0.9, 0.5], max_tokens=budget)
+    assert packed.selected_indices == [1, 2]
+    assert packed.dropped_indices == [0]
+    assert packed.tokens_used <= budget
+
+
+def test_knapsack_prefers_two_small_chunks_over_one_large(packer):
+    knapsack = ContextPacker(strategy="knapsack", token_counter=packer.token_counter)
+    # Room for the long chunk alone, or for both short ones
+    budget = max(cost(packer, CHUNKS[1]), cost(packer, CHUNKS[0], CHUNKS[2]))
+    scores = [0.6, 0.7, 0.6]
+    assert packer.pack(CHUNKS, scores, max_tokens=budget).selected_indices == [1]
+    assert sorted(knapsack.pack(CHUNKS, scores, max_tokens=budget).selected_indices) == [0, 2]
+
+
+def test_best_chunk_is_truncated_when_nothing_fits(packer):
+    packed = packer.pack(CHUNKS, scores=[0.2, 0.9, 0.5], max_tokens=5)
+    assert packed.split_chunk
+    assert packed.selected_indices == [1]
+    assert packed.tokens_used <= 5
+    assert CHUNKS[1].startswith(packed.context)
+
+
+def test_unknown_strategy_is_rejected():
+    with pytest.raises(ValueError):
+        ContextPacker(strategy="random")
@@ -0,0 +1,67 @@
+import pytest
+
+from SmartLegalAssistant.core.events import (
+    AnswerDelta, Final, RerankDone, RetrievalStarted, SourcesReady, answer_events
+)
+
+QUERY = "What notice must a landlord give before ending a lease?"
+
+
+def sources_events(events):
+    return [event for event in events if isinstance(event, SourcesReady)]
+
+
+@pytest.mark.parametrize("rerank_results", [True, False])
+def test_fresh_answer_event_order(stack, rerank_results):
+    events = list(stack["pipeline"].stream_events(QUERY, 5, rerank_results=rerank_results))
+    assert isinstance(events[0], RetrievalStarted)
+    assert isinstance(events[-1], Final)
+    assert [event.reranked for event in sources_events(events)] == [not rerank_results]
+    assert any(isinstance(event, RerankDone) for event in events) == rerank_results
+    answer = "".join(event.delta for event in events if isinstance(event, AnswerDelta))
+    assert answer == events[-1].result["answer"]
+
+
+@pytest.mark.parametrize("rerank_results", [True, False])
+def test_cached_and_prepared_sources_are_final(make_stack, answer_cache, rerank_results):
+    pipeline = make_stack(answer_cache=answer_cache)["pipeline"]
+    first = list(pipeline.stream_events(QUERY, 5, rerank_results=rerank_results))
+
+    cached = list(pipeline.stream_events(QUERY, 5, rerank_results=rerank_results))
+    assert [event.reranked for event in sources_events(cached)] == [True]
+    assert cached[-1].prepared is None
+
+    prepared = list(pipeline.stream_events(template_type="concise", prepared=first[-1].prepared))
+    assert [event.reranked for event in sources_events(prepared)] == [True]
+    assert not any(isinstance(event, RerankDone) for event in cached + prepared)
+
+
+def test_closing_stream_early_releases_the_generation_slot(stack):
+    events = stack["pipeline"].stream_events(QUERY, 5)
+    for event in events:
+        if isinstance(event, AnswerDelta):
+            break
+    events.close()
+    assert stack["retriever"].llm.governor.stats()["in_flight"] == 0
+
+
+def test_answer_events_follow_sections_and_close_the_stream():
+    closed = []
+
+    def sections():
+        try:
+            yield "lawyer", "Notice "
+            yield "judge", "is required."
+        finally:
+            closed.append(True)
+
+    events = answer_events({"answer_stream": iter(()), "section_stream": sections()})
+    assert next(events) == AnswerDelta(delta="Notice ", section="lawyer")
+    events.close()
+    assert closed == [True]
+
+
+def test_final_leaves_out_live_streams():
+    final = Final.from_result({"answer": "a", "answer_stream": iter(()), "sources": []})
+    assert final.result == {"answer": "a", "sources": []}
+    assert final.to_dict() == {"answer": "a"}
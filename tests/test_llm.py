@@ -0,0 +1,46 @@
+import asyncio
+
+from SmartLegalAssistant.benchmarks.fakes import fake_clients
+from SmartLegalAssistant.core.llm import TogetherAILanguageModel
+from SmartLegalAssistant.core.rate_limiter import APIGovernor
+
+
+def in_flight(governor):
+    return governor.stats()["in_flight"]
+
+
+def model(profile):
+    client, async_client = fake_clients(profile)
+    governor = APIGovernor(requests_per_second=1000, max_concurrency=4)
+    return TogetherAILanguageModel(client=client, async_client=async_client, governor=governor)
+
+
+def test_stream_holds_slot_until_exhausted(profile):
+    llm = model(profile)
+    stream = llm.generate_stream("What is a tort?", max_tokens=20)
+    next(stream)
+    assert in_flight(llm.governor) == 1
+    assert "".join(stream)
+    assert in_flight(llm.governor) == 0
+
+
+def test_closing_stream_early_releases_slot(profile):
+    llm = model(profile)
+    stream = llm.generate_stream("What is a tort?", max_tokens=20)
+    next(stream)
+    stream.close()
+    assert in_flight(llm.governor) == 0
+
+
+def test_async_stream_holds_slot_until_closed(profile):
+    llm = model(profile)
+
+    async def run():
+        stream = llm.agenerate_stream("What is a tort?", max_tokens=20)
+        await stream.__anext__()
+        during = in_flight(llm.governor)
+        await stream.aclose()
+        return during
+
+    assert asyncio.run(run()) == 1
+    assert in_flight(llm.governor) == 0
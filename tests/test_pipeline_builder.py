@@ -0,0 +1,39 @@
+import pytest
+
+from SmartLegalAssistant.benchmarks.load import patched_factories
+from SmartLegalAssistant.core.pipeline_builder import build_rag_pipeline
+
+SWITCHES = ("LLM_ROUTING", "ANSWER_CACHE_SEMANTIC_THRESHOLD", "EXTRACTIVE_COMPRESSION",
+            "SPECULATIVE_GENERATION", "ASYNC_PIPELINE")
+
+
+@pytest.fixture
+def build(stack, monkeypatch, tmp_path):
+    monkeypatch.setenv("ANSWER_CACHE_DIR", str(tmp_path / "answers"))
+    for name in SWITCHES:
+        monkeypatch.delenv(name, raising=False)
+
+    def build():
+        with patched_factories(stack):
+            return build_rag_pipeline()
+    return build
+
+
+def test_stages_that_change_answers_are_off_by_default(build):
+    pipeline = build()
+    assert pipeline.answer_generator.router is None
+    assert pipeline.answer_cache.semantic_threshold is None
+    assert pipeline.compressor is None
+    assert not pipeline.speculative
+    assert not pipeline.use_async
+
+
+def test_stages_are_enabled_from_the_environment(build, monkeypatch):
+    monkeypatch.setenv("ANSWER_CACHE_SEMANTIC_THRESHOLD", "0.97")
+    monkeypatch.setenv("EXTRACTIVE_COMPRESSION", "1")
+    monkeypatch.setenv("COMPRESSION_RATIO", "0.5")
+    monkeypatch.setenv("SPECULATIVE_GENERATION", "1")
+    pipeline = build()
+    assert pipeline.answer_cache.semantic_threshold == 0.97
+    assert pipeline.compressor.compression_ratio == 0.5
+    assert pipeline.speculative
@@ -0,0 +1,136 @@
+import time
+import threading
+
+import pytest
+
+from SmartLegalAssistant.core.rate_limiter import APIGovernor, CallTypeLimit, RateLimitTimeout, TokenBucket
+
+
+class RateLimitError(Exception):
+    status_code = 429
+
+
+class APIConnectionError(Exception):
+    pass
+
+
+def flaky(*errors, result="ok"):
+    """A call that raises the given errors in turn, then returns `result`."""
+    calls = []
+
+    def fn():
+        calls.append(1)
+        if len(calls) <= len(errors):
+            raise errors[len(calls) - 1]
+        return result
+    fn.calls = calls
+    return fn
+
+
+def governor(**kwargs):
+    kwargs.setdefault("requests_per_second", 1000)
+    kwargs.setdefault("backoff_base", 0.001)
+    return APIGovernor(**kwargs)
+
+
+def test_rate_limited_call_is_retried_once_per_429():
+    fn = flaky(RateLimitError(), RateLimitError())
+    limiter = governor()
+    assert limiter.call("generation", fn) == "ok"
+    assert len(fn.calls) == 3
+    assert limiter.stats()["call_types"]["generation"]["rate_limited"] == 2
+
+
+def test_gives_up_after_max_retries():
+    fn = flaky(*[RateLimitError()] * 5)
+    with pytest.raises(RateLimitError):
+        governor(max_retries=2).call("generation", fn)
+    assert len(fn.calls) == 3
+
+
+def test_transient_errors_are_retried_up_to_their_own_limit():
+    fn = flaky(APIConnectionError(), APIConnectionError())
+    assert governor(max_transient_retries=2).call("embedding", fn) == "ok"
+
+    fn = flaky(APIConnectionError(), APIConnectionError())
+    with pytest.raises(APIConnectionError):
+        governor(max_transient_retries=1).call("embedding", fn)
+    assert len(fn.calls) == 2
+
+
+def test_other_errors_are_not_retried():
+    fn = flaky(ValueError("bad request"))
+    limiter = governor()
+    with pytest.raises(ValueError):
+        limiter.call("rerank", fn)
+    assert len(fn.calls) == 1
+    assert limiter.stats()["call_types"]["rerank"]["errors"] == 1
+
+
+def test_concurrency_cap_holds_across_threads():
+    limiter = governor(max_concurrency=2)
+    lock = threading.Lock()
+    active, peak = [0], [0]
+
+    def work():
+        with limiter.slot("embedding"):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.02)
+            with lock:
+                active[0] -= 1
+
+    threads = [threading.Thread(target=work) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert peak[0] == 2
+    assert limiter.stats()["in_flight"] == 0
+
+
+def test_higher_priority_waiter_is_served_first():
+    limiter = governor(max_concurrency=1, poll_interval=0.005)
+    order = []
+
+    def wait_for(call_type):
+        with limiter.slot(call_type):
+            order.append(call_type)
+
+    with limiter.slot("generation"):
+        batch = threading.Thread(target=wait_for, args=("batch_generation",))
+        batch.start()
+        time.sleep(0.02)
+        interactive = threading.Thread(target=wait_for, args=("generation",))
+        interactive.start()
+        time.sleep(0.02)
+    batch.join()
+    interactive.join()
+    assert order == ["generation", "batch_generation"]
+
+
+def test_per_type_cap_leaves_room_for_other_calls():
+    limiter = governor(max_concurrency=4, max_queue_wait=0.05,
+                       call_limits={"ingestion": CallTypeLimit(priority=9, max_concurrency=1)})
+    with limiter.slot("ingestion"):
+        with pytest.raises(RateLimitTimeout):
+            limiter.acquire("ingestion")
+        with limiter.slot("generation"):
+            assert limiter.stats()["in_flight"] == 2
+
+
+def test_queue_wait_times_out():
+    limiter = governor(max_concurrency=1, max_queue_wait=0.05)
+    with limiter.slot("generation"):
+        with pytest.raises(RateLimitTimeout):
+            limiter.call("embedding", lambda: None)
+    assert limiter.stats()["queued"] == 0
+
+
+def test_token_bucket_paces_requests():
+    bucket = TokenBucket(rate=10, capacity=1)
+    assert bucket.delay_for(1, now=bucket.updated_at) == 0.0
+    bucket.consume(1)
+    assert bucket.delay_for(1, now=bucket.updated_at) == pytest.approx(0.1)
+    assert bucket.delay_for(1, now=bucket.updated_at + 0.1) == 0.0
@@ -0,0 +1,33 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from SmartLegalAssistant.benchmarks.fakes import FakeTogether
+from SmartLegalAssistant.core.rate_limiter import APIGovernor
+from SmartLegalAssistant.core.reranker import TogetherAIReranker
+
+DOCUMENTS = [{"text": "Rent is due monthly."}, {"text": "A lease ends with thirty days notice."}]
+
+
+def governor():
+    return APIGovernor(requests_per_second=1000)
+
+
+def test_rerank_orders_documents_by_relevance(profile):
+    reranker = TogetherAIReranker(client=FakeTogether(profile), governor=governor())
+    ranked = reranker.rerank("How much notice ends a lease?", DOCUMENTS, top_n=1)
+    assert [doc["text"] for doc in ranked] == ["A lease ends with thirty days notice."]
+    assert "rerank_score" in ranked[0]
+
+
+def test_rerank_failure_is_raised_not_swallowed():
+    def fail(**kwargs):
+        raise ValueError("bad request")
+
+    client = SimpleNamespace(rerank=SimpleNamespace(create=fail))
+    reranker = TogetherAIReranker(client=client, governor=governor())
+    with pytest.raises(RuntimeError, match="bad request"):
+        reranker.rerank("query", DOCUMENTS, top_n=2)
+    with pytest.raises(RuntimeError, match="bad request"):
+        asyncio.run(reranker.arerank("query", DOCUMENTS, top_n=2))
@@ -0,0 +1,26 @@
+import asyncio
+
+QUERY = "What notice must a landlord give before ending a lease?"
+
+
+def test_sync_and_async_expanded_search_agree(stack):
+    retriever = stack["retriever"]
+    assert retriever.llm is not None
+    sync_chunks, _ = retriever.retrieve(QUERY, top_k=5, use_query_expansion=True, rerank_results=False)
+    async_chunks, _ = asyncio.run(
+        retriever.aretrieve(QUERY, top_k=5, use_query_expansion=True, rerank_results=False)
+    )
+    assert sync_chunks == async_chunks
+    assert 0 < len(sync_chunks) <= 5
+
+
+def test_merge_keeps_best_score_and_top_k(stack):
+    retriever = stack["retriever"]
+
+    def result(*pairs):
+        sources = [{"text": text, "score": score} for text, score in pairs]
+        return [source["text"] for source in sources], sources
+
+    chunks, sources = retriever._merge_results(2, result(("a", 0.6), ("b", 0.9)), result(("a", 0.95), ("c", 0.7)))
+    assert chunks == ["a", "b"]
+    assert [source["score"] for source in sources] == [0.95, 0.9]
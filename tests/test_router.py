@@ -0,0 +1,43 @@
+from SmartLegalAssistant.core.context_packer import TokenCounter
+from SmartLegalAssistant.core.llm import LanguageModel
+from SmartLegalAssistant.core.router import LLMRouter, ModelRoute, keyword_complexity
+
+
+class EchoModel(LanguageModel):
+    def __init__(self, model_name):
+        self.model_name = model_name
+
+    def generate(self, prompt, **kwargs):
+        return f"{self.model_name}: {prompt}"
+
+
+def router(counter=None):
+    routes = [
+        ModelRoute("fast", EchoModel("small"), templates=("concise",), max_query_tokens=20,
+                   complexity="simple", cost_per_1k_input=1.0, cost_per_1k_output=2.0),
+        ModelRoute("large", EchoModel("big")),
+    ]
+    return LLMRouter(routes, token_counter=counter or TokenCounter())
+
+
+def test_simple_concise_query_takes_fast_route():
+    assert router().select("concise", "What is a lease?").name == "fast"
+
+
+def test_complex_or_other_template_falls_back_to_default():
+    llm_router = router()
+    assert llm_router.select("concise", "Compare the liabilities of directors and officers").name == "large"
+    assert llm_router.select("detailed", "What is a lease?").name == "large"
+    assert keyword_complexity("Why is this void? And when?") == "complex"
+
+
+def test_routed_calls_are_metered_without_touching_the_shared_cache():
+    counter = TokenCounter()
+    llm_router = router(counter)
+    model = llm_router.route("concise", "What is a lease?")
+    assert "".join(model.generate_stream("What is a lease?")) == "small: What is a lease?"
+    stats = llm_router.metrics()["fast"]
+    assert stats["calls"] == 1
+    assert stats["input_tokens"] == counter.count_uncached("What is a lease?")
+    assert stats["cost"] > 0
+    assert counter.cache_entries == 0
@@ -0,0 +1,76 @@
+import json
+import threading
+
+from fastapi.testclient import TestClient
+
+from SmartLegalAssistant.core.events import RetrievalStarted
+from SmartLegalAssistant.main import create_app
+
+QUERY = "What notice must a landlord give before ending a lease?"
+
+
+def sse_events(text):
+    events = []
+    for block in text.strip().split("\n\n"):
+        name, data = block.split("\n")
+        events.append((name[len("event: "):], json.loads(data[len("data: "):])))
+    return events
+
+
+class SlowPipeline:
+    """Emits one event, then blocks in the next step until released."""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.closed = threading.Event()
+        self.aclosed = False
+
+    def stream_events(self, query, *args):
+        try:
+            yield RetrievalStarted(query=query, top_k=5)
+            self.release.wait(5)
+            yield RetrievalStarted(query=query, top_k=5)
+        finally:
+            self.closed.set()
+
+    def cache_stats(self):
+        return {}
+
+    def cache_sizes(self):
+        return {}
+
+    async def aclose(self):
+        self.aclosed = True
+
+
+def test_query_returns_answer_and_sources(stack):
+    with TestClient(create_app(stack["pipeline"])) as client:
+        assert client.get("/health").json()["status"] == "ok"
+        response = client.post("/query", json={"query": QUERY, "top_k": 5})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["answer"]
+    assert "answer_stream" not in body
+
+
+def test_streamed_query_ends_with_final_event(stack):
+    with TestClient(create_app(stack["pipeline"])) as client:
+        response = client.post("/query", json={"query": QUERY, "top_k": 5, "stream": True})
+    names = [name for name, _ in sse_events(response.text)]
+    assert names[0] == "retrieval_started"
+    assert "token" in names
+    assert names[-1] == "final"
+
+
+def test_stream_timeout_reports_error_and_closes_events_after_step():
+    pipeline = SlowPipeline()
+    with TestClient(create_app(pipeline, request_timeout=0.2)) as client:
+        response = client.post("/query", json={"query": QUERY, "stream": True})
+        events = sse_events(response.text)
+        assert [name for name, _ in events] == ["retrieval_started", "error"]
+        assert events[-1][1]["status"] == 504
+        # The blocked step still owns the generator; it is closed once the step returns
+        assert not pipeline.closed.is_set()
+        pipeline.release.set()
+        assert pipeline.closed.wait(5)
+    assert pipeline.aclosed
@@ -0,0 +1,64 @@
+from SmartLegalAssistant.core.speculative import (
+    BackgroundStream, SpeculationStats, attach_speculation, confirm_speculation, overlap_ratio,
+    start_speculation, take_speculation,
+)
+
+QUERY = "What notice must a landlord give before ending a lease?"
+SOURCES = [{"text": text} for text in ("a", "b", "c", "d")]
+
+
+def speculative_result(deltas=("Notice ", "is required.")):
+    return start_speculation({"answer_stream": iter(deltas), "context_chunk_indices": [0, 1]}, "concise")
+
+
+def test_overlap_ratio():
+    assert overlap_ratio(["a", "b"], ["b", "a"]) == 1.0
+    assert overlap_ratio(["a", "b"], ["a", "c"]) == 0.5
+    assert overlap_ratio([], []) == 1.0
+
+
+def test_background_stream_buffers_and_replays():
+    stream = BackgroundStream(iter(["a", "b", "c"]))
+    assert "".join(stream) == "abc"
+
+
+def test_confirmed_speculation_keeps_its_answer():
+    stats = SpeculationStats()
+    speculative = confirm_speculation(speculative_result(), SOURCES, [SOURCES[1], SOURCES[0]], 0.5, 0.8, stats)
+    assert speculative["speculation"]["hit"]
+    assert "".join(speculative["answer_stream"]) == "Notice is required."
+    assert stats.snapshot()["hits"] == 1
+
+
+def test_rejected_speculation_is_cancelled():
+    stats = SpeculationStats()
+    speculative = confirm_speculation(speculative_result(), SOURCES, [SOURCES[2], SOURCES[3]], 0.5, 0.8, stats)
+    assert not speculative["speculation"]["hit"]
+    assert "speculative_stream" not in speculative
+    assert stats.snapshot()["misses"] == 1
+
+    prepared = {}
+    attach_speculation(prepared, speculative)
+    assert take_speculation(prepared, "concise") is None
+
+
+def test_speculation_is_only_taken_for_its_template():
+    speculative = confirm_speculation(speculative_result(), SOURCES, SOURCES[:2], 0.5, 0.8, SpeculationStats())
+    prepared = {}
+    attach_speculation(prepared, speculative)
+
+    assert take_speculation(prepared, "factual_qa") is None
+    assert take_speculation(prepared, "concise") is speculative
+    assert take_speculation(prepared, "concise") is None
+    prepared.pop("speculative_stream").cancel()
+
+
+def test_pipeline_answers_from_a_confirmed_speculation(make_stack):
+    pipeline = make_stack(speculative=True, speculation_threshold=0.0)["pipeline"]
+    prepared = pipeline.prepare_context(QUERY, 5, use_compression=False, speculate_template="concise")
+    assert prepared["speculation"]["hit"]
+
+    result = pipeline.answer_from_context(prepared, template_type="concise")
+    assert result["answer"]
+    assert result["speculation"]["template_type"] == "concise"
+    assert pipeline.speculation_stats.snapshot()["hits"] == 1
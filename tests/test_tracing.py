@@ -0,0 +1,62 @@
+import gc
+
+from SmartLegalAssistant.utils import metrics, tracing
+from SmartLegalAssistant.utils.tracing import MetricsExporter, Tracer, TraceExporter
+
+
+class Recorder(TraceExporter):
+    def __init__(self):
+        self.traces = []
+
+    def export(self, trace):
+        self.traces.append(trace)
+
+
+def requests(operation, status="ok"):
+    return metrics.REGISTRY.get("rag_requests_total").value(operation=operation, status=status)
+
+
+def in_flight(operation):
+    return metrics.REGISTRY.get("rag_requests_in_flight").value(operation=operation)
+
+
+def test_unsampled_requests_still_feed_metrics():
+    recorder = Recorder()
+    tracer = Tracer(exporters=[MetricsExporter(), recorder], sample_rate=0.0)
+    before = requests("unsampled_op")
+    trace = tracer.start_trace("unsampled_op")
+    with tracing.activate(trace):
+        with tracing.span("embedding"):
+            pass
+    assert trace.finish() == {}
+    assert not trace.sampled
+    assert requests("unsampled_op") == before + 1
+    assert recorder.traces == []
+
+
+def test_disabled_tracing_without_metrics_is_a_no_op():
+    assert Tracer(exporters=[Recorder()], enabled=False).start_trace("op") is None
+
+
+def test_sampled_trace_has_timings():
+    trace = Tracer(exporters=[MetricsExporter()]).start_trace("sampled_op")
+    with tracing.activate(trace):
+        with tracing.span("rerank"):
+            pass
+    assert "rerank" in trace.finish()["stages"]
+
+
+def test_abandoned_trace_leaves_in_flight_gauge():
+    tracer = Tracer(exporters=[MetricsExporter()])
+    trace = tracer.start_trace("abandoned_op")
+    assert in_flight("abandoned_op") == 1
+    del trace
+    gc.collect()
+    assert in_flight("abandoned_op") == 0
+
+    trace = tracer.start_trace("abandoned_op")
+    trace.finish()
+    trace.finish()
+    del trace
+    gc.collect()
+    assert in_flight("abandoned_op") == 0